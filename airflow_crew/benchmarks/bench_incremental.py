@@ -0,0 +1,55 @@
+"""Benchmark incremental re-analysis of a few edits against a full re-analysis.
+
+Every incremental result is checked against a full analysis of the same source.
+Statements are the unit of reuse, so module-level task definitions gain from
+it, while an edit inside a DAG defined in one ``with DAG(...)`` block falls
+back to a full analysis and runs at about the same speed.
+
+Run from the ``airflow_crew`` directory::
+
+    PYTHONPATH=src:benchmarks python benchmarks/bench_incremental.py
+"""
+
+import itertools
+import random
+
+from airflow_crew.tools.support import analyzers
+from airflow_crew.tools.support.incremental import IncrementalAnalyzer, verify_equivalent
+from common import generate_dag_source, timeit
+
+
+def edit(code: str, n_edits: int, seed: int) -> str:
+    """Apply a fix-loop style edit: tweak a few task definitions and add a top-level import."""
+    rng = random.Random(seed)
+    lines = code.splitlines(keepends=True)
+    task_lines = [i for i, line in enumerate(lines) if "PythonOperator(task_id=" in line]
+    for i in rng.sample(task_lines, n_edits):
+        lines[i] = lines[i].replace("retries=0", "retries=3").replace(")\n", ", execution_timeout=timedelta(minutes=5))\n")
+    lines.insert(3, "import boto3\n")
+    return "".join(lines)
+
+
+def main():
+    print(f"{'tasks':>8} {'layout':>10} {'full ms':>9} {'incremental ms':>15} {'speedup':>8}")
+    for n_tasks in (500, 5000):
+        for context_manager in (False, True):
+            code = generate_dag_source(n_tasks, context_manager=context_manager)
+            edited = [edit(code, 3, seed) for seed in range(5)]
+
+            # Correctness first: every incremental result must equal a full analysis
+            analyzer = IncrementalAnalyzer()
+            analyzer.update(code)
+            for version in edited:
+                verify_equivalent(analyzer.analyze_dag(version), analyzers.build_analysis(analyzers.run_static_rules(version)))
+
+            versions = itertools.cycle(edited)
+            step = lambda: analyzer.analyze_dag(next(versions))  # noqa: E731
+
+            full = timeit(lambda: analyzers._analyze_dag(edited[0]))
+            incremental = timeit(step)
+            layout = "with-block" if context_manager else "top-level"
+            print(f"{n_tasks:>8} {layout:>10} {full * 1000:>9.1f} {incremental * 1000:>15.1f} {full / incremental:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
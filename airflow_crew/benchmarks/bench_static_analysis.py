@@ -0,0 +1,34 @@
+"""Benchmark the single-pass rule engine against the three-parse analysis path.
+
+Run from the ``airflow_crew`` directory::
+
+    PYTHONPATH=src:benchmarks python benchmarks/bench_static_analysis.py
+"""
+
+from airflow_crew.tools.support import analyzers
+from common import generate_dag_source, timeit
+
+
+def three_pass(code: str):
+    """Previous ``analyze_dag`` static path: one parse and one walk per analyzer."""
+    analyzers.analyze_imports_ast(code)
+    analyzers.analyze_dependencies(code)
+    analyzers.analyze_top_level_code_ast(code)
+
+
+def single_pass(code: str):
+    """Current ``analyze_dag`` static path."""
+    analyzers.run_static_rules(code)
+
+
+def main():
+    print(f"{'tasks':>8} {'lines':>8} {'three-pass ms':>14} {'single-pass ms':>15} {'speedup':>8}")
+    for n_tasks in (100, 1000, 5000):
+        code = generate_dag_source(n_tasks)
+        before = timeit(lambda: three_pass(code))
+        after = timeit(lambda: single_pass(code))
+        print(f"{n_tasks:>8} {code.count(chr(10)):>8} {before * 1000:>14.1f} {after * 1000:>15.1f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Benchmark columnar, vectorized task scoring against the per-task scoring loop.
+
+Run from the ``airflow_crew`` directory::
+
+    PYTHONPATH=src:benchmarks python benchmarks/bench_task_scoring.py
+"""
+
+from airflow_crew.tools.support import analyzers, scoring
+from common import FakeDag, timeit
+
+
+def per_task(dag: FakeDag) -> float:
+    """Previous runtime path: ``analyze_task_complexity`` and ``calculate_task_prognosis`` per task."""
+    task_metrics = {task.task_id: analyzers.analyze_task_complexity(task) for task in dag.tasks}
+    task_scores = {}
+    score = 100.0
+    for task in dag.tasks:
+        prognosis = task_scores[task.task_id] = scoring.calculate_task_prognosis(task)
+        if prognosis["score"] < 70:
+            score -= 5
+        elif prognosis["score"] < 85:
+            score -= 2
+    return score, task_scores, task_metrics
+
+
+def main():
+    print(f"{'tasks':>8} {'per-task ms':>12} {'columnar ms':>12} {'speedup':>8} {'expanded ms':>12} {'speedup':>8}")
+    for n_tasks in (1_000, 10_000, 100_000):
+        dag = FakeDag(n_tasks)
+        # Same DAG score either way (the complexity deduction is applied identically to both)
+        expected, task_scores, task_metrics = per_task(dag)
+        assert scoring.calculate_dag_prognosis(dag)["score"] == max(0.0, expected - (10 if n_tasks > 50 else 0))
+        # and the same per-task records when they are expanded
+        prognosis = scoring.calculate_dag_prognosis(dag, expand_tasks=True)
+        assert prognosis["task_scores"] == task_scores and prognosis["task_metrics"] == task_metrics
+        repeat = 3 if n_tasks >= 100_000 else 5
+        before = timeit(lambda: per_task(dag), repeat)
+        after = timeit(lambda: scoring.calculate_dag_prognosis(dag), repeat)
+        expanded = timeit(lambda: scoring.calculate_dag_prognosis(dag, expand_tasks=True), repeat)
+        print(f"{n_tasks:>8} {before * 1000:>12.1f} {after * 1000:>12.1f} {before / after:>7.2f}x {expanded * 1000:>12.1f} {before / expanded:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
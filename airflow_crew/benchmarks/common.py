@@ -0,0 +1,85 @@
+"""Shared helpers for the analysis benchmarks."""
+
+import statistics
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+
+def generate_dag_source(n_tasks: int, context_manager: bool = True) -> str:
+    """Generate a large DAG file in the style of code-generated DAGs.
+
+    With ``context_manager=False`` tasks are module-level statements passing ``dag=dag``.
+    """
+    lines = [
+        "import json",
+        "import os",
+        "from datetime import datetime, timedelta",
+        "",
+        "import pandas",
+        "import requests",
+        "from airflow import DAG",
+        "from airflow.operators.python import PythonOperator",
+        "from sqlalchemy import create_engine",
+        "",
+        "engine = create_engine(os.environ.get('DB_URL', 'sqlite://'))",
+        "",
+        "",
+        "def extract(table, **context):",
+        "    import boto3",
+        "    rows = engine.execute(f'select * from {table}').fetchall()",
+        "    return json.dumps([dict(r) for r in rows])",
+        "",
+        "",
+    ]
+    if context_manager:
+        lines.append("with DAG('generated', start_date=datetime(2024, 1, 1), schedule=timedelta(hours=1)) as dag:")
+        indent, dag_arg = "    ", ""
+    else:
+        lines.append("dag = DAG('generated', start_date=datetime(2024, 1, 1), schedule=timedelta(hours=1))")
+        indent, dag_arg = "", ", dag=dag"
+    for i in range(n_tasks):
+        lines.append(f"{indent}task_{i} = PythonOperator(task_id='task_{i}', python_callable=extract, op_kwargs={{'table': 'table_{i}'}}, retries={i % 3}{dag_arg})")
+    for i in range(1, n_tasks):
+        lines.append(f"{indent}task_{i - 1} >> task_{i}")
+    return "\n".join(lines) + "\n"
+
+
+def timeit(func: Callable[[], object], repeat: int = 5) -> float:
+    """Return the median wall time of ``func`` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+class FakeTask:
+    """Stand-in for a BaseOperator carrying the attributes the task scoring reads."""
+
+    def __init__(self, i: int):
+        self.task_id = f"task_{i}"
+        self.retries = i % 3
+        self.retry_delay = timedelta(minutes=5)
+        self.pool = "default_pool" if i % 4 else "etl"
+        self.priority_weight = 1 + i % 5
+        self.queue = "default" if i % 10 else ""
+        self.execution_timeout = timedelta(hours=1) if i % 2 else None
+        self.trigger_rule = "all_success"
+        self.depends_on_past = i % 7 == 0
+        self.wait_for_downstream = i % 11 == 0
+        self.email_on_retry = False
+        self.email_on_failure = True
+
+
+class FakeDag:
+    """Stand-in for a DAG with ``n_tasks`` generated tasks."""
+
+    def __init__(self, n_tasks: int):
+        self.dag_id = "generated"
+        self.start_date = datetime(2024, 1, 1)
+        self.doc_md = None
+        self.description = "Generated benchmark DAG"
+        self.tags = ["benchmark"]
+        self.tasks = [FakeTask(i) for i in range(n_tasks)]
@@ -37,7 +37,7 @@ class AirflowCrew(Flow):
 
     @agent
     def python_profiler(self) -> Agent:
-        return Agent(config=self.agents_config["python_profiler"], llm=self.code_llm, allow_code_execution=True, tools=["performance_analysis", "memory_profiling"])
+        return Agent(config=self.agents_config["python_profiler"], llm=self.code_llm, allow_code_execution=True, tools=["performance_analysis", "performance_comparison", "memory_profiling"])
 
     @agent
     def mock_env(self) -> Agent:
@@ -74,7 +74,10 @@ class AirflowCrew(Flow):
     def validate_fixes(self, dag_path: Path, fix_result: dict) -> dict:
         crew = Crew(
             agents=[self.dag_prognosis(), self.python_profiler()],
-            tasks=[Task(description="Validate fixes", agent=self.dag_prognosis()), Task(description="Verify performance", agent=self.python_profiler())],
+            tasks=[
+                Task(description="Validate fixes", agent=self.dag_prognosis()),
+                Task(description="Verify performance: compare the original and fixed DAG and reject the fix if it regresses", agent=self.python_profiler()),
+            ],
         )
         return crew.kickoff()
 
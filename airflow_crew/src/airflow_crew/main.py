@@ -3,6 +3,7 @@ import sys
 import warnings
 
 from airflow_crew.crew import AirflowCrew
+from airflow_crew.tools.support import batch_validation, differential, fleet, parse_benchmark, parse_time, watcher
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -20,6 +21,13 @@ def run():
     AirflowCrew().crew().kickoff(inputs=inputs)
 
 
+def watch():
+    """
+    Watch a DAGs directory and re-score DAG files as they change.
+    """
+    watcher.main(sys.argv[1:])
+
+
 def train():
     """
     Train the crew for a given number of iterations.
@@ -53,3 +61,40 @@ def test():
 
     except Exception as e:
         raise Exception(f"An error occurred while replaying the crew: {e}")
+
+
+def analyze_fleet():
+    """
+    Statically analyze every DAG file in a directory or glob, streaming JSON Lines results.
+    """
+    fleet.main(sys.argv[1:])
+
+
+def measure_import_costs():
+    """
+    Measure per-module import costs used by the static parse-time estimator.
+    """
+    parse_time.main(sys.argv[1:])
+
+
+def validate_dags():
+    """
+    Load a whole DAGs folder in one Airflow process and report import errors, load times and analyses.
+    """
+    batch_validation.main(sys.argv[1:])
+
+
+def benchmark_parse():
+    """
+    Benchmark cold and warm parse times of a DAG file; exits non-zero when a parse-time budget is exceeded.
+    """
+    if not parse_benchmark.main(sys.argv[1:])["budget"]["passed"]:
+        sys.exit(1)
+
+
+def compare_performance():
+    """
+    Compare the performance of an original DAG file and its fix; exits non-zero when the fix regresses.
+    """
+    if not differential.main(sys.argv[1:])["accepted"]:
+        sys.exit(1)
@@ -1,6 +1,17 @@
-from airflow_crew.tools.analysis_tools import PatternDetectionTool, PerformanceAnalysisTool, StaticAnalysisTool
-from airflow_crew.tools.cli_tools import CLIOperationsTool, EnvironmentSetupTool
+from airflow_crew.tools.analysis_tools import PatternDetectionTool, PerformanceAnalysisTool, PerformanceComparisonTool, StaticAnalysisTool
+from airflow_crew.tools.cli_tools import CLIOperationsTool, DagTestingTool, EnvironmentSetupTool
 from airflow_crew.tools.code_tools import CodeFormattingTool, CodeGenerationTool
 from airflow_crew.tools.provider_tools import ProviderManagementTool
 
-__all__ = ["StaticAnalysisTool", "PatternDetectionTool", "PerformanceAnalysisTool", "CodeGenerationTool", "CodeFormattingTool", "CLIOperationsTool", "EnvironmentSetupTool", "ProviderManagementTool"]
+__all__ = [
+    "StaticAnalysisTool",
+    "PatternDetectionTool",
+    "PerformanceAnalysisTool",
+    "PerformanceComparisonTool",
+    "CodeGenerationTool",
+    "CodeFormattingTool",
+    "CLIOperationsTool",
+    "DagTestingTool",
+    "EnvironmentSetupTool",
+    "ProviderManagementTool",
+]
@@ -5,8 +5,9 @@ from airflow.models.dag import DAG
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
-from airflow_crew.tools.support import analyzers
-from airflow_crew.tools.support.docker_manager import AirflowVersionConfig, DockerEnvironmentManager
+from airflow_crew.tools.support import analyzers, differential, incremental, memory_profile, scoring, statement_profiler
+from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+from airflow_crew.tools.support.environment import get_environment_manager
 
 
 class StaticAnalysisInput(BaseModel):
@@ -14,6 +15,8 @@ class StaticAnalysisInput(BaseModel):
 
     code: str = Field(..., description="DAG code to analyze")
     dag: DAG | None = Field(None, description="DAG object for runtime analysis")
+    dag_path: Path | None = Field(None, description="Path of the DAG file, to re-analyze only the statements changed since its last analysis")
+    expand_tasks: bool = Field(default=False, description="Include per-task metrics and scores in runtime analysis instead of only a summary")
 
 
 class StaticAnalysisTool(BaseTool):
@@ -23,17 +26,21 @@ class StaticAnalysisTool(BaseTool):
     description: str = "Analyze DAG code for issues and improvements"
     args_schema: type[BaseModel] = StaticAnalysisInput
 
-    def _run(self, code: str, dag: DAG | None = None) -> dict:
+    def _run(self, code: str, dag: DAG | None = None, dag_path: Path | None = None, expand_tasks: bool = False) -> dict:
         """Run static analysis on DAG code.
 
         Args:
             code (str): The DAG code to analyze
             dag (DAG, optional): DAG object for runtime analysis
+            dag_path (Path, optional): DAG file path; repeated calls for the same path reuse findings for unchanged statements
+            expand_tasks (bool): Include per-task metrics and scores, not just the task summary
 
         Returns:
             dict: Analysis results with score, color indicator, and detailed analysis
         """
-        return analyzers.analyze_dag(code, dag)
+        if dag_path is not None:
+            return incremental.analyze_dag(code, str(dag_path), dag, expand_tasks)
+        return analyzers.analyze_dag(code, dag, expand_tasks=expand_tasks)
 
 
 class PerformanceAnalysisInput(BaseModel):
@@ -43,6 +50,10 @@ class PerformanceAnalysisInput(BaseModel):
     config: AirflowVersionConfig = Field(..., description="Airflow version configuration")
     task_id: str | None = Field(None, description="Optional task ID to profile")
     duration: int = Field(default=60, description="Duration in seconds for profiling")
+    profile_statements: bool = Field(default=False, description="Also time each top-level statement of the DAG file during parsing")
+    profile_memory: bool = Field(default=False, description="Also track allocations and leaks over repeated parses and task runs with tracemalloc (always done when attaching)")
+    flame_graph_dir: Path | None = Field(None, description="Directory to write a flame graph SVG of the py-spy samples to")
+    lifecycle: bool = Field(default=True, description="Launch each task under py-spy and profile it from start-up to exit, instead of attaching to a running Airflow process")
 
 
 class PerformanceAnalysisTool(BaseTool):
@@ -54,42 +65,120 @@ class PerformanceAnalysisTool(BaseTool):
 
     def __init__(self):
         super().__init__()
-        self.docker_manager = DockerEnvironmentManager()
-
-    def _run(self, dag_path: Path, config: AirflowVersionConfig, task_id: str | None = None, duration: int = 60) -> dict[str, Any]:
+        self.environment = get_environment_manager()
+
+    def _run(
+        self,
+        dag_path: Path,
+        config: AirflowVersionConfig,
+        task_id: str | None = None,
+        duration: int = 60,
+        profile_statements: bool = False,
+        flame_graph_dir: Path | None = None,
+        lifecycle: bool = True,
+        profile_memory: bool = False,
+    ) -> dict[str, Any]:
         try:
             # Create container if not exists
-            if not self.docker_manager.container:
-                self.docker_manager.create_container(config, dag_path)
+            if not self.environment.container:
+                self.environment.create_container(config, dag_path)
 
-            # Run task test to get process
-            cmd = ["airflow", "tasks", "test"]
-            if task_id:
-                cmd.extend([Path(dag_path).stem, task_id, "2024-01-01"])
+            dag_id = Path(dag_path).stem
+            if lifecycle:
+                result = self._profile_lifecycle(dag_id, task_id, flame_graph_dir)
             else:
-                cmd.extend(["dags", "list-tasks", Path(dag_path).stem])
+                result = self._profile_attached(dag_id, task_id, duration, flame_graph_dir)
+
+            if result["success"] and profile_statements:
+                profile = statement_profiler.profile_statements(
+                    self.environment.dag_file, runner=lambda args: self.environment.execute_command(["python", *args], timeout=statement_profiler.PROFILE_TIMEOUT)[1]
+                )
+                result["statement_profile"] = profile
+                result["recommendations"].extend(statement_profiler.slow_statement_recommendations(profile))
+
+            if result["success"] and profile_memory and lifecycle:
+                self.environment.restore_metadata_db()
+                task = (dag_id, task_id, "2024-01-01") if task_id else None
+                profile = memory_profile.profile_memory(
+                    self.environment.dag_file, task, runner=lambda args: self.environment.execute_command(["python", *args], timeout=memory_profile.MEMORY_TIMEOUT)[1]
+                )
+                result["memory_profile"] = profile
+                result["recommendations"].extend(memory_profile.leak_recommendations(profile))
+
+            return result
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
 
-            exit_code, output = self.docker_manager.execute_command(cmd)
+    def _list_tasks(self, dag_id: str) -> list[str]:
+        """Task IDs of the DAG, as listed by the Airflow CLI in the container."""
+        result = self.environment.stream_command(["airflow", "tasks", "list", dag_id])
+        if result.exit_code != 0:
+            raise RuntimeError(f"Failed to list tasks: {result.output}")
+        return [line.strip() for line in result.stdout.splitlines() if line.strip() and " " not in line.strip()]
+
+    def _profile_lifecycle(self, dag_id: str, task_id: str | None, flame_graph_dir: Path | None) -> dict[str, Any]:
+        """Profile each task (or just ``task_id``) from process start to exit, one profile per task, each on a freshly restored metadata DB."""
+        task_ids = [task_id] if task_id else self._list_tasks(dag_id)
+        profiles = {}
+        for task in task_ids:
+            self.environment.restore_metadata_db()
+            profiles[task] = self.environment.profile_task(dag_id, task, flame_graph_dir=flame_graph_dir)
+        failed = [task for task, profile in profiles.items() if profile["exit_code"] != 0]
+        xcom_issues = [issue for profile in profiles.values() for issue in analyzers.analyze_xcom_usage(profile["xcom"]["tasks"])]
+        result = {
+            "success": not failed,
+            "task_profiles": profiles,
+            "xcom": {"issues": xcom_issues, "score": scoring.calculate_score({"issues": xcom_issues})},
+            "recommendations": self._lifecycle_recommendations(profiles) + [issue["recommendation"] for issue in xcom_issues],
+        }
+        if failed:
+            result["error"] = f"Task run failed: {', '.join(failed)}"
+        return result
 
-            if exit_code != 0:
-                return {"success": False, "error": f"Failed to run task: {output}"}
+    def _profile_attached(self, dag_id: str, task_id: str | None, duration: int, flame_graph_dir: Path | None) -> dict[str, Any]:
+        """Sample an already running Airflow process for ``duration`` seconds."""
+        # Run task test to get process
+        cmd = ["airflow", "tasks", "test"]
+        if task_id:
+            cmd.extend([dag_id, task_id, "2024-01-01"])
+        else:
+            cmd.extend(["dags", "list-tasks", dag_id])
 
-            # Get task process PID
-            exit_code, pid_output = self.docker_manager.execute_command(["pgrep", "-f", "airflow"])
+        exit_code, output = self.environment.execute_command(self.environment.traced(cmd, f"attached-{dag_id}"))
 
-            if exit_code != 0:
-                return {"success": False, "error": "Failed to get task PID"}
+        if exit_code != 0:
+            return {"success": False, "error": f"Failed to run task: {output}"}
 
-            # Collect comprehensive performance metrics
-            metrics = self.docker_manager.get_performance_metrics(pid=int(pid_output.strip()), duration=duration)
+        # Get the oldest Airflow process; "[a]irflow" keeps the pattern from matching the command line of pgrep's own wrapper
+        exit_code, pid_output = self.environment.execute_command(["pgrep", "-o", "-f", "[a]irflow"])
 
-            # Analyze metrics and generate insights
-            insights = self._analyze_performance_metrics(metrics)
+        if exit_code != 0:
+            return {"success": False, "error": "Failed to get task PID"}
 
-            return {"success": True, "metrics": metrics, "insights": insights, "recommendations": self._generate_recommendations(metrics, insights), "task_output": output}
+        # Collect comprehensive performance metrics
+        task = (dag_id, task_id, "2024-01-01") if task_id else None
+        metrics = self.environment.get_performance_metrics(pid=int(pid_output.split()[0]), duration=duration, flame_graph_dir=flame_graph_dir, task=task)
 
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+        # Analyze metrics and generate insights
+        insights = self._analyze_performance_metrics(metrics)
+
+        return {"success": True, "metrics": metrics, "insights": insights, "recommendations": self._generate_recommendations(metrics, insights), "task_output": output}
+
+    def _lifecycle_recommendations(self, profiles: dict[str, dict[str, Any]]) -> list[str]:
+        """Recommendations from per-task lifecycle profiles."""
+        recommendations = []
+        for task_id, profile in profiles.items():
+            phases = profile["phases"]
+            parse_seconds = phases["dag_import"]["seconds"] + phases["dag_parse"]["seconds"]
+            if parse_seconds > phases["execute"]["seconds"]:
+                recommendations.append(
+                    f"Task {task_id} spends {parse_seconds:.1f}s importing and parsing the DAG file but only {phases['execute']['seconds']:.1f}s in execute(); move top-level work into task callables"
+                )
+            for task_callable in profile["execute"]["task_callables"][:1]:
+                recommendations.append(f"Task {task_id}: {task_callable['function']} accounts for {task_callable['total_seconds']:.1f}s of execute(); start optimizing there")
+            recommendations.extend(f"Task {task_id}: {issue}" for issue in self._analyze_db_patterns(profile["db"]))
+        return recommendations
 
     def _analyze_performance_metrics(self, metrics: dict[str, Any]) -> dict[str, Any]:
         """Analyze performance metrics to identify issues and patterns."""
@@ -101,6 +190,7 @@ class PerformanceAnalysisTool(BaseTool):
             "memory": {
                 "leaks_detected": len(metrics["memory"].get("leaks", [])) > 0,
                 "large_objects": metrics["memory"].get("large_objects", [])[:5],
+                "leaks": metrics["memory"].get("leaks", [])[:5],
             },
             "io": {
                 "high_wait_time": metrics["io"].get("io_wait", 0) > 5.0,
@@ -110,6 +200,7 @@ class PerformanceAnalysisTool(BaseTool):
                 "slow_queries": metrics["db"].get("slow_queries", [])[:5],
                 "connection_issues": self._analyze_db_patterns(metrics["db"]),
             },
+            "xcom": self._analyze_xcom(metrics["xcom"]),
             "scheduling": {
                 "parse_time_issues": metrics["scheduling"].get("dag_file_parse_time", 0) > 2.0,
                 "queue_bottlenecks": self._analyze_queue_metrics(metrics["scheduling"]),
@@ -117,6 +208,11 @@ class PerformanceAnalysisTool(BaseTool):
         }
         return insights
 
+    def _analyze_xcom(self, xcom_metrics: dict[str, Any]) -> dict[str, Any]:
+        """Measured XCom issues and the score they leave, deducted as in ``SCORING_MATRIX``."""
+        issues = analyzers.analyze_xcom_usage(xcom_metrics["tasks"])
+        return {"issues": issues, "score": scoring.calculate_score({"issues": issues})}
+
     def _detect_io_patterns(self, io_metrics: dict[str, Any]) -> list[str]:
         """Detect inefficient I/O patterns."""
         patterns = []
@@ -127,9 +223,10 @@ class PerformanceAnalysisTool(BaseTool):
     def _analyze_db_patterns(self, db_metrics: dict[str, Any]) -> list[str]:
         """Analyze database operation patterns."""
         issues = []
-        for query in db_metrics.get("queries", []):
-            if query.get("execution_time", 0) > 1.0:
-                issues.append(f"Slow query: {query.get('sql', 'Unknown')}")
+        for query in db_metrics.get("slow_queries", []):
+            issues.append(f"Slow query ({query['count']}x, p95 {query['p95_ms']:.0f}ms) from {query['origin'] or query['caller']}: {query['sql'][:200]}")
+        for pattern in db_metrics.get("n_plus_one", []):
+            issues.append(f"N+1 query pattern: {pattern['count']} executions from {pattern['frame']} ({pattern['total_ms']:.0f}ms): {pattern['sql'][:200]}")
         return issues
 
     def _analyze_queue_metrics(self, scheduling_metrics: dict[str, Any]) -> list[str]:
@@ -147,10 +244,15 @@ class PerformanceAnalysisTool(BaseTool):
         # CPU recommendations
         if insights["cpu"]["high_utilization"]:
             recommendations.append("Consider splitting CPU-intensive tasks or increasing resources")
+        for task_callable in metrics["profiling"].get("task_callables", [])[:3]:
+            recommendations.append(
+                f"Task callable {task_callable['function']} spent {task_callable['total_seconds']:.1f}s on CPU ({task_callable['total_percent']:.0f}% of samples); start optimizing there"
+            )
 
         # Memory recommendations
         if insights["memory"]["leaks_detected"]:
             recommendations.append("Memory leaks detected - review resource cleanup in tasks")
+            recommendations.extend(memory_profile.leak_recommendations(metrics["memory"]))
 
         # I/O recommendations
         if insights["io"]["high_wait_time"]:
@@ -159,6 +261,11 @@ class PerformanceAnalysisTool(BaseTool):
         # Database recommendations
         if insights["database"]["slow_queries"]:
             recommendations.append("Optimize database queries or consider using provider-specific operators")
+        if metrics["db"].get("n_plus_one"):
+            recommendations.append("Queries repeated per item from one call site (N+1) - fetch in one query or cache the lookup outside the loop")
+
+        # XCom recommendations
+        recommendations.extend(issue["recommendation"] for issue in insights["xcom"]["issues"])
 
         # Scheduling recommendations
         if insights["scheduling"]["parse_time_issues"]:
@@ -168,4 +275,42 @@ class PerformanceAnalysisTool(BaseTool):
 
     def cleanup(self):
         """Cleanup Docker resources"""
-        self.docker_manager.cleanup()
+        self.environment.cleanup()
+
+
+class PerformanceComparisonInput(BaseModel):
+    """Input schema for PerformanceComparisonTool."""
+
+    original_path: Path = Field(..., description="Path to the original DAG file")
+    fixed_path: Path = Field(..., description="Path to the fixed DAG file")
+    config: AirflowVersionConfig = Field(..., description="Airflow version configuration, shared by both runs")
+    dag_id: str | None = Field(None, description="DAG to compare (default: the original file's name)")
+    task_ids: list[str] | None = Field(None, description="Tasks to profile (default: every task both versions define)")
+    repetitions: int = Field(default=differential.DEFAULT_REPETITIONS, ge=differential.MIN_REPETITIONS, description="Measurements per metric and version")
+    max_regression_percent: float = Field(default=differential.DEFAULT_MAX_REGRESSION_PERCENT, description="Significant slowdown, in percent, beyond which the fix is rejected")
+    flame_graph_dir: Path | None = Field(None, description="Directory to write a differential flame graph per task to")
+
+
+class PerformanceComparisonTool(BaseTool):
+    """Before/after performance comparison of a DAG fix"""
+
+    name: str = "performance_comparison"
+    description: str = "Compare parse time, task runtime, peak RSS and hotspots of an original DAG and its fix in identical environments, and accept the fix only if nothing regresses"
+    args_schema: type[BaseModel] = PerformanceComparisonInput
+
+    def _run(
+        self,
+        original_path: Path,
+        fixed_path: Path,
+        config: AirflowVersionConfig,
+        dag_id: str | None = None,
+        task_ids: list[str] | None = None,
+        repetitions: int = differential.DEFAULT_REPETITIONS,
+        max_regression_percent: float = differential.DEFAULT_MAX_REGRESSION_PERCENT,
+        flame_graph_dir: Path | None = None,
+    ) -> dict[str, Any]:
+        try:
+            result = differential.compare_versions(original_path, fixed_path, config, dag_id, task_ids, repetitions, max_regression_percent, flame_graph_dir=flame_graph_dir)
+            return {"success": True, **result}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
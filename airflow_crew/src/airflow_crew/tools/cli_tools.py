@@ -4,7 +4,9 @@ from typing import Any
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
-from airflow_crew.tools.support.docker_manager import AirflowVersionConfig, DockerEnvironmentManager
+from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+from airflow_crew.tools.support.environment import get_environment_manager
+from airflow_crew.tools.support.task_runner import DEFAULT_CONCURRENCY, DEFAULT_LOGICAL_DATE, run_task_graph
 
 
 class CLIOperationsInput(BaseModel):
@@ -24,16 +26,16 @@ class CLIOperationsTool(BaseTool):
 
     def __init__(self):
         super().__init__()
-        self.docker_manager = DockerEnvironmentManager()
+        self.environment = get_environment_manager()
 
     def _run(self, command: str, config: AirflowVersionConfig, dag_path: Path) -> dict[str, Any]:
         try:
             # Create container if not exists
-            if not self.docker_manager.container:
-                self.docker_manager.create_container(config, dag_path)
+            if not self.environment.container:
+                self.environment.create_container(config, dag_path)
 
             # Execute command
-            exit_code, output = self.docker_manager.execute_command(command.split())
+            exit_code, output = self.environment.execute_command(command.split())
 
             return {"success": exit_code == 0, "output": output, "error": None if exit_code == 0 else output}
 
@@ -42,7 +44,40 @@ class CLIOperationsTool(BaseTool):
 
     def cleanup(self):
         """Cleanup Docker resources"""
-        self.docker_manager.cleanup()
+        self.environment.cleanup()
+
+
+class DagTestingInput(BaseModel):
+    """Input schema for DagTestingTool."""
+
+    config: AirflowVersionConfig = Field(..., description="Airflow version configuration")
+    dag_path: Path = Field(..., description="Path to DAG file")
+    dag_id: str | None = Field(None, description="DAG to run (default: the DAG file's name)")
+    logical_date: str = Field(DEFAULT_LOGICAL_DATE, description="Logical date for every task run")
+    concurrency: int = Field(DEFAULT_CONCURRENCY, description="Maximum number of tasks run at once")
+
+
+class DagTestingTool(BaseTool):
+    """Runs every task of a DAG with ``airflow tasks test``, following its dependencies"""
+
+    name: str = "dag_testing"
+    description: str = "Run all tasks of a DAG in dependency order, independent branches in parallel, reporting per-task status, timing and XCom sizes"
+    args_schema: type[BaseModel] = DagTestingInput
+
+    def __init__(self):
+        super().__init__()
+        self.environment = get_environment_manager()
+
+    def _run(self, config: AirflowVersionConfig, dag_path: Path, dag_id: str | None = None, logical_date: str = DEFAULT_LOGICAL_DATE, concurrency: int = DEFAULT_CONCURRENCY) -> dict[str, Any]:
+        try:
+            self.environment.create_container(config, dag_path)
+            return run_task_graph(self.environment, dag_id or Path(dag_path).stem, logical_date=logical_date, concurrency=concurrency)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def cleanup(self):
+        """Cleanup Docker resources"""
+        self.environment.cleanup()
 
 
 class EnvironmentSetupInput(BaseModel):
@@ -4,7 +4,8 @@ from typing import Any
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
-from airflow_crew.tools.support.docker_manager import AirflowVersionConfig, DockerEnvironmentManager
+from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+from airflow_crew.tools.support.environment import get_environment_manager
 
 
 class EnvironmentSetupInput(BaseModel):
@@ -23,16 +24,16 @@ class EnvironmentSetupTool(BaseTool):
 
     def __init__(self):
         super().__init__()
-        self.docker_manager = DockerEnvironmentManager()
+        self.environment = get_environment_manager()
 
     def _run(self, config: AirflowVersionConfig, dag_path: Path | None = None) -> dict[str, Any]:
         """Setup Docker environment with specified configuration"""
         try:
             # Create container
-            container = self.docker_manager.create_container(config, dag_path)
+            container = self.environment.create_container(config, dag_path)
 
             # Verify Airflow installation
-            exit_code, version_output = self.docker_manager.execute_command(["airflow", "version"])
+            exit_code, version_output = self.environment.execute_command(["airflow", "version"])
 
             if exit_code != 0:
                 return {"success": False, "error": f"Failed to verify Airflow installation: {version_output}"}
@@ -40,7 +41,7 @@ class EnvironmentSetupTool(BaseTool):
             # Verify providers installation if specified
             provider_status = {}
             for provider in config.providers:
-                exit_code, provider_output = self.docker_manager.execute_command(["pip", "show", f"apache-airflow-providers-{provider}"])
+                exit_code, provider_output = self.environment.execute_command(["pip", "show", f"apache-airflow-providers-{provider}"])
                 provider_status[provider] = {"installed": exit_code == 0, "details": provider_output if exit_code == 0 else None, "error": provider_output if exit_code != 0 else None}
 
             return {"success": True, "container_id": container.id, "airflow_version": version_output.strip(), "providers": provider_status}
@@ -50,4 +51,4 @@ class EnvironmentSetupTool(BaseTool):
 
     def cleanup(self):
         """Cleanup Docker resources"""
-        self.docker_manager.cleanup()
+        self.environment.cleanup()
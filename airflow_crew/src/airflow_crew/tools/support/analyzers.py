@@ -1,136 +1,115 @@
 """DAG Analysis Tools"""
 
 import ast
-import os
+import hashlib
+import json
 from typing import Any
 
-import yaml
-from airflow_crew.tools.support import scoring
-
-# Load provider mappings
-current_dir = os.path.dirname(os.path.abspath(__file__))
-provider_mappings_path = os.path.join(current_dir, "provider_mappings.yaml")
-with open(provider_mappings_path) as f:
-    PROVIDER_MAPPINGS = yaml.safe_load(f)
+from airflow_crew.tools.support import module_index, parse_time, scoring, statement_profiler, task_graph
+from airflow_crew.tools.support.cache import content_key, get_default_cache
+from airflow_crew.tools.support.rules import SCOPE_NODES, Rule, RuleContext, run_rules
+
+# Bump whenever a rule, the scoring or the shape of the analysis result changes, so cached results are invalidated
+RULESET_VERSION = "7"
+# Calls whose result is a DataFrame (pandas, polars, Spark-to-pandas, DB-API and hook helpers)
+DATAFRAME_CALLS = frozenset({"DataFrame", "concat", "merge", "get_pandas_df", "get_df", "to_pandas", "toPandas", "fetch_pandas_all", "fetch_arrow_all"})
+# Module aliases whose ``read_*`` functions and capitalized constructors produce DataFrames
+DATAFRAME_MODULES = frozenset({"pd", "pandas", "pl", "polars"})
+# DataFrame methods that reduce it to a scalar, so their result is small
+SCALAR_METHODS = frozenset({"sum", "mean", "median", "count", "min", "max", "nunique", "item", "any", "all"})
+# Calls that return a whole file's contents
+FILE_READ_CALLS = frozenset({"read", "read_text", "read_bytes", "readlines"})
+# Modules whose ``load`` deserializes a whole file
+FILE_LOAD_MODULES = frozenset({"json", "pickle", "joblib", "numpy", "np"})
+# Calls that return every row of a query
+QUERY_CALLS = frozenset({"fetchall", "get_records", "fetch_all"})
+# Kinds of likely-large XCom values, as named in issue messages
+XCOM_KINDS = {"dataframe": "a DataFrame", "loop_list": "a collection built in a loop", "file_contents": "file contents", "query_results": "query results"}
+
+_analysis_fingerprint: str | None = None
+
+
+def analysis_fingerprint(import_costs: parse_time.ImportCostTable | None = None) -> str:
+    """Hash of everything besides the DAG source that determines a static analysis result with ``import_costs`` (the local table by default)."""
+    global _analysis_fingerprint
+    if _analysis_fingerprint is None:
+        payload = json.dumps({"ruleset": RULESET_VERSION, "modules": module_index.get_module_index().digest, "scoring": scoring.SCORING_MATRIX}, sort_keys=True, default=str)
+        _analysis_fingerprint = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    # The import-cost table can grow while the process runs, so it is not memoized
+    return f"{_analysis_fingerprint}-{(import_costs or parse_time.get_default_table()).digest}"
 
 
 def get_stdlib_modules() -> set[str]:
     """Get set of Python standard library module names."""
-    return {
-        "datetime",
-        "time",
-        "json",
-        "os",
-        "sys",
-        "logging",
-        "re",
-        "pathlib",
-        "collections",
-        "itertools",
-        "functools",
-        "typing",
-        "abc",
-        "copy",
-        "contextlib",
-        "warnings",
-        "tempfile",
-        "shutil",
-        "random",
-        "uuid",
-        "hashlib",
-        "base64",
-        "urllib",
-        "http",
-        "email",
-        "xml",
-        "html",
-        "csv",
-        "sqlite3",
-        "pickle",
-        "gzip",
-        "zipfile",
-        "tarfile",
-        "configparser",
-    }
+    return set(module_index.stdlib_modules())
 
 
 def get_trusted_modules() -> set[str]:
     """Get set of trusted module names that shouldn't be flagged as third-party."""
-    return {"airflow", "astronomer"}
+    return set(module_index.TRUSTED_MODULES)
 
 
 def get_database_access_modules() -> set[str]:
     """Get set of modules that indicate direct database access."""
-    return {
-        "sqlalchemy",
-        "sqlalchemy.orm",
-        "sqlalchemy.sql",
-        "sqlalchemy.engine",
-        "sqlalchemy.ext",
-        "sqlalchemy.dialects",
-        "sqlalchemy.pool",
-        "sqlalchemy.func",
-        "func",
-        "orm",
-        "Session",
-        "sqlalchemy.orm.session",
-        "sqlalchemy.orm.query",
-        "sqlalchemy.sql.expression",
-        "sqlalchemy.engine.create",
-        "pymysql",
-        "psycopg2",
-        "mysql.connector",
-        "airflow.utils.db",
-        "airflow.utils.db_cleanup",
-        "airflow.utils.session",
-        "airflow.utils.sqlalchemy",
-        "provide_session",
-        "NEW_SESSION",
-    }
+    return set(module_index.DATABASE_ACCESS_MODULES)
 
 
-class ImportAnalyzer(ast.NodeVisitor):
-    """AST visitor to analyze imports in Python code."""
+class ImportAnalyzer(Rule):
+    """Rule that categorizes imports and flags direct database access."""
+
+    name = "imports"
 
     def __init__(self):
-        self.imports = {"stdlib": set(), "trusted": set(), "third_party": set(), "top_level": set()}
+        self.imports = {"stdlib": set(), "trusted": set(), "third_party": set(), "top_level": set(), "parse_time": set()}
         self.issues = []
-        self.stdlib_modules = get_stdlib_modules()
-        self.trusted_modules = get_trusted_modules()
-        self.db_modules = get_database_access_modules()
+        self.modules = module_index.get_module_index()
 
-    def visit_Import(self, node):
+    def visit_Import(self, node: ast.Import, ctx: RuleContext):
         """Process Import nodes."""
         for name in node.names:
-            self._process_import(name.name, node)
+            self._process_import(name.name, node, ctx)
 
-    def visit_ImportFrom(self, node):
+    def visit_ImportFrom(self, node: ast.ImportFrom, ctx: RuleContext):
         """Process ImportFrom nodes."""
         if node.module:
-            self._process_import(node.module, node)
+            self._process_import(node.module, node, ctx)
 
-    def _process_import(self, name: str, node: ast.AST):
+    def _process_import(self, name: str, node: ast.AST, ctx: RuleContext):
         """Process an import and categorize it."""
-        base_module = name.split(".")[0]
-
-        if base_module in self.stdlib_modules:
+        if name in self.modules.stdlib:
             self.imports["stdlib"].add(name)
-        elif base_module in self.trusted_modules:
+        elif name in self.modules.trusted:
             self.imports["trusted"].add(name)
         else:
             self.imports["third_party"].add(name)
 
         # Check for top-level imports
-        if isinstance(node, ast.Import) and not isinstance(node.parent, ast.FunctionDef | ast.ClassDef):
+        if isinstance(node, ast.Import) and ctx.at_module_level:
             self.imports["top_level"].add(name)
 
+        # Absolute imports executed every time the scheduler parses the file (module and class bodies)
+        if ctx.runs_at_import and not getattr(node, "level", 0):
+            self.imports["parse_time"].add(name)
+
         # Check for database access
-        if name in self.db_modules:
+        if name in self.modules.db:
             self.issues.append({"type": "direct_db_access", "message": f"Direct database access detected: {name}", "line": node.lineno})
 
+    def result(self) -> dict[str, Any]:
+        """Return categorized imports and import issues."""
+        return {"imports": self.imports, "issues": self.issues}
+
+    def merge(self, partial: dict[str, Any]):
+        """Fold in imports and issues found in another part of the module."""
+        for category, names in partial["imports"].items():
+            self.imports[category].update(names)
+        self.issues.extend(partial["issues"])
 
-class TopLevelCodeAnalyzer(ast.NodeVisitor):
-    """AST visitor to analyze top-level code patterns."""
+
+class TopLevelCodeAnalyzer(Rule):
+    """Rule that flags database operations executed when the DAG file is parsed."""
+
+    name = "top_level_code"
 
     def __init__(self):
         self.issues = {"imports": [], "api_calls": [], "db_operations": [], "airflow_vars": [], "dynamic_dates": []}
@@ -159,8 +138,10 @@ class TopLevelCodeAnalyzer(ast.NodeVisitor):
             "db_functions": {"run_cleanup", "purge_table", "resetdb", "initdb", "upgradedb", "check_migrations", "reflect_tables", "provide_session", "NEW_SESSION"},
         }
 
-    def visit_Call(self, node):
+    def visit_Call(self, node: ast.Call, ctx: RuleContext):
         """Analyze function/method calls."""
+        if not ctx.runs_at_import:
+            return
         if isinstance(node.func, ast.Name):
             func_name = node.func.id
             if func_name in self.sqlalchemy_patterns["methods"]:
@@ -170,38 +151,285 @@ class TopLevelCodeAnalyzer(ast.NodeVisitor):
                 if node.func.value.id in self.sqlalchemy_patterns["modules"]:
                     self.issues["db_operations"].append({"type": "db_operation", "message": f"Database operation at top level: {node.func.value.id}.{node.func.attr}", "line": node.lineno})
 
+    def result(self) -> dict[str, list[dict[str, Any]]]:
+        """Return top-level code issues grouped by kind."""
+        return self.issues
+
+    def merge(self, partial: dict[str, list[dict[str, Any]]]):
+        """Fold in top-level code issues found in another part of the module."""
+        for kind, issues in partial.items():
+            self.issues[kind].extend(issues)
+
+
+def _dotted(node: ast.expr) -> str:
+    """``a.b.c`` for a name or attribute chain, empty otherwise."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return ""
+
+
+def _function_nodes(function: ast.FunctionDef | ast.AsyncFunctionDef):
+    """Nodes of a function body, each with whether it sits in a loop; nested functions, lambdas and classes are not entered."""
+    stack = [(statement, False) for statement in reversed(function.body)]
+    while stack:
+        node, in_loop = stack.pop()
+        yield node, in_loop
+        if isinstance(node, SCOPE_NODES):
+            continue
+        loop = in_loop or isinstance(node, ast.For | ast.AsyncFor | ast.While | ast.comprehension)
+        stack.extend((child, loop) for child in reversed(list(ast.iter_child_nodes(node))))
+
+
+def _xcom_push_value(call: ast.Call) -> ast.expr | None:
+    """Value argument of an ``xcom_push(key, value)`` call."""
+    return next((keyword.value for keyword in call.keywords if keyword.arg == "value"), call.args[1] if len(call.args) > 1 else None)
+
+
+def _xcom_values(function: ast.FunctionDef | ast.AsyncFunctionDef) -> tuple[dict[str, list[ast.expr]], set[str], list, list]:
+    """Walk a function body once, collecting what ``XComAnalyzer`` needs.
+
+    Returns the values assigned to each local name, the names grown in a loop,
+    and the ``(statement, value)`` pairs of its returns and ``xcom_push`` calls.
+    """
+    assigned: dict[str, list[ast.expr]] = {}
+    grown: set[str] = set()
+    returns, pushes = [], []
+    for child, in_loop in _function_nodes(function):
+        if isinstance(child, ast.Assign | ast.AnnAssign) and child.value is not None:
+            targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+            for target in (target for target in targets if isinstance(target, ast.Name)):
+                assigned.setdefault(target.id, []).append(child.value)
+        elif isinstance(child, ast.AugAssign) and in_loop and isinstance(child.target, ast.Name):
+            grown.add(child.target.id)
+        elif isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute):
+            if in_loop and child.func.attr in ("append", "extend", "update", "add") and isinstance(child.func.value, ast.Name):
+                grown.add(child.func.value.id)
+            elif child.func.attr == "xcom_push" and (value := _xcom_push_value(child)) is not None:
+                pushes.append((child, value))
+        elif isinstance(child, ast.Return) and child.value is not None:
+            returns.append((child, child.value))
+    return assigned, grown, returns, pushes
+
+
+class XComAnalyzer(Rule):
+    """Rule that flags TaskFlow returns and ``xcom_push`` calls of values likely too large for the metadata DB."""
+
+    name = "xcom"
+
+    def __init__(self):
+        self.issues = []
+
+    def visit_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef, ctx: RuleContext):
+        """Check what a function returns (if it is a TaskFlow task) and pushes to XCom."""
+        assigned, grown, returns, pushes = _xcom_values(node)
+        candidates = pushes + (returns if self._pushes_return_value(node) else [])
+        for statement, value in sorted(candidates, key=lambda candidate: candidate[0].lineno):
+            kind = self._classify(value, assigned, grown)
+            if kind:
+                verb = "pushes" if isinstance(statement, ast.Call) else "returns"
+                self.issues.append({
+                    "type": "large_xcom",
+                    "message": f"{node.name} {verb} {XCOM_KINDS[kind]} through XCom",
+                    "line": statement.lineno,
+                    "task": node.name,
+                    "kind": kind,
+                    "recommendation": f"{node.name}: write {XCOM_KINDS[kind]} to object storage or a table and pass its location through XCom, or use an object-storage XCom backend",
+                })
+                break
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _pushes_return_value(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> bool:
+        """Whether ``node`` is a TaskFlow task whose return value goes to XCom."""
+        for decorator in node.decorator_list:
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            if "task" in _dotted(target).split("."):
+                keywords = decorator.keywords if isinstance(decorator, ast.Call) else []
+                return not any(keyword.arg == "do_xcom_push" and isinstance(keyword.value, ast.Constant) and not keyword.value.value for keyword in keywords)
+        return False
+
+    def _classify(self, node: ast.expr, assigned: dict[str, list[ast.expr]], grown: set[str], depth: int = 0) -> str | None:
+        """Kind of likely-large value ``node`` evaluates to (a key of ``XCOM_KINDS``), or None."""
+        if depth > 4:
+            return None
+        if isinstance(node, ast.Name):
+            if node.id in grown:
+                return "loop_list"
+            return next((kind for value in assigned.get(node.id, []) if (kind := self._classify(value, assigned, grown, depth + 1))), None)
+        if isinstance(node, ast.ListComp | ast.SetComp | ast.DictComp):
+            return "loop_list"
+        if isinstance(node, ast.Subscript | ast.Attribute):
+            kind = self._classify(node.value, assigned, grown, depth + 1)
+            return kind if kind == "dataframe" else None
+        if isinstance(node, ast.Call):
+            return self._classify_call(node, assigned, grown, depth)
+        return None
+
+    def _classify_call(self, node: ast.Call, assigned: dict[str, list[ast.expr]], grown: set[str], depth: int) -> str | None:
+        """Kind of likely-large value a call returns, judged by the called name or the object a method is called on."""
+        name = _dotted(node.func)
+        parts = name.split(".") if name else []
+        last = parts[-1] if parts else (node.func.attr if isinstance(node.func, ast.Attribute) else "")
+        if last in DATAFRAME_CALLS or (len(parts) == 2 and parts[0] in DATAFRAME_MODULES and (last.startswith("read_") or last[:1].isupper())):
+            return "dataframe"
+        if last in FILE_READ_CALLS or (len(parts) == 2 and parts[0] in FILE_LOAD_MODULES and last == "load"):
+            return "file_contents"
+        if last in QUERY_CALLS:
+            return "query_results"
+        if isinstance(node.func, ast.Attribute) and last not in SCALAR_METHODS:
+            # A method called on a DataFrame (``df.dropna()``, ``df.to_dict()``) still carries its data
+            kind = self._classify(node.func.value, assigned, grown, depth + 1)
+            return kind if kind == "dataframe" else None
+        return None
+
+    def result(self) -> dict[str, Any]:
+        """Return the XCom issues found."""
+        return {"issues": self.issues}
+
+    def merge(self, partial: dict[str, Any]):
+        """Fold in XCom issues found in another part of the module."""
+        self.issues.extend(partial["issues"])
+
+
+class DependencyAnalyzer(Rule):
+    """Rule that collects ``>>``/``<<`` task dependency expressions."""
+
+    name = "dependencies"
+
+    def __init__(self):
+        self.dependencies = []
+
+    def visit_BinOp(self, node: ast.BinOp, ctx: RuleContext):
+        """Record bitshift operators used to chain tasks."""
+        if isinstance(node.op, ast.RShift | ast.LShift):
+            self.dependencies.append({"from": node.left, "to": node.right, "type": ">>" if isinstance(node.op, ast.RShift) else "<<"})
+
+    def result(self) -> dict[str, Any]:
+        """Return the dependency expressions found."""
+        return {"dependencies": self.dependencies}
+
+    def merge(self, partial: dict[str, Any]):
+        """Fold in dependency expressions found in another part of the module."""
+        self.dependencies.extend(partial["dependencies"])
+
+
+def get_default_rules() -> list[Rule]:
+    """Create fresh instances of the rules run by ``analyze_dag``."""
+    return [ImportAnalyzer(), DependencyAnalyzer(), TopLevelCodeAnalyzer(), XComAnalyzer(), task_graph.TaskGraphAnalyzer()]
+
+
+def run_static_rules(code: str) -> dict[str, Any]:
+    """Parse ``code`` once and run every default rule in a single traversal."""
+    return run_rules(ast.parse(code), get_default_rules())
+
 
 def analyze_imports_ast(source_code: str) -> dict[str, Any]:
     """Analyze imports using AST."""
-    tree = ast.parse(source_code)
-    analyzer = ImportAnalyzer()
-    analyzer.visit(tree)
-    return {"imports": analyzer.imports, "issues": analyzer.issues}
+    return run_rules(ast.parse(source_code), [ImportAnalyzer()])["imports"]
 
 
 def find_provider_for_package(package: str) -> str | None:
-    """Find Airflow provider that could replace a third-party package."""
-    return PROVIDER_MAPPINGS.get(package)
+    """Find Airflow provider that could replace a third-party package (or one of its submodules)."""
+    return module_index.get_module_index().providers.lookup(package)
 
 
 def analyze_missing_providers(imports: dict[str, set[str]]) -> list[dict[str, Any]]:
     """Analyze missing Airflow providers for third-party imports."""
     issues = []
-    for package in imports.get("third_party", set()):
+    for package in sorted(imports.get("third_party", set())):
         provider = find_provider_for_package(package)
         if provider:
             issues.append({"type": "missing_provider", "message": f"Consider using {provider} instead of {package}", "package": package, "provider": provider})
     return issues
 
 
+def analyze_parse_time(estimate: dict[str, Any]) -> list[dict[str, Any]]:
+    """Turn a parse-time estimate into a cost-weighted ``parse_time`` issue when it exceeds the budget, plus an unscored ``unmeasured_imports`` issue listing what it left out."""
+    issues = []
+    if unmeasured := estimate["unmeasured_modules"]:
+        issues.append({
+            "type": "unmeasured_imports",
+            "message": f"Parse-time estimate leaves out {len(unmeasured)} unmeasured imports: {', '.join(unmeasured[:5])}{', ...' if len(unmeasured) > 5 else ''}",
+            "modules": unmeasured,
+            "recommendation": f"Run measure_import_costs in the scheduler's environment to include {', '.join(unmeasured[:3])} in the parse-time estimate",
+        })
+    deduction = scoring.parse_time_deduction(estimate["estimated_ms"])
+    if not deduction:
+        return issues
+    heaviest = ", ".join(f"{entry['module']} ({entry['ms']:.0f} ms)" for entry in estimate["imports"][:3])
+    return issues + [
+        {
+            "type": "parse_time",
+            "message": f"Estimated parse time {estimate['estimated_ms']:.0f} ms (imports {estimate['import_ms']:.0f} ms, top-level code {estimate['top_level_code_ms']:.0f} ms)",
+            "estimated_ms": estimate["estimated_ms"],
+            "deduction": deduction,
+            "recommendation": f"Move heavy imports into task callables to cut scheduler parse time; heaviest: {heaviest}" if heaviest else "Move top-level work into task callables",
+        }
+    ]
+
+
+def analyze_task_graph(metrics: dict[str, Any]) -> list[dict[str, Any]]:
+    """Turn task-graph metrics into ``dependency_cycle`` and ``excessive_fan_in_out`` issues."""
+    issues = []
+    if metrics["has_cycle"]:
+        issues.append({
+            "type": "dependency_cycle",
+            "message": f"Cycle in task dependencies: {' >> '.join(metrics['cycle'] + metrics['cycle'][:1])}",
+            "recommendation": "Remove one of the dependencies in the cycle; Airflow refuses to load cyclic DAGs",
+        })
+    limit = scoring.SCORING_MATRIX["excessive_fan_in_out"]["max_degree"]
+    for key, direction in (("max_fan_in", "upstream"), ("max_fan_out", "downstream")):
+        widest = metrics[key]
+        if widest and widest["count"] > limit:
+            issues.append({
+                "type": "excessive_fan_in_out",
+                "message": f"Task {widest['task_id']} has {widest['count']} direct {direction} tasks",
+                "recommendation": "Group wide fan-in/fan-out behind a TaskGroup or use dynamic task mapping",
+            })
+    return issues
+
+
+def analyze_xcom_usage(tasks: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+    """Turn measured per-task XCom sizes and latencies into ``oversized_xcom`` and ``slow_xcom`` issues.
+
+    Args:
+        tasks (dict): Per task id, ``max_bytes`` of its largest pushed XCom and optionally ``push_ms``/``pull_ms`` summaries
+
+    Returns:
+        list: Issues, at most one of each type per task
+    """
+    max_bytes = scoring.SCORING_MATRIX["oversized_xcom"]["max_kb"] * 1024
+    max_ms = scoring.SCORING_MATRIX["slow_xcom"]["max_ms"]
+    issues = []
+    for task_id, xcom in tasks.items():
+        if xcom.get("max_bytes", 0) > max_bytes:
+            issues.append({
+                "type": "oversized_xcom",
+                "message": f"Task {task_id} pushed a {xcom['max_bytes'] / 1024:.0f} KB XCom to the metadata DB",
+                "task_id": task_id,
+                "bytes": xcom["max_bytes"],
+                "recommendation": f"Task {task_id}: keep XComs small; store the payload externally and push its location",
+            })
+        slowest = max((xcom[op]["max"] for op in ("push_ms", "pull_ms") if op in xcom), default=0.0)
+        if slowest > max_ms:
+            issues.append({
+                "type": "slow_xcom",
+                "message": f"Task {task_id} spent up to {slowest:.0f} ms on a single XCom push or pull",
+                "task_id": task_id,
+                "ms": slowest,
+                "recommendation": f"Task {task_id}: slow XCom operations usually mean large payloads or a contended metadata DB",
+            })
+    return issues
+
+
 def analyze_dependencies(dag_file_content: str) -> dict[str, Any]:
     """Analyze task dependency patterns."""
-    tree = ast.parse(dag_file_content)
-    deps = []
-    for node in ast.walk(tree):
-        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.RShift | ast.LShift):
-            deps.append({"from": node.left, "to": node.right, "type": ">>" if isinstance(node.op, ast.RShift) else "<<"})
-    return {"dependencies": deps}
+    return run_rules(ast.parse(dag_file_content), [DependencyAnalyzer()])["dependencies"]
 
 
 def analyze_task_complexity(task) -> dict[str, Any]:
@@ -236,10 +464,7 @@ def analyze_task_complexity(task) -> dict[str, Any]:
 
 def analyze_top_level_code_ast(dag_file_content: str) -> dict[str, list[dict[str, Any]]]:
     """Analyze potentially problematic top-level code using AST."""
-    tree = ast.parse(dag_file_content)
-    analyzer = TopLevelCodeAnalyzer()
-    analyzer.visit(tree)
-    return analyzer.issues
+    return run_rules(ast.parse(dag_file_content), [TopLevelCodeAnalyzer()])["top_level_code"]
 
 
 def analyze_dag_metadata(dag) -> dict[str, Any]:
@@ -258,48 +483,91 @@ def analyze_dag_metadata(dag) -> dict[str, Any]:
     }
 
 
-def analyze_dag(code: str, dag=None) -> dict[str, Any]:
+def analyze_dag(code: str, dag=None, use_cache: bool = True, dag_file: str | None = None, expand_tasks: bool = False, import_costs: parse_time.ImportCostTable | None = None) -> dict[str, Any]:
     """Perform complete DAG analysis and return structured results.
 
+    Static-only results are served from the on-disk analysis cache when the same
+    source was analyzed before with the same rules and provider mappings.
+
     Args:
         code (str): The DAG code to analyze
         dag (DAG, optional): DAG object for runtime analysis
+        use_cache (bool): Whether to read and populate the analysis cache
+        dag_file (str, optional): Path of the DAG file; when given, its top-level statements are executed and timed in a subprocess
+        expand_tasks (bool): Include per-task metrics and scores for runtime analysis, not just the aggregate summary
+        import_costs (ImportCostTable, optional): Import costs of the scheduler's environment for the parse-time
+            estimate, e.g. ``ImportCostTable.load(parse_time.environment_id(config, backend))`` (the local interpreter's by default)
 
     Returns:
         dict: Complete analysis results including score, color, and detailed analysis
     """
-    # Static code analysis
-    imports = analyze_imports_ast(code)
-    dependencies = analyze_dependencies(code)
-    top_level = analyze_top_level_code_ast(code)
+    cache = get_default_cache() if use_cache and dag is None else None
+    if cache is None:
+        result = _analyze_dag(code, dag, expand_tasks, import_costs)
+    else:
+        result = cache.get_or_compute(content_key(code, analysis_fingerprint(import_costs)), lambda: _analyze_dag(code, import_costs=import_costs))
+    if dag_file is not None:
+        result = attach_statement_profile(result, statement_profiler.profile_statements(dag_file))
+    return result
+
+
+def attach_statement_profile(result: dict[str, Any], profile: dict[str, Any]) -> dict[str, Any]:
+    """Copy of an ``analyze_dag`` result with a measured statement profile and its recommendations added."""
+    analysis = dict(result["analysis"])
+    analysis["statement_profile"] = profile
+    analysis["recommendations"] = analysis["recommendations"] + statement_profiler.slow_statement_recommendations(profile)
+    return {**result, "analysis": analysis}
+
+
+def _analyze_dag(code: str, dag=None, expand_tasks: bool = False, import_costs: parse_time.ImportCostTable | None = None) -> dict[str, Any]:
+    """Uncached implementation of ``analyze_dag``."""
+    # Static code analysis (single parse, single traversal)
+    return build_analysis(run_static_rules(code), dag, expand_tasks, import_costs)
+
+
+def build_analysis(static: dict[str, Any], dag=None, expand_tasks: bool = False, import_costs: parse_time.ImportCostTable | None = None) -> dict[str, Any]:
+    """Assemble the ``analyze_dag`` result from the default rules' findings and an optional DAG object.
+
+    Per-task ``task_metrics`` and ``task_scores`` are only included with ``expand_tasks``; otherwise the
+    prognosis carries an aggregate ``task_summary``.
+    """
+    imports = static["imports"]
+    dependencies = static["dependencies"]
+    top_level = static["top_level_code"]
     providers = analyze_missing_providers(imports["imports"])
+    parse_estimate = parse_time.estimate_parse_time(imports["imports"], top_level, import_costs)
+    parse_issues = analyze_parse_time(parse_estimate)
+    graph = task_graph.build_task_graph(static["task_graph"]["events"])
+    graph_metrics = graph.metrics()
+    graph_issues = analyze_task_graph(graph_metrics)
+    xcom_issues = static["xcom"]["issues"]
 
     # Build recommendations
     recommendations: list[str] = []
-    for issue in imports["issues"] + providers:
+    for issue in imports["issues"] + providers + parse_issues + graph_issues + xcom_issues:
         if "recommendation" in issue:
             recommendations.append(issue["recommendation"])
 
     analysis = {
         "summary": "DAG code analysis completed with the following findings:",
         "imports": imports["imports"],
-        "issues": imports["issues"] + providers,
+        "issues": imports["issues"] + providers + parse_issues + graph_issues + xcom_issues,
         "dependencies": dependencies["dependencies"],
+        "task_graph": {**graph.to_dict(), "metrics": graph_metrics},
         "top_level_code": top_level,
+        "parse_time": parse_estimate,
         "recommendations": recommendations,
     }
 
     # Runtime analysis if DAG provided
     if dag:
         metadata = analyze_dag_metadata(dag)
-        task_metrics = {}
-        for task in dag.tasks:
-            task_metrics[task.task_id] = analyze_task_complexity(task)
-
-        analysis.update({"metadata": metadata, "task_metrics": task_metrics})
+        analysis["metadata"] = metadata
 
-        # Calculate DAG prognosis
-        dag_prognosis = scoring.calculate_dag_prognosis(dag)
+        # Calculate DAG prognosis (task attributes are collected once, in columns)
+        dag_prognosis = scoring.calculate_dag_prognosis(dag, expand_tasks=expand_tasks)
+        if expand_tasks:
+            analysis["task_metrics"] = dag_prognosis.pop("task_metrics")
         analysis["dag_prognosis"] = dag_prognosis
         # Use DAG prognosis score if available
         score = dag_prognosis["score"]
@@ -313,3 +581,18 @@ def analyze_dag(code: str, dag=None) -> dict[str, Any]:
     color = "green" if score >= 80 else "yellow" if score >= 60 else "red"
 
     return {"score": score, "color": color, "analysis": analysis}
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert an analysis result into JSON-serializable data (sets become sorted lists, AST nodes source text)."""
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, set | frozenset):
+        return sorted(to_jsonable(item) for item in value)
+    if isinstance(value, ast.AST):
+        return ast.unparse(value)
+    if value is None or isinstance(value, str | int | float | bool):
+        return value
+    return str(value)
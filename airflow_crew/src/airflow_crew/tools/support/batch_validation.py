@@ -0,0 +1,197 @@
+"""Batch Validation of a DAGs Folder in One Airflow Process"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+from airflow_crew.tools.support import analyzers
+from airflow_crew.tools.support.task_columns import DEFAULTS
+
+if TYPE_CHECKING:
+    from airflow_crew.tools.support.environment import EnvironmentManager
+
+# Seconds the whole DagBag pass may take
+BATCH_TIMEOUT = 1800
+# Files listed in the summary, slowest first
+SLOWEST_FILES = 10
+RESULT_MARKER = "__AIRFLOW_CREW_DAGBAG__"
+# Task attributes captured per task: everything runtime scoring reads
+TASK_FIELDS = ("task_id", *DEFAULTS)
+
+# Executed with ``python -c`` in the environment. Airflow is imported once and every
+# file goes through the same DagBag, so only the first file pays for the imports the
+# fleet shares. DAGs are sent back as plain attributes, since airflow_crew itself is
+# not installed next to Airflow; task attributes travel as one list per field.
+BATCH_SCRIPT = """
+import json, sys, time
+from datetime import timedelta
+start = time.perf_counter()
+from airflow.models.dagbag import DagBag
+from airflow.utils.file import list_py_file_paths
+airflow_import = time.perf_counter() - start
+folder, fields = sys.argv[1].rstrip("/"), json.loads(sys.argv[2])
+def plain(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [plain(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): plain(item) for key, item in value.items()}
+    return str(value)
+def text(value):
+    return str(value) if value else None
+def snapshot(dag):
+    tasks = dag.tasks
+    return {
+        "dag_id": dag.dag_id,
+        "schedule_interval": str(getattr(dag, "schedule_interval", None)),
+        "start_date": text(dag.start_date),
+        "end_date": text(dag.end_date),
+        "catchup": dag.catchup,
+        "tags": sorted(dag.tags or []),
+        "default_args": plain(dag.default_args or {}),
+        "concurrency": getattr(dag, "max_active_tasks", None) or getattr(dag, "concurrency", None),
+        "max_active_runs": dag.max_active_runs,
+        "dagrun_timeout": text(dag.dagrun_timeout),
+        "description": dag.description,
+        "doc_md": dag.doc_md,
+        "tasks": {field: [plain(getattr(task, field, None)) for task in tasks] for field in fields},
+    }
+start = time.perf_counter()
+bag = DagBag(dag_folder=folder, include_examples=False, collect_dags=False)
+files = []
+for path in list_py_file_paths(folder, include_examples=False):
+    file_start = time.perf_counter()
+    try:
+        dags = bag.process_file(path, only_if_updated=False)
+        error = bag.import_errors.get(path)
+    except Exception as e:
+        dags, error = [], f"{type(e).__name__}: {e}"
+    load_seconds = time.perf_counter() - file_start
+    snapshots = []
+    for dag in dags:
+        try:
+            snapshots.append(snapshot(dag))
+        except Exception as e:
+            error = error or f"Could not read DAG {dag.dag_id}: {type(e).__name__}: {e}"
+    files.append({"file": path[len(folder) + 1:], "load_seconds": load_seconds, "import_error": error, "dags": snapshots})
+print(MARKER + json.dumps({"airflow_import_seconds": airflow_import, "dagbag_seconds": time.perf_counter() - start, "files": files}))
+"""
+
+
+class DagSnapshot:
+    """DAG attributes captured by ``BATCH_SCRIPT``, standing in for the DAG object in runtime analysis"""
+
+    def __init__(self, data: dict[str, Any]):
+        data = dict(data)
+        columns = data.pop("tasks")
+        self.__dict__.update(data)
+        self.tasks = [SimpleNamespace(**dict(zip(columns, values, strict=True))) for values in zip(*columns.values(), strict=True)]
+
+
+def load_dagbag(environment: "EnvironmentManager", dags_folder: str, timeout: float = BATCH_TIMEOUT) -> dict[str, Any]:
+    """Load every DAG file under ``dags_folder`` in one interpreter of ``environment`` and return the raw results."""
+    script = BATCH_SCRIPT.replace("MARKER", repr(RESULT_MARKER))
+    result = environment.stream_command(["python", "-c", script, dags_folder, json.dumps(TASK_FIELDS)], timeout=timeout)
+    raw = next((json.loads(line[len(RESULT_MARKER) :]) for line in reversed(result.stdout.splitlines()) if line.startswith(RESULT_MARKER)), None)
+    if raw is None:
+        reason = "timed out" if result.timed_out else f"exited with {result.exit_code}"
+        raise RuntimeError(f"DagBag validation {reason}: {result.output[-2000:].strip()}")
+    return raw
+
+
+def analyze_file(code: str | None, dags: list[dict[str, Any]], expand_tasks: bool = False) -> dict[str, Any]:
+    """``analyze_dag`` results per DAG id for one file, static rules run once and shared by the file's DAGs."""
+    if code is None:
+        return {}
+    static = analyzers.run_static_rules(code)
+    return {dag["dag_id"]: analyzers.to_jsonable(analyzers.build_analysis(static, DagSnapshot(dag), expand_tasks)) for dag in dags}
+
+
+def validate_dags(environment: "EnvironmentManager", dags_dir: Path | str, timeout: float = BATCH_TIMEOUT, expand_tasks: bool = False) -> dict[str, Any]:
+    """Validate a whole DAGs folder with a single DagBag pass in ``environment``.
+
+    The folder is copied into a fresh environment and loaded in one Airflow
+    process, so Airflow's start-up and shared imports are paid once for the
+    whole fleet rather than per file. The DAGs found are scored by
+    ``analyze_dag`` on this side, against the source files in ``dags_dir``.
+
+    Args:
+        environment (EnvironmentManager): Environment with ``create_container`` already called on ``dags_dir``
+        dags_dir (Path): Local DAGs folder, to read the sources for static analysis
+        timeout (float): Seconds the DagBag pass may take
+        expand_tasks (bool): Include per-task metrics and scores in each analysis
+
+    Returns:
+        dict: Airflow import and DagBag times, per-file import errors, load times, task counts and analyses, and fleet totals
+    """
+    raw = load_dagbag(environment, environment.dags_folder, timeout)
+    dags_dir = Path(dags_dir)
+    files = []
+    for entry in raw["files"]:
+        source = dags_dir / entry["file"]
+        code = source.read_text(errors="replace") if source.is_file() else None
+        files.append({
+            "file": entry["file"],
+            "load_seconds": round(entry["load_seconds"], 4),
+            "import_error": entry["import_error"],
+            "dag_ids": [dag["dag_id"] for dag in entry["dags"]],
+            "task_count": sum(len(dag["tasks"]["task_id"]) for dag in entry["dags"]),
+            "dags": analyze_file(code, entry["dags"], expand_tasks),
+        })
+
+    slowest = sorted(files, key=lambda item: item["load_seconds"], reverse=True)[:SLOWEST_FILES]
+    return {
+        "dags_folder": str(dags_dir),
+        "airflow_import_seconds": round(raw["airflow_import_seconds"], 3),
+        "dagbag_seconds": round(raw["dagbag_seconds"], 3),
+        "files": files,
+        "summary": {
+            "files": len(files),
+            "dags": sum(len(item["dag_ids"]) for item in files),
+            "tasks": sum(item["task_count"] for item in files),
+            "import_errors": sum(1 for item in files if item["import_error"]),
+            "load_seconds": round(sum(item["load_seconds"] for item in files), 3),
+            "slowest_files": [{"file": item["file"], "load_seconds": item["load_seconds"]} for item in slowest],
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    """Command-line entry point: write the validation document to stdout (or a file) and a one-line summary to stderr."""
+    from airflow_crew.tools.support.environment import add_environment_arguments, config_from_arguments, get_environment_manager
+
+    parser = argparse.ArgumentParser(description="Load a whole DAGs folder in one Airflow process and report import errors, load times and analyses.")
+    parser.add_argument("dags_dir", type=Path, help="DAGs folder to validate")
+    add_environment_arguments(parser)
+    parser.add_argument("--timeout", type=float, default=BATCH_TIMEOUT, help=f"Seconds the DagBag pass may take (default: {BATCH_TIMEOUT})")
+    parser.add_argument("--expand-tasks", action="store_true", help="Include per-task metrics and scores")
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON document here instead of stdout")
+    args = parser.parse_args(argv)
+    if not args.dags_dir.is_dir():
+        parser.error(f"not a directory: {args.dags_dir}")
+
+    config = config_from_arguments(args)
+    environment = get_environment_manager(args.backend)
+    start = time.monotonic()
+    try:
+        environment.create_container(config, args.dags_dir)
+        document = validate_dags(environment, args.dags_dir, timeout=args.timeout, expand_tasks=args.expand_tasks)
+    finally:
+        environment.cleanup()
+    summary = document["summary"]
+    summary["wall_seconds"] = round(time.monotonic() - start, 3)
+
+    text = json.dumps(document, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    print(f"{summary['files']} files, {summary['dags']} DAGs, {summary['tasks']} tasks, {summary['import_errors']} import errors in {summary['wall_seconds']}s", file=sys.stderr)
+    return document
@@ -0,0 +1,190 @@
+"""Content-addressed On-disk Cache for Analysis Results"""
+
+import contextlib
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("AIRFLOW_CREW_CACHE_DIR", Path.home() / ".cache" / "airflow_crew"))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("AIRFLOW_CREW_CACHE_MAX_MB", "256")) * 1024 * 1024)
+# Fraction of ``max_bytes`` kept after an eviction pass, so eviction does not run on every write
+EVICTION_LOW_WATER = 0.8
+
+
+def content_key(content: str | bytes, fingerprint: str = "") -> str:
+    """Hash ``content`` together with a fingerprint of everything else that affects the result."""
+    if isinstance(content, str):
+        content = content.encode()
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(fingerprint.encode())
+    digest.update(b"\0")
+    digest.update(content)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Size-bounded LRU cache of pickled results shared by every process using ``root``.
+
+    Entries are written to a temporary file and atomically renamed into place, so
+    concurrent readers never see partial data and concurrent writers of the same
+    key simply race to store identical results. A hit touches the entry's mtime,
+    which is the recency signal used for eviction. Eviction is serialized across
+    processes with an advisory lock where the platform supports it.
+    """
+
+    def __init__(self, root: Path | str = DEFAULT_CACHE_DIR, namespace: str = "analysis", max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root) / namespace
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._approx_bytes: int | None = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for ``key`` or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            value = pickle.loads(data)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Corrupt or incompatible entry: drop it and recompute
+            with contextlib.suppress(OSError):
+                path.unlink()
+            self.misses += 1
+            return None
+
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        """Store ``value`` under ``key``, evicting least recently used entries if needed."""
+        path = self._path(key)
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # A read-only or full cache directory must never break analysis
+            if tmp_path:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_path)
+            return
+
+        self.writes += 1
+        if self._approx_bytes is None:
+            self._approx_bytes = self.size_bytes()
+        else:
+            self._approx_bytes += len(data)
+        if self._approx_bytes > self.max_bytes:
+            self.evict()
+
+    def get_or_compute(self, key: str, compute) -> Any:
+        """Return the cached value for ``key``, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.root.glob("*/*.pkl"):
+            with contextlib.suppress(OSError):
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size_bytes(self) -> int:
+        """Total size of all entries currently on disk."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache is below its low-water mark."""
+        with self._lock() as acquired:
+            if not acquired:
+                # Another process is already evicting
+                self._approx_bytes = None
+                return
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * EVICTION_LOW_WATER
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+                    self.evictions += 1
+                total -= size
+            self._approx_bytes = total
+
+    @contextlib.contextmanager
+    def _lock(self):
+        if fcntl is None:
+            yield True
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def clear(self):
+        """Remove every entry."""
+        for _, _, path in self._entries():
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+        self._approx_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters for this process."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "max_bytes": self.max_bytes,
+            "root": str(self.root),
+        }
+
+
+_default_cache: AnalysisCache | None = None
+
+
+def get_default_cache() -> AnalysisCache | None:
+    """Process-wide analysis cache, or None when disabled via ``AIRFLOW_CREW_CACHE=0``."""
+    global _default_cache
+    if os.environ.get("AIRFLOW_CREW_CACHE", "1") == "0":
+        return None
+    if _default_cache is None:
+        _default_cache = AnalysisCache()
+    return _default_cache
@@ -0,0 +1,300 @@
+"""Shared Pool of Warm Airflow Containers"""
+
+import atexit
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+import docker
+from airflow_crew.tools.support import metadata_db
+from airflow_crew.tools.support.docker_manager import AIRFLOW_HOME, CONFIG_HASH_LABEL, CONTAINER_DAGS_FOLDER, METADATA_DB, PRISTINE_DB, SNAPSHOT_COMMAND, AirflowVersionConfig, copy_dag, ensure_image
+from docker.errors import DockerException
+from docker.models.containers import Container
+
+DEFAULT_WARM = int(os.environ.get("AIRFLOW_CREW_POOL_WARM", "1"))
+DEFAULT_MAX_SIZE = int(os.environ.get("AIRFLOW_CREW_POOL_MAX", "4"))
+DEFAULT_IDLE_TIMEOUT = float(os.environ.get("AIRFLOW_CREW_POOL_IDLE_SECONDS", "600"))
+DEFAULT_LEASE_TIMEOUT = 300.0
+POOL_LABEL = "airflow_crew.pool"
+
+# Run between leases: drop DAGs and logs left by the previous lease and restore the metadata DB, failing if the copy differs
+RESET_COMMAND = ["sh", "-c", f"find {CONTAINER_DAGS_FOLDER} {AIRFLOW_HOME}/logs -mindepth 1 -delete; {metadata_db.restore_script(PRISTINE_DB, METADATA_DB)}"]
+
+
+class ContainerPoolExhausted(RuntimeError):
+    """Raised when no container can be leased before the lease timeout."""
+
+
+class ContainerPool:
+    """Process-wide pool of pre-started containers, keyed by ``AirflowVersionConfig``.
+
+    ``lease`` hands out an idle container for the config (starting one if the
+    pool is below ``max_size``), copying the DAG in; ``release`` resets the
+    container and makes it idle again. After each lease a background thread
+    tops the config back up to ``warm`` idle containers. Idle containers are
+    removed after ``idle_timeout`` seconds, oldest first when room is needed
+    for another config.
+    """
+
+    def __init__(self, warm: int = DEFAULT_WARM, max_size: int = DEFAULT_MAX_SIZE, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, client: docker.DockerClient | None = None):
+        self.warm = warm
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._client = client
+        self._condition = threading.Condition()
+        self._idle: dict[str, deque[tuple[Container, float]]] = {}
+        self._leased: dict[str, str] = {}  # container id -> config hash
+        self._starting = 0
+        self._closed = False
+        self.stats_counters = {"leases": 0, "warm_hits": 0, "started": 0, "resets": 0, "evicted": 0, "discarded": 0}
+
+    @property
+    def client(self) -> docker.DockerClient:
+        """Docker client, created on first use."""
+        if self._client is None:
+            self._client = docker.from_env()
+        return self._client
+
+    def _count(self, counter: str, n: int = 1):
+        with self._condition:
+            self.stats_counters[counter] += n
+
+    def _size(self) -> int:
+        return len(self._leased) + sum(len(idle) for idle in self._idle.values()) + self._starting
+
+    def _start(self, config: AirflowVersionConfig) -> Container:
+        image_tag = ensure_image(self.client, config)
+        container = self.client.containers.run(
+            image_tag,
+            detach=True,
+            cap_add=["SYS_PTRACE"],
+            labels={POOL_LABEL: "1", CONFIG_HASH_LABEL: config.config_hash()},
+            command="tail -f /dev/null",  # Keep container running
+        )
+        try:
+            metadata_db.prepare_template(lambda command: self._exec(container, command), config, METADATA_DB)
+            exit_code, output = self._exec(container, SNAPSHOT_COMMAND)
+            if exit_code != 0:
+                raise RuntimeError(f"Failed to snapshot metadata DB: {output}")
+        except Exception:
+            self._remove(container)
+            raise
+        self._count("started")
+        return container
+
+    def _exec(self, container: Container, command: list[str]) -> tuple[int | None, str]:
+        exit_code, output = container.exec_run(command)
+        return exit_code, output.decode(errors="replace")
+
+    def _remove(self, container: Container):
+        with contextlib.suppress(DockerException):
+            container.remove(force=True)
+
+    def _evict_locked(self, now: float, make_room: bool = False) -> list[Container]:
+        """Pop idle containers past their timeout (or the oldest one, to make room); caller removes them."""
+        evicted = []
+        for idle in self._idle.values():
+            while idle and now - idle[0][1] > self.idle_timeout:
+                evicted.append(idle.popleft()[0])
+        if make_room and not evicted:
+            oldest = min((idle for idle in self._idle.values() if idle), key=lambda idle: idle[0][1], default=None)
+            if oldest:
+                evicted.append(oldest.popleft()[0])
+        self.stats_counters["evicted"] += len(evicted)
+        return evicted
+
+    def lease(self, config: AirflowVersionConfig, dag_path: Path | str | None = None, timeout: float = DEFAULT_LEASE_TIMEOUT) -> Container:
+        """Lease a running container for ``config``, with ``dag_path`` copied in as by ``copy_dag``.
+
+        Args:
+            config (AirflowVersionConfig): Environment the container must run
+            dag_path (Path, optional): DAG file or DAGs folder to copy into the container
+            timeout (float): Seconds to wait for a container when the pool is at ``max_size``
+
+        Returns:
+            Container: Leased container; give it back with ``release``
+        """
+        key = config.config_hash()
+        deadline = time.monotonic() + timeout
+        while True:
+            container, evicted = self._claim(key, deadline, timeout)
+            for stale in evicted:
+                self._remove(stale)
+            if container is None:
+                container = self._start_claimed(config, key)
+                break
+            if self._alive(container):
+                self._count("warm_hits")
+                break
+            self._discard(container)
+
+        self._count("leases")
+        if dag_path is not None:
+            try:
+                copy_dag(container, dag_path)
+            except Exception:
+                self.release(container)
+                raise
+        self._replenish(config)
+        return container
+
+    def _claim(self, key: str, deadline: float, timeout: float) -> tuple[Container | None, list[Container]]:
+        """Take the most recently used idle container for ``key``, or (None) a slot to start one, waiting while the pool is full.
+
+        Also returns the idle containers evicted on the way; the caller removes them.
+        """
+        evicted: list[Container] = []
+        try:
+            with self._condition:
+                while True:
+                    evicted += self._evict_locked(time.monotonic())
+                    idle = self._idle.get(key)
+                    if idle:
+                        container = idle.pop()[0]
+                        self._leased[container.id] = key
+                        return container, evicted
+                    if self._size() < self.max_size or (evicted := evicted + self._evict_locked(time.monotonic(), make_room=True)):
+                        self._starting += 1
+                        return None, evicted
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ContainerPoolExhausted(f"No container available within {timeout}s (max_size={self.max_size})")
+                    self._condition.wait(remaining)
+        except ContainerPoolExhausted:
+            for stale in evicted:
+                self._remove(stale)
+            raise
+
+    def _start_claimed(self, config: AirflowVersionConfig, key: str) -> Container:
+        """Start a container in a slot taken by ``_claim`` and lease it."""
+        container = None
+        try:
+            container = self._start(config)
+        finally:
+            with self._condition:
+                self._starting -= 1
+                if container is not None:
+                    self._leased[container.id] = key
+                self._condition.notify_all()
+        return container
+
+    def _alive(self, container: Container) -> bool:
+        try:
+            container.reload()
+        except DockerException:
+            return False
+        return container.status == "running"
+
+    def _discard(self, container: Container):
+        with self._condition:
+            self._leased.pop(container.id, None)
+            self._condition.notify_all()
+        self._count("discarded")
+        self._remove(container)
+
+    def release(self, container: Container):
+        """Reset a leased container and return it to the idle pool (it is removed if the reset fails or the pool is closed)."""
+        with self._condition:
+            closed = self._closed
+        if closed:
+            self._discard(container)
+            return
+        try:
+            exit_code, _ = container.exec_run(RESET_COMMAND)
+        except DockerException:
+            exit_code = -1
+        if exit_code != 0:
+            self._discard(container)
+            return
+        with self._condition:
+            self.stats_counters["resets"] += 1
+            key = self._leased.pop(container.id, None)
+            if key is None:
+                return
+            closed = self._closed
+            if not closed:
+                self._idle.setdefault(key, deque()).append((container, time.monotonic()))
+            self._condition.notify_all()
+        if closed:
+            # The pool was closed while the container was being reset
+            self._remove(container)
+
+    def _replenish(self, config: AirflowVersionConfig):
+        """Start containers in the background until ``config`` has ``warm`` idle ones (within ``max_size``)."""
+        key = config.config_hash()
+        with self._condition:
+            missing = 0 if self._closed else min(self.warm - len(self._idle.get(key, ())), self.max_size - self._size())
+            if missing <= 0:
+                return
+            self._starting += missing
+
+        def start():
+            for _ in range(missing):
+                container = None
+                try:
+                    container = self._start(config)
+                except Exception:
+                    pass
+                with self._condition:
+                    self._starting -= 1
+                    pooled = container is not None and not self._closed
+                    if pooled:
+                        self._idle.setdefault(key, deque()).appendleft((container, time.monotonic()))
+                    self._condition.notify_all()
+                if container is not None and not pooled:
+                    self._remove(container)
+
+        threading.Thread(target=start, name="container-pool-warm", daemon=True).start()
+
+    def prewarm(self, config: AirflowVersionConfig):
+        """Start ``warm`` idle containers for ``config`` in the background, ahead of the first lease."""
+        self._replenish(config)
+
+    def evict_idle(self) -> int:
+        """Remove idle containers past the idle timeout; returns how many were removed."""
+        with self._condition:
+            evicted = self._evict_locked(time.monotonic())
+        for container in evicted:
+            self._remove(container)
+        return len(evicted)
+
+    def close(self):
+        """Remove every idle container; leased containers are removed when released, and containers still starting once started."""
+        with self._condition:
+            self._closed = True
+            idle = [container for queue in self._idle.values() for container, _ in queue]
+            self._idle.clear()
+            self.warm = 0
+            self.max_size = len(self._leased)
+        for container in idle:
+            self._remove(container)
+
+    def stats(self) -> dict[str, Any]:
+        """Pool occupancy and counters."""
+        with self._condition:
+            return {
+                "idle": {key: len(idle) for key, idle in self._idle.items()},
+                "leased": len(self._leased),
+                "starting": self._starting,
+                "max_size": self.max_size,
+                "closed": self._closed,
+                **self.stats_counters,
+            }
+
+
+_default_pool: ContainerPool | None = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> ContainerPool:
+    """Process-wide container pool shared by every tool; sized by ``AIRFLOW_CREW_POOL_*`` environment variables."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ContainerPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,286 @@
+"""Differential Before/After Performance Comparison of Two Versions of a DAG"""
+
+import argparse
+import json
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from airflow_crew.tools.support import hotspots, parse_benchmark
+from airflow_crew.tools.support.environment import PY_SPY_RATE
+from airflow_crew.tools.support.stats import holm_adjust, min_rank_sum_p_value, rank_sum_p_value, summarize
+from airflow_crew.tools.support.task_runner import load_task_graph
+
+if TYPE_CHECKING:
+    from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+    from airflow_crew.tools.support.environment import EnvironmentManager
+
+DEFAULT_REPETITIONS = 5
+# A fix is rejected when a metric's median gets this many percent worse than the original's, significantly
+DEFAULT_MAX_REGRESSION_PERCENT = 10.0
+# Family-wise error rate of the accept/reject gate; deltas that are not significant at this level are treated as noise
+DEFAULT_ALPHA = 0.05
+DEFAULT_LOGICAL_DATE = "2024-01-01"
+VERSIONS = ("before", "after")
+# Per-task metrics compared; lower is better for all of them
+TASK_METRICS = ("wall_seconds", "execute_seconds", "peak_rss_mb")
+# Metrics that can reject a fix, tested together with Holm's correction. Per-task metrics (three per task) are
+# reported for information only: with that many tests, some would come out significant by chance alone.
+GATE_METRICS = ("parse.cold_ms", "parse.warm_ms", "total.task_seconds")
+
+
+def min_repetitions(alpha: float = DEFAULT_ALPHA) -> int:
+    """Fewest repetitions with which a change of a gate metric can be significant after Holm's correction."""
+    n = 2
+    while min_rank_sum_p_value(n) >= alpha / len(GATE_METRICS):
+        n += 1
+    return n
+
+
+# 5 at the default alpha: 4 against 4 runs give a smallest p-value of 0.029, above the 0.017 Holm needs first
+MIN_REPETITIONS = min_repetitions()
+
+
+def compare_samples(before: list[float], after: list[float], max_regression_percent: float = DEFAULT_MAX_REGRESSION_PERCENT, alpha: float = DEFAULT_ALPHA) -> dict[str, Any]:
+    """Median delta between two sets of measurements of a lower-is-better metric, its significance and verdict.
+
+    A delta is ``regressed`` when it is significant and the median got more than
+    ``max_regression_percent`` worse (any significant increase from a median of
+    zero), ``improved`` when it is significant and the median got better, and
+    ``unchanged`` otherwise.
+    """
+    summary_before, summary_after = summarize(before, digits=4), summarize(after, digits=4)
+    delta = summary_after["p50"] - summary_before["p50"]
+    percent = 100 * delta / summary_before["p50"] if summary_before["p50"] else None
+    p_value = rank_sum_p_value(before, after)
+    return {
+        "before": summary_before,
+        "after": summary_after,
+        "delta": round(delta, 4),
+        "percent": round(percent, 2) if percent is not None else None,
+        "p_value": round(p_value, 4),
+        "significant": p_value < alpha,
+        "verdict": _verdict(delta, percent, p_value < alpha, max_regression_percent),
+    }
+
+
+def _verdict(delta: float, percent: float | None, significant: bool, max_regression_percent: float) -> str:
+    """``regressed``, ``improved`` or ``unchanged``, as ``compare_samples`` defines them."""
+    if significant and delta > 0 and (percent is None or percent > max_regression_percent):
+        return "regressed"
+    if significant and delta < 0:
+        return "improved"
+    return "unchanged"
+
+
+def _gate(flat: dict[str, dict[str, Any]], max_regression_percent: float, alpha: float):
+    """Re-judge the ``GATE_METRICS`` results in ``flat`` on Holm-adjusted p-values (``p_adjusted``)."""
+    gated = [flat[name] for name in GATE_METRICS]
+    for result, p_adjusted in zip(gated, holm_adjust([result["p_value"] for result in gated]), strict=True):
+        result["p_adjusted"] = round(p_adjusted, 4)
+        result["significant"] = p_adjusted < alpha
+        result["verdict"] = _verdict(result["delta"], result["percent"], result["significant"], max_regression_percent)
+
+
+def _python_runner(environment: "EnvironmentManager"):
+    return lambda args: environment.execute_command(["python", *args], timeout=parse_benchmark.PARSE_TIMEOUT)[1]
+
+
+def _measure(environment: "EnvironmentManager", dag_id: str, task_ids: list[str], logical_date: str) -> dict[str, Any]:
+    """One repetition in one environment: a cold and a warm parse, then every task profiled on a freshly restored metadata DB."""
+    benchmark = parse_benchmark.benchmark_parse(environment.dag_file, runs=1, runner=_python_runner(environment))
+    measured = {"cold_ms": benchmark["cold"]["total_ms"]["p50"], "warm_ms": benchmark["warm"]["total_ms"]["p50"], "task_seconds": 0.0, "tasks": {}, "stacks": {}, "failures": []}
+    if benchmark["error"]:
+        measured["failures"].append({"stage": "parse", "task_id": None, "error": benchmark["error"]})
+    for task_id in task_ids:
+        environment.restore_metadata_db()
+        profile = environment.profile_task(dag_id, task_id, logical_date=logical_date, keep_stacks=True)
+        if profile["exit_code"] != 0:
+            measured["failures"].append({"stage": "task", "task_id": task_id, "error": f"exit code {profile['exit_code']}: {profile['output_tail'][-500:]}"})
+        measured["tasks"][task_id] = {"wall_seconds": profile["wall_seconds"], "execute_seconds": profile["phases"]["execute"]["seconds"], "peak_rss_mb": profile["peak_rss_mb"]}
+        measured["stacks"][task_id] = hotspots.normalize_stacks(profile.pop("stacks"), environment.dag_file)
+        measured["task_seconds"] += profile["wall_seconds"]
+    return measured
+
+
+def _compare_runs(runs: dict[str, list[dict[str, Any]]], task_ids: list[str], max_regression_percent: float, alpha: float) -> dict[str, Any]:
+    """``compare_samples`` of every parse, total and per-task metric across the ``_measure`` results of both versions."""
+
+    def compare(metric: Callable[[dict[str, Any]], float | None]) -> dict[str, Any]:
+        before, after = ([value for run in runs[version] if (value := metric(run)) is not None] for version in VERSIONS)
+        return compare_samples(before, after, max_regression_percent, alpha)
+
+    return {
+        "parse": {kind: compare(lambda run, kind=kind: run[kind]) for kind in ("cold_ms", "warm_ms")},
+        "total": {"task_seconds": compare(lambda run: run["task_seconds"])},
+        "tasks": {task_id: {metric: compare(lambda run, task_id=task_id, metric=metric: run["tasks"][task_id][metric]) for metric in TASK_METRICS} for task_id in task_ids},
+    }
+
+
+def _describe(name: str, result: dict[str, Any]) -> str:
+    """One line for a compared metric: medians before and after, change and p-value (Holm-adjusted for gate metrics)."""
+    change = f"{result['percent']:+.1f}%" if result["percent"] is not None else f"{result['delta']:+g}"
+    p_value = f"p_adjusted={result['p_adjusted']:g}" if "p_adjusted" in result else f"p={result['p_value']:g}"
+    return f"{name}: {result['before']['p50']:g} -> {result['after']['p50']:g} ({change}, {p_value})"
+
+
+def _failing_after_fix(failures: list[dict[str, Any]]) -> list[str]:
+    """Parses and tasks that only fail after the fix: regressions whatever their timings."""
+    failing = {(failure["version"], failure["stage"], failure["task_id"]) for failure in failures}
+    return [
+        f"{'parse' if task_id is None else f'tasks.{task_id}'}: fails after the fix"
+        for version, stage, task_id in sorted(failing, key=str)
+        if version == "after" and ("before", stage, task_id) not in failing
+    ]
+
+
+def _check_repetitions(repetitions: int, alpha: float):
+    """Fewer repetitions can never give a significant delta, so every fix would be accepted unmeasured."""
+    if repetitions < (needed := min_repetitions(alpha)):
+        raise ValueError(f"At least {needed} repetitions are needed for a significant comparison at alpha {alpha}, got {repetitions}")
+
+
+def compare_environments(
+    environments: dict[str, "EnvironmentManager"],
+    dag_id: str,
+    task_ids: list[str] | None = None,
+    repetitions: int = DEFAULT_REPETITIONS,
+    max_regression_percent: float = DEFAULT_MAX_REGRESSION_PERCENT,
+    alpha: float = DEFAULT_ALPHA,
+    flame_graph_dir: Path | str | None = None,
+    logical_date: str = DEFAULT_LOGICAL_DATE,
+) -> dict[str, Any]:
+    """Measure two environments holding the original (``before``) and fixed (``after``) DAG alike, and compare them.
+
+    Every repetition measures one cold and one warm parse of the DAG file and
+    profiles each task from start to exit (wall time, ``execute()`` time, peak
+    RSS and py-spy stacks), on a freshly restored metadata DB. Repetitions
+    alternate which version goes first and never run concurrently, so drift
+    and contention hit both versions alike.
+
+    Args:
+        environments (dict): ``before`` and ``after`` environments with the same configuration, each with its version of the DAG in place
+        dag_id (str): DAG defined by both versions
+        task_ids (list[str], optional): Tasks to profile (default: every task both versions define)
+        repetitions (int): Measurements per metric and version, at least ``min_repetitions(alpha)``
+        max_regression_percent (float): Significant slowdown of a median, in percent, beyond which the fix is rejected
+        alpha (float): Significance level of the rank-sum tests; family-wise across ``GATE_METRICS``
+        flame_graph_dir (Path, optional): Directory to write a differential flame graph per task to
+        logical_date (str): Logical date of every task run
+
+    Returns:
+        dict: ``accepted``, the ``regressions`` that reject the fix, per-task ``task_regressions`` (information only),
+        ``improvements``, and per-metric comparisons, hotspot deltas and flame graphs
+    """
+    _check_repetitions(repetitions, alpha)
+    defined = {version: load_task_graph(environment, dag_id, environment.dag_file).task_ids for version, environment in environments.items()}
+    if task_ids is None:
+        task_ids = [task_id for task_id in defined["before"] if task_id in defined["after"]]
+
+    runs: dict[str, list[dict[str, Any]]] = {version: [] for version in VERSIONS}
+    failures = []
+    for repetition in range(repetitions):
+        for version in VERSIONS if repetition % 2 == 0 else reversed(VERSIONS):
+            measured = _measure(environments[version], dag_id, task_ids, logical_date)
+            runs[version].append(measured)
+            failures.extend({"version": version, **failure, "repetition": repetition} for failure in measured["failures"])
+
+    metrics = _compare_runs(runs, task_ids, max_regression_percent, alpha)
+    flat = {f"parse.{kind}": result for kind, result in metrics["parse"].items()}
+    flat["total.task_seconds"] = metrics["total"]["task_seconds"]
+    flat.update({f"tasks.{task_id}.{metric}": result for task_id, results in metrics["tasks"].items() for metric, result in results.items()})
+    _gate(flat, max_regression_percent, alpha)
+    regressions = [_describe(name, flat[name]) for name in GATE_METRICS if flat[name]["verdict"] == "regressed"] + _failing_after_fix(failures)
+
+    stacks = {version: {task_id: [stack for run in runs[version] for stack in run["stacks"][task_id]] for task_id in task_ids} for version in VERSIONS}
+    flame_graphs = {}
+    if flame_graph_dir is not None:
+        for task_id in task_ids:
+            if stacks["after"][task_id]:
+                path = Path(flame_graph_dir) / f"{dag_id}.{task_id}-diff.svg"
+                flame_graphs[task_id] = hotspots.write_flamegraph(stacks["after"][task_id], path, title=f"{dag_id}.{task_id}: after vs before", baseline=stacks["before"][task_id])
+
+    return {
+        "dag_id": dag_id,
+        "repetitions": repetitions,
+        "max_regression_percent": max_regression_percent,
+        "alpha": alpha,
+        "accepted": not regressions,
+        "regressions": regressions,
+        "task_regressions": [_describe(name, result) for name, result in flat.items() if name not in GATE_METRICS and result["verdict"] == "regressed"],
+        "improvements": [_describe(name, result) for name, result in flat.items() if result["verdict"] == "improved"],
+        "tasks_added": [task_id for task_id in defined["after"] if task_id not in defined["before"]],
+        "tasks_removed": [task_id for task_id in defined["before"] if task_id not in defined["after"]],
+        **metrics,
+        "hotspots": {task_id: hotspots.compare_hotspots(stacks["before"][task_id], stacks["after"][task_id], PY_SPY_RATE, runs=repetitions) for task_id in task_ids},
+        "flame_graphs": flame_graphs,
+        "failures": failures,
+    }
+
+
+def compare_versions(
+    before_path: Path | str,
+    after_path: Path | str,
+    config: "AirflowVersionConfig",
+    dag_id: str | None = None,
+    task_ids: list[str] | None = None,
+    repetitions: int = DEFAULT_REPETITIONS,
+    max_regression_percent: float = DEFAULT_MAX_REGRESSION_PERCENT,
+    alpha: float = DEFAULT_ALPHA,
+    flame_graph_dir: Path | str | None = None,
+    backend: str | None = None,
+) -> dict[str, Any]:
+    """Compare the performance of an original DAG file and its fixed version in two identically configured environments.
+
+    See ``compare_environments`` for the measurements; ``dag_id`` defaults to the original file's name.
+    """
+    from airflow_crew.tools.support.environment import get_environment_manager
+
+    _check_repetitions(repetitions, alpha)
+
+    environments: dict[str, EnvironmentManager] = {}
+    try:
+        for version, path in zip(VERSIONS, (before_path, after_path), strict=True):
+            environments[version] = get_environment_manager(backend)
+            environments[version].create_container(config, Path(path))
+        result = compare_environments(environments, dag_id or Path(before_path).stem, task_ids, repetitions, max_regression_percent, alpha, flame_graph_dir)
+    finally:
+        for environment in environments.values():
+            environment.cleanup()
+    return {"before": str(before_path), "after": str(after_path), **result}
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    """Command-line entry point: write the comparison document to stdout (or a file) and the verdict to stderr."""
+    from airflow_crew.tools.support.environment import add_environment_arguments, config_from_arguments
+
+    parser = argparse.ArgumentParser(description="Compare parse time, task runtime, peak RSS and hotspots of an original DAG file and its fixed version.")
+    parser.add_argument("before", type=Path, help="Original DAG file")
+    parser.add_argument("after", type=Path, help="Fixed DAG file")
+    add_environment_arguments(parser)
+    parser.add_argument("--dag-id", default=None, help="DAG to compare (default: the original file's name)")
+    parser.add_argument("--task", action="append", default=None, dest="task_ids", metavar="TASK_ID", help="Task to profile (repeatable; default: every task in both versions)")
+    parser.add_argument("--repetitions", type=int, default=DEFAULT_REPETITIONS, help=f"Measurements per metric and version, at least {MIN_REPETITIONS} (default: {DEFAULT_REPETITIONS})")
+    parser.add_argument("--max-regression-percent", type=float, default=DEFAULT_MAX_REGRESSION_PERCENT, help=f"Significant slowdown that rejects the fix (default: {DEFAULT_MAX_REGRESSION_PERCENT})")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help=f"Family-wise significance level of the gate metrics (default: {DEFAULT_ALPHA})")
+    parser.add_argument("--flame-graph-dir", type=Path, default=None, help="Write a differential flame graph per task here")
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON document here instead of stdout")
+    args = parser.parse_args(argv)
+    for path in (args.before, args.after):
+        if not path.is_file():
+            parser.error(f"not a file: {path}")
+    if args.repetitions < (needed := min_repetitions(args.alpha)):
+        parser.error(f"--repetitions must be at least {needed} at --alpha {args.alpha}: fewer can never show a significant change")
+
+    document = compare_versions(
+        args.before, args.after, config_from_arguments(args), args.dag_id, args.task_ids, args.repetitions, args.max_regression_percent, args.alpha, args.flame_graph_dir, args.backend
+    )
+    text = json.dumps(document, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    verdict = "accepted" if document["accepted"] else "rejected: " + "; ".join(document["regressions"])
+    print(f"{args.after} vs {args.before}: {len(document['improvements'])} improvements, {verdict}", file=sys.stderr)
+    return document
@@ -1,9 +1,38 @@
+import hashlib
+import io
+import json
+import tarfile
+import threading
+import time
+from collections.abc import Callable
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING
 
 import docker
+from airflow_crew.tools.support import metadata_db
+from airflow_crew.tools.support.environment import DEFAULT_COMMAND_TIMEOUT, KILL_GRACE, EnvironmentManager, ExecResult, OutputBuffer
+from docker.errors import ImageNotFound
 from docker.models.containers import Container
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    from airflow_crew.tools.support.container_pool import ContainerPool
+
+AIRFLOW_HOME = "/opt/airflow"
+CONTAINER_DAGS_FOLDER = f"{AIRFLOW_HOME}/dags"
+METADATA_DB = f"{AIRFLOW_HOME}/airflow.db"
+PRISTINE_DB = f"{AIRFLOW_HOME}/.airflow.db.pristine"
+# Snapshot the seeded, verified-clean metadata DB once per container, so resets are a file copy
+SNAPSHOT_COMMAND = ["sh", "-c", f"cp --reflink=auto -p {METADATA_DB} {PRISTINE_DB}"]
+RESTORE_COMMAND = ["sh", "-c", metadata_db.restore_script(PRISTINE_DB, METADATA_DB)]
+# Where the DAG under test is mounted (or copied) inside the container
+CONTAINER_DAG_PATH = f"{CONTAINER_DAGS_FOLDER}/dag.py"
+IMAGE_REPOSITORY = "airflow-test"
+# Bump whenever build_dockerfile changes, so images built from the old template are not reused
+IMAGE_REVISION = "3"
+CONFIG_HASH_LABEL = "airflow_crew.config_hash"
+# Configuration fields baked into the image; the rest only affects the metadata DB
+INSTALL_FIELDS = {"python_version", "airflow_version", "providers"}
 
 
 class AirflowVersionConfig(BaseModel):
@@ -12,18 +41,56 @@ class AirflowVersionConfig(BaseModel):
     python_version: str
     airflow_version: str
     providers: dict[str, str]  # provider_name: version
+    # Seeded into the metadata DB template rather than installed, so they do not change the image
+    connections: dict[str, str] = Field(default_factory=dict)  # conn_id: URI
+    variables: dict[str, str] = Field(default_factory=dict)  # key: value
 
+    def install_hash(self) -> str:
+        """Stable hash of what gets installed: Python, Airflow and providers (provider order does not matter)."""
+        return _config_digest(self.model_dump(include=INSTALL_FIELDS))
 
-class DockerEnvironmentManager:
-    """Manages Docker environment for Airflow testing and profiling"""
+    def config_hash(self) -> str:
+        """Stable hash of the whole configuration, metadata DB seed included; equals ``install_hash`` without one."""
+        return _config_digest(self.model_dump(exclude_defaults=True))
 
-    def __init__(self):
-        self.client = docker.from_client()
+    def image_tag(self) -> str:
+        """Docker image tag for this configuration, e.g. ``airflow-test:2.9.3-py3.11-1a2b3c4d5e6f``."""
+        return f"{IMAGE_REPOSITORY}:{self.airflow_version}-py{self.python_version}-{self.install_hash()}"
+
+
+def _config_digest(fields: dict) -> str:
+    payload = json.dumps({"revision": IMAGE_REVISION, **fields}, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=6).hexdigest()
+
+
+class DockerEnvironmentManager(EnvironmentManager):
+    """Manages Docker environment for Airflow testing and profiling
+
+    With a ``pool``, containers are leased from the shared warm pool instead of
+    being started per manager, and ``cleanup`` returns them to the pool.
+    """
+
+    def __init__(self, pool: "ContainerPool | None" = None):
+        self.pool = pool
+        self.client = pool.client if pool else docker.from_env()
         self.container: Container | None = None
+        self.dag_file = CONTAINER_DAG_PATH
+        self.dags_folder = CONTAINER_DAGS_FOLDER
+        self.metadata_db_path = METADATA_DB
 
-    def build_dockerfile(self, config: AirflowVersionConfig) -> str:
-        """Generate Dockerfile content based on configuration"""
-        providers_install = "\n".join([f"RUN pip install apache-airflow-providers-{provider}=={version}" for provider, version in config.providers.items()])
+    @staticmethod
+    def build_dockerfile(config: AirflowVersionConfig) -> str:
+        """Generate Dockerfile content based on configuration.
+
+        Layers are ordered from least to most frequently changed: system packages and
+        profiling tools, then Airflow with its metadata DB, then all providers in one
+        install. Changing a provider therefore only rebuilds the last layer.
+        """
+        constraints = f"https://raw.githubusercontent.com/apache/airflow/constraints-{config.airflow_version}/constraints-{config.python_version}.txt"
+        providers = " ".join(f'"apache-airflow-providers-{provider}=={version}"' for provider, version in sorted(config.providers.items()))
+        # Pinning apache-airflow keeps pip from up- or downgrading Airflow to satisfy a provider, and the
+        # constraints keep it from moving Airflow's own dependencies away from the versions Airflow was tested with
+        providers_install = f'RUN pip install --no-cache-dir "apache-airflow=={config.airflow_version}" {providers} --constraint "{constraints}"' if providers else ""
 
         return f"""
 FROM python:{config.python_version}-slim
@@ -35,19 +102,16 @@ RUN apt-get update && apt-get install -y \
     linux-perf \
     && rm -rf /var/lib/apt/lists/*
 
-# Install Airflow with specified version
-RUN pip install apache-airflow=={config.airflow_version}
-
-# Install providers
-{providers_install}
-
 # Install py-spy for profiling
-RUN pip install py-spy
+RUN pip install --no-cache-dir py-spy
 
 # Setup Airflow home
 ENV AIRFLOW_HOME=/opt/airflow
 RUN mkdir -p /opt/airflow/dags
 
+# Install Airflow with specified version
+RUN pip install --no-cache-dir "apache-airflow=={config.airflow_version}" --constraint "{constraints}"
+
 # Initialize Airflow DB
 RUN airflow db init
 
@@ -60,148 +124,139 @@ RUN airflow users create \
     --role Admin \
     --email admin@example.com
 
+# Install providers
+{providers_install}
+
 WORKDIR /opt/airflow
 """
 
-    def create_container(self, config: AirflowVersionConfig, dag_path: Path) -> Container:
-        """Create and start container with Airflow environment"""
-        # Build custom image
-        dockerfile_content = self.build_dockerfile(config)
-        image_tag = f"airflow-test:{config.airflow_version}-{config.python_version}"
-
-        # Write temporary Dockerfile
-        temp_dir = Path("/tmp/airflow-test")
-        temp_dir.mkdir(exist_ok=True)
+    def ensure_image(self, config: AirflowVersionConfig) -> str:
+        """Build the image for ``config`` unless an image with its config-hash tag already exists; returns the tag."""
+        return ensure_image(self.client, config)
 
-        with open(temp_dir / "Dockerfile", "w") as f:
-            f.write(dockerfile_content)
+    def create_container(self, config: AirflowVersionConfig, dag_path: Path) -> Container:
+        """Create and start container with Airflow environment; ``dag_path`` may be a single DAG file or a whole DAGs folder"""
+        if self.pool:
+            if self.container is not None:
+                self.cleanup()
+            self.container = self.pool.lease(config, dag_path)
+            return self.container
 
-        # Build image
-        self.client.images.build(path=str(temp_dir), tag=image_tag, rm=True)
+        image_tag = self.ensure_image(config)
 
         # Create container
+        target = CONTAINER_DAGS_FOLDER if Path(dag_path).is_dir() else CONTAINER_DAG_PATH
         self.container = self.client.containers.run(
             image_tag,
             detach=True,
-            volumes={str(dag_path): {"bind": "/opt/airflow/dags/dag.py", "mode": "ro"}},
+            volumes={str(Path(dag_path).resolve()): {"bind": target, "mode": "ro"}},
             cap_add=["SYS_PTRACE"],
             command="tail -f /dev/null",  # Keep container running
         )
+        metadata_db.prepare_template(self.execute_command, config, METADATA_DB)
+        exit_code, output = self.execute_command(SNAPSHOT_COMMAND)
+        if exit_code != 0:
+            raise RuntimeError(f"Failed to snapshot metadata DB: {output}")
 
         return self.container
 
-    def execute_command(self, command: list[str]) -> tuple[str, str]:
-        """Execute command in container"""
-        if not self.container:
-            raise RuntimeError("Container not initialized")
+    def copy_dag(self, dag_path: Path | str):
+        """Copy a DAG file to ``CONTAINER_DAG_PATH``, or a DAGs folder into ``CONTAINER_DAGS_FOLDER`` (for containers started without the DAG mounted)."""
+        copy_dag(self.container, dag_path)
 
-        exit_code, output = self.container.exec_run(command)
-        return exit_code, output.decode()
+    def restore_metadata_db(self):
+        """Restore the container's metadata DB from the snapshot taken when it started"""
+        exit_code, output = self.execute_command(RESTORE_COMMAND)
+        if exit_code != 0:
+            raise RuntimeError(f"Failed to restore metadata DB: {output}")
 
-    def run_py_spy(self, pid: int, duration: int = 60) -> str:
-        """Run py-spy on specified process"""
+    def stream_command(self, command: list[str], timeout: float | None = DEFAULT_COMMAND_TIMEOUT, on_output: Callable[[str, str], None] | None = None) -> ExecResult:
+        """Execute command in container, decoding output as it arrives; see ``exec_stream``."""
         if not self.container:
             raise RuntimeError("Container not initialized")
 
-        cmd = ["py-spy", "record", "--pid", str(pid), "--output", "/tmp/profile.svg", "--duration", str(duration), "--rate", "1000"]
-
-        self.execute_command(cmd)
-
-        # Copy profile data from container
-        bits, stat = self.container.get_archive("/tmp/profile.svg")
-        # TODO: Save profile data to file
-        return "/tmp/profile.svg"
-
-    def get_performance_metrics(self, pid: int, duration: int = 60) -> dict[str, Any]:
-        """Collect comprehensive performance metrics for analysis.
-
-        This expands on py-spy by collecting:
-        - CPU utilization per function/task
-        - Memory allocation patterns
-        - I/O operations and wait times
-        - Database query patterns and timing
-        - Task scheduling overhead
-        - XCom operation timing
-        - Lock contention points
-
-        Returns structured metrics suitable for LLM analysis.
-        """
-        metrics = {
-            "cpu": self._get_cpu_metrics(pid),
-            "memory": self._get_memory_metrics(pid),
-            "io": self._get_io_metrics(pid),
-            "db": self._get_db_metrics(pid),
-            "scheduling": self._get_scheduling_metrics(pid),
-            "profiling": self._get_profiling_data(pid, duration),
-            "summary": {"bottlenecks": [], "recommendations": []},
-        }
-
-        return metrics
-
-    def _get_cpu_metrics(self, pid: int) -> dict[str, Any]:
-        """Collect CPU utilization metrics per function/task."""
-        cmd = ["ps", "-p", str(pid), "-o", "%cpu,cputime"]
-        # TODO: Leave as is for now - these are placeholder methods that will need the variables when fully implemented. We'll fix these unused variables when implementing the actual metrics collection logic.
-        exit_code, output = self.execute_command(cmd)
-
-        # Parse ps output
-        cpu_metrics = {"utilization_percent": 0.0, "execution_time": "", "hotspots": []}
-
-        # Add CPU profiling data
-        cmd = ["perf", "stat", "-p", str(pid)]
-        self.execute_command(cmd)
-
-        return cpu_metrics
-
-    def _get_memory_metrics(self, pid: int) -> dict[str, Any]:
-        """Analyze memory usage patterns."""
-        cmd = ["ps", "-p", str(pid), "-o", "rss,vsz"]
-        exit_code, output = self.execute_command(cmd)
-
-        memory_metrics = {"rss_mb": 0, "virtual_mb": 0, "allocations": [], "leaks": [], "large_objects": []}
-
-        # Add memory profiling data
-        cmd = ["gdb", "--pid", str(pid), "-batch", "-ex", "info malloc"]
-        self.execute_command(cmd)
-
-        return memory_metrics
-
-    def _get_io_metrics(self, pid: int) -> dict[str, Any]:
-        """Collect I/O operation metrics."""
-        cmd = ["iotop", "-p", str(pid), "-b", "-n", "1"]
-        exit_code, output = self.execute_command(cmd)
-
-        io_metrics = {"read_bytes": 0, "write_bytes": 0, "io_wait": 0.0, "patterns": {"sequential_reads": 0, "random_reads": 0, "write_patterns": []}}
-
-        return io_metrics
-
-    def _get_db_metrics(self, pid: int) -> dict[str, Any]:
-        """Analyze database operations."""
-        db_metrics = {"queries": [], "connection_patterns": [], "transaction_time": [], "slow_queries": []}
-
-        # Parse SQLite query log if enabled
-        cmd = ["sqlite3", ".airflow/airflow.db", ".expert"]
-        self.execute_command(cmd)
-
-        return db_metrics
-
-    def _get_scheduling_metrics(self, pid: int) -> dict[str, Any]:
-        """Analyze task scheduling patterns."""
-        scheduling_metrics = {"dag_file_parse_time": 0.0, "task_instances": [], "queue_metrics": {"waiting_time": [], "execution_time": [], "overlaps": []}}
-
-        return scheduling_metrics
-
-    def _get_profiling_data(self, pid: int, duration: int) -> dict[str, Any]:
-        """Get detailed profiling data from py-spy."""
-        profile_path = self.run_py_spy(pid, duration)
-
-        profiling_data = {"flame_graph": profile_path, "call_patterns": [], "execution_paths": [], "bottlenecks": []}
-
-        return profiling_data
+        return exec_stream(self.client, self.container, command, timeout=timeout, on_output=on_output)
 
     def cleanup(self):
-        """Stop and remove container"""
+        """Stop and remove container (or return it to the pool)"""
         if self.container:
-            self.container.stop()
-            self.container.remove()
+            if self.pool:
+                self.pool.release(self.container)
+            else:
+                self.container.stop()
+                self.container.remove()
             self.container = None
+
+
+def ensure_image(client: docker.DockerClient, config: AirflowVersionConfig) -> str:
+    """Build the image for ``config`` unless an image with its config-hash tag already exists; returns the tag."""
+    image_tag = config.image_tag()
+    try:
+        client.images.get(image_tag)
+        return image_tag
+    except ImageNotFound:
+        pass
+
+    # The Dockerfile needs no build context, so it is streamed instead of written to a shared directory
+    dockerfile = io.BytesIO(DockerEnvironmentManager.build_dockerfile(config).encode())
+    client.images.build(fileobj=dockerfile, tag=image_tag, rm=True, labels={CONFIG_HASH_LABEL: config.install_hash()})
+    return image_tag
+
+
+def copy_dag(container: Container, dag_path: Path | str):
+    """Copy a DAG file into ``container`` at ``CONTAINER_DAG_PATH``, or the contents of a DAGs folder into ``CONTAINER_DAGS_FOLDER``."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as archive:
+        archive.add(str(dag_path), arcname="." if Path(dag_path).is_dir() else Path(CONTAINER_DAG_PATH).name)
+    container.put_archive(CONTAINER_DAGS_FOLDER, buffer.getvalue())
+
+
+def exec_stream(
+    client: docker.DockerClient, container: Container, command: list[str], timeout: float | None = DEFAULT_COMMAND_TIMEOUT, on_output: Callable[[str, str], None] | None = None
+) -> ExecResult:
+    """Run ``command`` in ``container``, decoding stdout and stderr incrementally.
+
+    The command is wrapped in coreutils ``timeout`` so it is terminated (and
+    killed after ``KILL_GRACE`` seconds) inside the container; the caller stops
+    waiting shortly after that even if the exec stream never closes.
+
+    Args:
+        client (docker.DockerClient): Client the container belongs to
+        container (Container): Running container
+        command (list[str]): Command and arguments
+        timeout (float, optional): Seconds before the command is terminated; None waits indefinitely
+        on_output (Callable, optional): Called with ``("stdout" | "stderr", text)`` for each decoded chunk
+
+    Returns:
+        ExecResult: Exit code, separate and interleaved output, and whether the command timed out
+    """
+    if timeout is not None:
+        command = ["timeout", "-k", str(KILL_GRACE), str(timeout), *command]
+    exec_id = client.api.exec_create(container.id, command, stdout=True, stderr=True)["Id"]
+    buffer = OutputBuffer(on_output)
+    errors: list[BaseException] = []
+
+    def consume():
+        try:
+            for stdout, stderr in client.api.exec_start(exec_id, stream=True, demux=True):
+                if stdout:
+                    buffer.feed("stdout", stdout)
+                if stderr:
+                    buffer.feed("stderr", stderr)
+            buffer.close()
+        except BaseException as e:
+            errors.append(e)
+
+    start = time.monotonic()
+    reader = threading.Thread(target=consume, name="container-exec-stream", daemon=True)
+    reader.start()
+    reader.join(None if timeout is None else timeout + 2 * KILL_GRACE)
+    seconds = time.monotonic() - start
+    if errors:
+        raise errors[0]
+
+    finished = not reader.is_alive()
+    exit_code = client.api.exec_inspect(exec_id)["ExitCode"] if finished else None
+    # 124: terminated by timeout; 137: killed after the grace period
+    timed_out = not finished or (timeout is not None and (exit_code == 124 or (exit_code == 137 and seconds >= timeout)))
+    return buffer.result(exit_code, timed_out, seconds)
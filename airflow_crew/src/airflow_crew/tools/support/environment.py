@@ -0,0 +1,419 @@
+"""Runtime Environment Interface and Backend Selection"""
+
+import argparse
+import codecs
+import os
+import posixpath
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from airflow_crew.tools.support import hotspots, memory_profile, parse_benchmark, proc_sampler, sql_trace
+
+if TYPE_CHECKING:
+    from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+
+# Commands without an explicit timeout are killed after this many seconds
+DEFAULT_COMMAND_TIMEOUT = 300
+# Seconds between SIGTERM and SIGKILL for a timed-out command
+KILL_GRACE = 5
+# Extra seconds that window-long collectors (py-spy, the /proc sampler) get beyond the profiling duration
+COLLECTOR_GRACE = 30
+# py-spy sampling rate in Hz
+PY_SPY_RATE = 1000
+# Seconds a lifecycle-profiled task run may take
+TASK_PROFILE_TIMEOUT = 600
+# Characters of task output kept in a task profile
+TASK_OUTPUT_TAIL = 4000
+TASK_EXIT_MARKER = "__AIRFLOW_CREW_TASK_EXIT__"
+# Runs the Airflow CLI in the process py-spy launches and reports its exit status and peak RSS
+# (KB, the larger of the process and its reaped children) itself, since py-spy's own exit code
+# does not reflect the profiled command's
+TASK_LAUNCHER = """
+import resource, sys
+from airflow.__main__ import main
+sys.argv[0] = "airflow"
+code = 1
+try:
+    main()
+    code = 0
+except SystemExit as e:
+    code = e.code if isinstance(e.code, int) else int(e.code is not None)
+finally:
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(MARKER, code, peak, file=sys.stderr, flush=True)
+sys.exit(code)
+"""
+BACKENDS = ("docker", "local")
+DEFAULT_BACKEND = os.environ.get("AIRFLOW_CREW_BACKEND", "docker")
+
+
+class ExecResult(NamedTuple):
+    """Outcome of a command run in an environment"""
+
+    exit_code: int | None  # None if the command could not be waited for
+    stdout: str
+    stderr: str
+    output: str  # stdout and stderr interleaved in arrival order, like ``exec_run``
+    timed_out: bool
+    seconds: float
+
+
+class OutputBuffer:
+    """Incrementally decodes a command's stdout and stderr chunks and collects them for an ``ExecResult``."""
+
+    def __init__(self, on_output: Callable[[str, str], None] | None = None):
+        self.on_output = on_output
+        self.decoders = {name: codecs.getincrementaldecoder("utf-8")(errors="replace") for name in ("stdout", "stderr")}
+        self.streams: dict[str, list[str]] = {"stdout": [], "stderr": []}
+        self.output: list[str] = []
+        self.lock = threading.Lock()  # stdout and stderr may be read by different threads
+
+    def _emit(self, name: str, text: str):
+        if text:
+            self.streams[name].append(text)
+            self.output.append(text)
+            if self.on_output:
+                self.on_output(name, text)
+
+    def feed(self, name: str, data: bytes):
+        """Decode a chunk of the ``"stdout"`` or ``"stderr"`` stream (may end inside a multi-byte character)."""
+        with self.lock:
+            self._emit(name, self.decoders[name].decode(data))
+
+    def close(self):
+        """Flush partial characters at the end of the streams."""
+        with self.lock:
+            for name, decoder in self.decoders.items():
+                self._emit(name, decoder.decode(b"", final=True))
+
+    def result(self, exit_code: int | None, timed_out: bool, seconds: float) -> ExecResult:
+        """Collected output with the command's outcome."""
+        return ExecResult(exit_code, "".join(self.streams["stdout"]), "".join(self.streams["stderr"]), "".join(self.output), timed_out, seconds)
+
+
+class EnvironmentManager(ABC):
+    """Runtime environment with Airflow installed, in which DAG files are run and profiled
+
+    Backends provide the environment lifecycle (``create_container``,
+    ``restore_metadata_db`` and ``cleanup``) and command execution
+    (``stream_command``); running the Airflow CLI, profiling and metric
+    collection are built on those and shared.
+    """
+
+    # Path of the DAG under test as seen by commands run in the environment
+    dag_file: str
+    # Airflow's DAGs folder in the environment, holding ``dag_file`` or a whole copied DAGs folder
+    dags_folder: str = ""
+    # SQLite metadata DB of the environment, readable with the standard library for post-run queries
+    metadata_db_path: str = ""
+    # Active environment handle (e.g. a container), None before ``create_container``
+    container: Any = None
+
+    @abstractmethod
+    def create_container(self, config: "AirflowVersionConfig", dag_path: Path) -> Any:
+        """Prepare an environment for ``config`` with ``dag_path`` at ``dag_file`` (or, for a directory, in ``dags_folder``), reusing a cached one where possible"""
+
+    @abstractmethod
+    def restore_metadata_db(self):
+        """Reset the metadata DB to the verified-clean template the environment started with, discarding runs since"""
+
+    @abstractmethod
+    def stream_command(self, command: list[str], timeout: float | None = DEFAULT_COMMAND_TIMEOUT, on_output: Callable[[str, str], None] | None = None) -> ExecResult:
+        """Execute command in the environment, decoding output as it arrives"""
+
+    @abstractmethod
+    def cleanup(self):
+        """Release the environment"""
+
+    def execute_command(self, command: list[str], timeout: float | None = DEFAULT_COMMAND_TIMEOUT) -> tuple[int | None, str]:
+        """Execute command in the environment"""
+        result = self.stream_command(command, timeout=timeout)
+        return result.exit_code, result.output
+
+    def run_commands(self, commands: dict[str, list[str]], timeout: float | None = DEFAULT_COMMAND_TIMEOUT) -> dict[str, ExecResult]:
+        """Execute several commands in the environment at once; results are keyed like ``commands``."""
+        if not commands:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(commands), thread_name_prefix="environment-exec") as executor:
+            futures = {name: executor.submit(self.stream_command, command, timeout) for name, command in commands.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def importtime(self, module: str) -> str:
+        """Import ``module`` in the environment under ``-X importtime`` and return the report.
+
+        Usable as the runner of ``ImportCostTable.measure`` to build the import-cost table for this environment.
+        """
+        _, output = self.execute_command(["python", "-X", "importtime", "-c", f"import {module}"])
+        return output
+
+    @property
+    def sql_trace_dir(self) -> str:
+        """Where traced commands write their SQL logs: under Airflow's logs folder, so it is cleared with them."""
+        return posixpath.join(posixpath.dirname(self.metadata_db_path), "logs", "sql_trace")
+
+    def traced(self, command: list[str], tag: str) -> list[str]:
+        """``command`` with SQLAlchemy statement tracing injected into its Python processes; see ``sql_trace``."""
+        return sql_trace.wrap(command, self.sql_trace_dir, tag)
+
+    def read_sql_trace(self, pattern: str) -> dict[str, Any]:
+        """Aggregated SQL trace of the logs matching ``pattern`` (``<tag>-<pid>.log``)."""
+        _, output = self.execute_command(sql_trace.read_command(self.sql_trace_dir, pattern))
+        return sql_trace.aggregate(sql_trace.parse_logs(output))
+
+    def run_py_spy(self, pid: int, duration: int = 60) -> str:
+        """Run py-spy on specified process and return its collapsed stacks (``frame;frame;... count`` lines)"""
+        # Raw output written to stdout streams straight out of the environment, with no profile file to copy back
+        cmd = ["py-spy", "record", "--pid", str(pid), "--format", "raw", "--full-filenames", "--output", "/dev/stdout", "--duration", str(duration), "--rate", str(PY_SPY_RATE)]
+
+        result = self.stream_command(cmd, timeout=duration + COLLECTOR_GRACE)
+        if result.exit_code != 0 and not result.stdout:
+            raise RuntimeError(f"py-spy failed: {result.stderr.strip() or result.output.strip()}")
+        return result.stdout
+
+    def profile_task(
+        self, dag_id: str, task_id: str, logical_date: str = "2024-01-01", timeout: float = TASK_PROFILE_TIMEOUT, flame_graph_dir: Path | str | None = None, keep_stacks: bool = False
+    ) -> dict[str, Any]:
+        """Run ``airflow tasks test`` under py-spy from its first instruction and break the samples down by lifecycle phase.
+
+        py-spy launches the task process itself, so interpreter start-up, Airflow
+        imports and DAG parsing are sampled as well as ``execute()``. Idle samples
+        are kept, so phase times reflect wall time spent waiting on I/O or the
+        metadata DB too.
+
+        Args:
+            dag_id (str): DAG to run
+            task_id (str): Task to run
+            logical_date (str): Logical date passed to ``tasks test``
+            timeout (float): Seconds before the task run is killed
+            flame_graph_dir (Path, optional): Directory to write the flame graph SVG of the whole run to
+            keep_stacks (bool): Include the parsed py-spy stacks as ``stacks``, e.g. to compare runs
+
+        Returns:
+            dict: Exit code, wall time, peak RSS, per-phase times and hotspot tables, SQL statement metrics, and the tail of the task output
+        """
+        # The task logs to stdout, so it and py-spy's status lines are moved to stderr and only the stacks arrive on stdout
+        script = 'exec 3>&1 1>&2; exec py-spy record --format raw --full-filenames --idle --rate "$0" --output /dev/fd/3 -- "$@"'
+        launcher = TASK_LAUNCHER.replace("MARKER", repr(TASK_EXIT_MARKER))
+        cmd = ["sh", "-c", script, str(PY_SPY_RATE), "python", "-c", launcher, "tasks", "test", dag_id, task_id, logical_date]
+        tag = f"task-{uuid.uuid4().hex[:12]}"
+        result = self.stream_command(self.traced(cmd, tag), timeout=timeout)
+        db = self.read_sql_trace(f"{tag}-*.log")
+
+        stacks = hotspots.parse_collapsed(result.stdout)
+        exits = [line.split() for line in result.stderr.splitlines() if line.startswith(TASK_EXIT_MARKER)]
+        if not stacks and not exits:
+            raise RuntimeError(f"Task profiling failed: {result.stderr[-TASK_OUTPUT_TAIL:].strip()}")
+        profile = {
+            "task_id": task_id,
+            "exit_code": int(exits[-1][1]) if exits else None,
+            "timed_out": result.timed_out,
+            "wall_seconds": round(result.seconds, 3),
+            "peak_rss_mb": round(int(exits[-1][2]) / 1024, 1) if exits and len(exits[-1]) > 2 else None,
+            **hotspots.lifecycle_profile(stacks, PY_SPY_RATE, dag_file=self.dag_file),
+            "db": db,
+            "xcom": db.pop("xcom"),
+            "flame_graph": None,
+            "output_tail": result.stderr[-TASK_OUTPUT_TAIL:],
+        }
+        if flame_graph_dir is not None and stacks:
+            profile["flame_graph"] = hotspots.write_flamegraph(stacks, Path(flame_graph_dir) / f"{dag_id}.{task_id}-{time.strftime('%Y%m%dT%H%M%S')}.svg", title=f"{dag_id}.{task_id}")
+        if keep_stacks:
+            profile["stacks"] = stacks
+        return profile
+
+    def get_performance_metrics(self, pid: int, duration: int = 60, flame_graph_dir: Path | str | None = None, task: tuple[str, str, str] | None = None) -> dict[str, Any]:
+        """Collect comprehensive performance metrics for analysis.
+
+        This expands on py-spy by collecting:
+        - CPU utilization per function/task
+        - Memory allocation patterns
+        - I/O operations and wait times
+        - Database query patterns and timing
+        - Task scheduling overhead
+        - XCom push/pull sizes and timing
+        - Lock contention points
+
+        Returns structured metrics suitable for LLM analysis. With ``flame_graph_dir``,
+        a flame graph SVG of the py-spy samples is also written there. After the
+        profiling window, the DAG file's parse time is benchmarked, and memory
+        allocations and leaks are traced over repeated parses of it, each followed
+        by a run of ``task`` (``(dag_id, task_id, logical_date)``) on a restored
+        metadata DB if given.
+        Database and XCom metrics need ``pid`` to have been started through ``traced``.
+        """
+        # Every collector runs while py-spy samples, so the window takes about ``duration`` seconds
+        collectors = {
+            "samples": (self._sample_process, pid, duration),
+            "db": (self._get_db_metrics, pid, duration),
+            "profiling": (self._get_profiling_data, pid, duration, flame_graph_dir),
+        }
+        with ThreadPoolExecutor(max_workers=len(collectors), thread_name_prefix="metrics-collector") as executor:
+            futures = {name: executor.submit(*collector) for name, collector in collectors.items()}
+        results = {name: future.result() for name, future in futures.items()}
+        samples = results.pop("samples")
+        # The parse benchmark starts interpreters back to back, which would compete with the sampled process for CPU
+        results["scheduling"] = self._get_scheduling_metrics(pid)
+        # Tracing re-runs the task several times: inside the window it would skew the samples, and it needs a clean metadata DB
+        if task:
+            self.restore_metadata_db()
+        allocations = self._trace_allocations(task)
+
+        metrics = {
+            "cpu": self._get_cpu_metrics(samples, results["profiling"]),
+            "memory": self._get_memory_metrics(samples, allocations),
+            "io": self._get_io_metrics(samples),
+            "xcom": results["db"].pop("xcom"),
+            **results,
+            "summary": {"bottlenecks": [], "recommendations": []},
+        }
+
+        return metrics
+
+    def _sample_process(self, pid: int, duration: int = 60) -> dict[str, Any]:
+        """Sample /proc and cgroup counters of ``pid`` over the profiling window."""
+        return proc_sampler.sample_process(pid, lambda args: self.execute_command(["python", *args], timeout=duration + COLLECTOR_GRACE)[1], duration=duration)
+
+    def _get_cpu_metrics(self, samples: dict[str, Any], profiling: dict[str, Any]) -> dict[str, Any]:
+        """Collect CPU utilization metrics per function/task."""
+        cpu_metrics = {
+            "utilization_percent": samples["series"]["cpu_percent"],
+            "cgroup_utilization_percent": samples["series"]["cgroup_cpu_percent"],
+            "throttled_percent": samples["series"]["cgroup_throttled_percent"],
+            "execution_time": samples["totals"]["cpu_seconds"],
+            "context_switches": {"voluntary": samples["totals"]["voluntary_ctx_switches"], "involuntary": samples["totals"]["involuntary_ctx_switches"]},
+            "summary": samples["summary"]["cpu_percent"],
+            "hotspots": profiling["hotspots"],
+        }
+
+        return cpu_metrics
+
+    def _trace_allocations(self, task: tuple[str, str, str] | None = None) -> dict[str, Any] | None:
+        """tracemalloc profile of repeated parses of the DAG file (and runs of ``task``), or None without a DAG file."""
+        if not self.dag_file:
+            return None
+        return memory_profile.profile_memory(self.dag_file, task, runner=lambda args: self.execute_command(["python", *args], timeout=memory_profile.MEMORY_TIMEOUT)[1])
+
+    def _get_memory_metrics(self, samples: dict[str, Any], allocations: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Analyze memory usage patterns: RSS from the samples, allocation sites, leaks and retained objects from tracemalloc."""
+        memory_metrics = {
+            "rss_mb": samples["series"]["rss_mb"],
+            "peak_rss_mb": samples["totals"]["peak_rss_mb"],
+            "virtual_mb": samples["totals"]["virtual_mb"],
+            "cgroup_memory_mb": samples["series"]["cgroup_memory_mb"],
+            "cgroup_peak_mb": samples["totals"]["cgroup_memory_peak_mb"],
+            "summary": samples["summary"]["rss_mb"],
+            "allocations": allocations["allocations"] if allocations else [],
+            "leaks": allocations["leaks"] if allocations else [],
+            "large_objects": allocations["large_objects"] if allocations else [],
+            "traced_kb": allocations["traced_kb"] if allocations else [],
+        }
+
+        return memory_metrics
+
+    def _get_io_metrics(self, samples: dict[str, Any]) -> dict[str, Any]:
+        """Collect I/O operation metrics."""
+        totals = samples["totals"]
+        io_metrics = {
+            "read_bytes": totals["read_bytes"],
+            "write_bytes": totals["write_bytes"],
+            # Share of the window spent blocked on block I/O (needs kernel delay accounting, otherwise 0)
+            "io_wait": round(100 * totals["io_wait_seconds"] / totals["seconds"], 2) if totals["seconds"] else 0.0,
+            "read_bytes_per_s": samples["series"]["read_bytes_per_s"],
+            "write_bytes_per_s": samples["series"]["write_bytes_per_s"],
+            # Bytes passed to read()/write() calls, including ones served from the page cache
+            "syscall_bytes": {"read": totals["read_syscall_bytes"], "write": totals["write_syscall_bytes"]},
+            "patterns": {"sequential_reads": 0, "random_reads": 0, "write_patterns": []},
+        }
+
+        return io_metrics
+
+    def _get_db_metrics(self, pid: int, duration: int = 60) -> dict[str, Any]:
+        """Analyze database operations: the SQL trace of ``pid`` at the end of the window.
+
+        Only processes started through ``traced`` have a trace; for others the
+        result has ``instrumented`` set to False and no queries.
+        """
+        time.sleep(duration)
+        return self.read_sql_trace(f"*-{pid}.log")
+
+    def _get_scheduling_metrics(self, pid: int) -> dict[str, Any]:
+        """Analyze task scheduling patterns; the DAG file's parse time is its cold p50 from a repeated-parse benchmark."""
+        benchmark = None
+        if self.dag_file:
+            benchmark = parse_benchmark.benchmark_parse(self.dag_file, runner=lambda args: self.execute_command(["python", *args], timeout=parse_benchmark.PARSE_TIMEOUT)[1])
+        scheduling_metrics = {
+            "dag_file_parse_time": benchmark["cold"]["total_ms"]["p50"] / 1000 if benchmark else 0.0,
+            "parse_benchmark": benchmark,
+            "task_instances": [],
+            "queue_metrics": {"waiting_time": [], "execution_time": [], "overlaps": []},
+        }
+
+        return scheduling_metrics
+
+    def _get_profiling_data(self, pid: int, duration: int, flame_graph_dir: Path | str | None = None) -> dict[str, Any]:
+        """Get detailed profiling data from py-spy."""
+        stacks = hotspots.parse_collapsed(self.run_py_spy(pid, duration))
+        profile = hotspots.aggregate(stacks, PY_SPY_RATE, dag_file=self.dag_file)
+
+        flame_graph = None
+        if flame_graph_dir is not None:
+            flame_graph = hotspots.write_flamegraph(stacks, Path(flame_graph_dir) / f"profile-{pid}-{time.strftime('%Y%m%dT%H%M%S')}.svg", title=f"py-spy, pid {pid}, {duration}s")
+
+        profiling_data = {
+            "flame_graph": flame_graph,
+            "samples": profile["samples"],
+            "hotspots": profile["hotspots"],
+            "task_callables": profile["task_callables"],
+            "call_patterns": [],
+            "execution_paths": [],
+            "bottlenecks": [],
+        }
+
+        return profiling_data
+
+
+def add_environment_arguments(parser: argparse.ArgumentParser, required: bool = True):
+    """Add the options that describe an environment (Airflow, Python, providers, metadata DB seed, backend) to ``parser``.
+
+    Without ``required``, ``--airflow-version`` may be left out, e.g. to fall back to the local interpreter.
+    """
+    parser.add_argument("--airflow-version", required=required, default=None, help="Airflow version, e.g. 2.7.3")
+    parser.add_argument("--python-version", default="3.11", help="Python version of the environment (default: 3.11)")
+    parser.add_argument("--provider", action="append", default=[], metavar="NAME==VERSION", help="Provider package to install, e.g. amazon==8.10.0 (repeatable)")
+    parser.add_argument("--connection", action="append", default=[], metavar="CONN_ID=URI", help="Connection to seed into the metadata DB (repeatable)")
+    parser.add_argument("--variable", action="append", default=[], metavar="KEY=VALUE", help="Variable to seed into the metadata DB (repeatable)")
+    parser.add_argument("--backend", default=None, choices=BACKENDS, help="Environment backend (default: $AIRFLOW_CREW_BACKEND or docker)")
+
+
+def config_from_arguments(args: argparse.Namespace) -> "AirflowVersionConfig":
+    """Environment configuration from options added by ``add_environment_arguments``."""
+    from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+
+    return AirflowVersionConfig(
+        airflow_version=args.airflow_version,
+        python_version=args.python_version,
+        providers=dict(provider.split("==", 1) for provider in args.provider),
+        connections=dict(connection.split("=", 1) for connection in args.connection),
+        variables=dict(variable.split("=", 1) for variable in args.variable),
+    )
+
+
+def get_environment_manager(backend: str | None = None) -> EnvironmentManager:
+    """Environment manager for ``backend`` (``AIRFLOW_CREW_BACKEND`` by default): ``docker`` or ``local``."""
+    backend = backend or DEFAULT_BACKEND
+    if backend == "docker":
+        from airflow_crew.tools.support.container_pool import get_default_pool
+        from airflow_crew.tools.support.docker_manager import DockerEnvironmentManager
+
+        return DockerEnvironmentManager(pool=get_default_pool())
+    if backend == "local":
+        from airflow_crew.tools.support.local_environment import LocalEnvironmentManager
+
+        return LocalEnvironmentManager()
+    raise ValueError(f"Unknown environment backend {backend!r}, expected one of {', '.join(BACKENDS)}")
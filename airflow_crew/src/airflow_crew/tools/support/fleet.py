@@ -0,0 +1,244 @@
+"""Parallel Static Analysis over a Fleet of DAG Files"""
+
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, TextIO
+
+from airflow_crew.tools.support import analyzers
+
+DEFAULT_TIMEOUT = 30.0
+# A file that takes down a worker running it alone this many times is reported as crashed instead of retried
+MAX_ATTEMPTS = 2
+TOP_ISSUES = 10
+
+
+class AnalysisTimeout(Exception):
+    """Raised inside a worker when a single file exceeds its time budget."""
+
+
+def default_workers() -> int:
+    """Number of CPUs this process may run on (respects container CPU affinity)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def discover_dag_files(target: str | Path) -> list[Path]:
+    """Expand a directory (searched recursively) or a glob pattern into a sorted list of ``.py`` files."""
+    path = Path(target)
+    if path.is_dir():
+        files = path.rglob("*.py")
+    elif path.is_file():
+        files = [path]
+    else:
+        files = (Path(match) for match in glob.iglob(str(target), recursive=True))
+    return sorted(file for file in files if file.is_file() and file.suffix == ".py")
+
+
+def _raise_timeout(signum, frame):
+    raise AnalysisTimeout
+
+
+def _init_worker():
+    """Let the parent handle Ctrl-C."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def analyze_file(path: str | Path, timeout: float | None = DEFAULT_TIMEOUT, code: str | None = None) -> dict[str, Any]:
+    """Statically analyze a single DAG file, never raising.
+
+    Args:
+        path (str | Path): DAG file to analyze
+        timeout (float, optional): Analysis budget in seconds (main thread only)
+        code (str, optional): File contents, when the caller already read them
+
+    Returns:
+        dict: JSON-serializable record with ``status`` one of ``ok``, ``syntax_error``,
+        ``timeout`` or ``error``.
+    """
+    record: dict[str, Any] = {"path": str(path), "status": "ok"}
+    start = time.perf_counter()
+    # Signals can only be handled on the main thread; elsewhere the analysis runs unbounded
+    use_alarm = bool(timeout) and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    previous_handler = None
+    try:
+        if use_alarm:
+            previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        if code is None:
+            code = Path(path).read_text(encoding="utf-8")
+        result = analyzers.analyze_dag(code)
+        analysis = result["analysis"]
+        record.update({
+            "score": result["score"],
+            "color": result["color"],
+            "issues": analyzers.to_jsonable(analysis["issues"]),
+            "top_level_code": analyzers.to_jsonable(analysis["top_level_code"]),
+        })
+    except AnalysisTimeout:
+        record.update({"status": "timeout", "error": f"Analysis exceeded {timeout}s"})
+    except SyntaxError as e:
+        record.update({"status": "syntax_error", "error": f"{e.msg} (line {e.lineno})"})
+    except Exception as e:
+        record.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    record["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return record
+
+
+class FleetSummary:
+    """Aggregate statistics over per-file analysis records."""
+
+    def __init__(self):
+        self.files = 0
+        self.statuses: Counter = Counter()
+        self.histogram: Counter = Counter()
+        self.issue_types: Counter = Counter()
+        self.issues: Counter = Counter()
+        self.score_total = 0.0
+        self.duration_ms = 0.0
+
+    def add(self, record: dict[str, Any]):
+        """Fold one file's record into the summary."""
+        self.files += 1
+        self.statuses[record["status"]] += 1
+        self.duration_ms += record.get("duration_ms", 0.0)
+        if record["status"] != "ok":
+            return
+
+        score = record["score"]
+        self.score_total += score
+        self.histogram[min(int(score // 10) * 10, 90)] += 1
+
+        findings = list(record["issues"])
+        for group in record["top_level_code"].values():
+            findings.extend(group)
+        # Count each distinct finding once per file so one noisy file does not dominate
+        for issue_type, message in {(issue["type"], issue["message"]) for issue in findings}:
+            self.issue_types[issue_type] += 1
+            self.issues[(issue_type, message)] += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-serializable summary."""
+        analyzed = self.statuses["ok"]
+        return {
+            "files": self.files,
+            "statuses": dict(self.statuses),
+            "mean_score": round(self.score_total / analyzed, 2) if analyzed else None,
+            "score_histogram": {f"{low}-{low + 9 if low < 90 else 100}": self.histogram[low] for low in range(0, 100, 10)},
+            "issue_types": dict(self.issue_types.most_common()),
+            "top_issues": [{"type": issue_type, "message": message, "files": count} for (issue_type, message), count in self.issues.most_common(TOP_ISSUES)],
+            "total_analysis_ms": round(self.duration_ms, 2),
+        }
+
+
+def _analyze_alone(path: str, timeout: float | None) -> dict[str, Any] | None:
+    """Analyze one file in a single-worker pool of its own; None if it crashed that worker."""
+    try:
+        with ProcessPoolExecutor(max_workers=1, initializer=_init_worker) as pool:
+            return pool.submit(analyze_file, path, timeout).result()
+    except BrokenProcessPool:
+        return None
+
+
+def _rerun_suspects(suspects: deque, timeout: float | None, emit: Callable[[dict[str, Any]], None]):
+    """Re-run each ``(path, attempt)`` in ``suspects`` alone, until it completes or has crashed ``MAX_ATTEMPTS`` times."""
+    while suspects:
+        path, attempt = suspects.popleft()
+        record = _analyze_alone(path, timeout)
+        if record is not None:
+            emit(record)
+        elif attempt >= MAX_ATTEMPTS:
+            emit({"path": path, "status": "error", "error": "Worker process crashed", "duration_ms": 0.0})
+        else:
+            suspects.appendleft((path, attempt + 1))
+
+
+def analyze_fleet(target: str | Path, output: TextIO | None = None, workers: int | None = None, timeout: float | None = DEFAULT_TIMEOUT) -> dict[str, Any]:
+    """Analyze every DAG file under ``target`` on a process pool.
+
+    Each file's record is written to ``output`` as one JSON line as soon as that
+    file finishes, in completion order. Only a bounded window of files is in
+    flight at a time, so memory stays flat for large fleets. When a worker
+    crashes, the files that were in flight are re-run one at a time, each in a
+    pool of its own, so the crash is pinned on the file that caused it; a file
+    that crashes on its own is retried once more before being reported.
+
+    Args:
+        target (str | Path): Directory to search recursively, a single file, or a glob pattern
+        output (TextIO, optional): Stream receiving JSON Lines records
+        workers (int, optional): Worker processes (defaults to every available CPU)
+        timeout (float, optional): Per-file analysis budget in seconds
+
+    Returns:
+        dict: Fleet summary with status counts, score histogram and top issues
+    """
+    workers = workers or default_workers()
+    pending = deque((str(path), 1) for path in discover_dag_files(target))
+    suspects: deque = deque()  # in flight when a pool broke, so not yet known to be the cause
+    summary = FleetSummary()
+
+    def emit(record: dict[str, Any]):
+        summary.add(record)
+        if output is not None:
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+    while pending or suspects:
+        _rerun_suspects(suspects, timeout, emit)
+        in_flight: dict = {}
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                while pending or in_flight:
+                    while pending and len(in_flight) < workers * 4:
+                        future = pool.submit(analyze_file, pending[0][0], timeout)
+                        in_flight[future] = pending.popleft()
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record = future.result()
+                        del in_flight[future]
+                        emit(record)
+        except BrokenProcessPool:
+            suspects.extend(in_flight.values())
+
+    return summary.to_dict()
+
+
+def main(argv: list[str] | None = None):
+    """Command-line entry point: stream JSON Lines to stdout (or a file) and print the summary to stderr."""
+    parser = argparse.ArgumentParser(description="Statically analyze every DAG file in a directory or glob.")
+    parser.add_argument("target", help="DAGs directory or glob pattern, e.g. 'dags/**/*.py'")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: all available CPUs)")
+    parser.add_argument("-t", "--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-file timeout in seconds")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file (default: stdout)")
+    parser.add_argument("-s", "--summary", default=None, help="Write the summary JSON to this file instead of stderr")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        summary = analyze_fleet(args.target, output=output, workers=args.workers, timeout=args.timeout)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        json.dump(summary, sys.stderr, indent=2)
+        sys.stderr.write("\n")
+    return summary
@@ -0,0 +1,275 @@
+"""Hotspot Tables and Flame Graphs from Collapsed Stacks"""
+
+import hashlib
+import html
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+# Rows in the per-function hotspot table
+TOP_FUNCTIONS = 25
+# Airflow functions that run an operator's ``execute`` (2.x TaskInstance and module-level variants)
+EXECUTE_FUNCTIONS = frozenset({"_execute_task", "execute_callable", "_execute_callable"})
+IMPORT_FUNCTIONS = frozenset({"_find_and_load"})
+# Phases of a task run, in the order they happen
+LIFECYCLE_PHASES = ("airflow_import", "dag_import", "dag_parse", "execute", "other")
+# Frames narrower than this many pixels are left out of the flame graph
+MIN_FRAME_WIDTH = 0.5
+
+# py-spy writes its status messages to the same stream as the stacks
+STATUS_PREFIX = "py-spy>"
+# py-spy frames look like ``execute (/usr/local/lib/.../python.py:192)``
+FRAME_PATTERN = re.compile(r"^(?P<function>.*) \((?P<file>.*?)(?::(?P<line>\d+))?\)$")
+
+
+def parse_collapsed(text: str) -> list[tuple[tuple[str, ...], int]]:
+    """Parse collapsed stacks (``frame;frame;frame count`` per line, root first)."""
+    stacks = []
+    for line in text.splitlines():
+        if line.startswith(STATUS_PREFIX):
+            continue
+        stack, _, count = line.rstrip().rpartition(" ")
+        if stack and count.isdigit():
+            stacks.append((tuple(stack.split(";")), int(count)))
+    return stacks
+
+
+def split_frame(frame: str) -> tuple[str, str]:
+    """``(function, file)`` of a frame, dropping the line number so samples aggregate per function."""
+    match = FRAME_PATTERN.match(frame)
+    return (match["function"], match["file"]) if match else (frame, "")
+
+
+def _rows(self_counts: Counter, total_counts: Counter, samples: int, rate: int, limit: int | None, by: str = "self_samples") -> list[dict[str, Any]]:
+    rows = []
+    for (function, file), total in total_counts.items():
+        own = self_counts.get((function, file), 0)
+        rows.append({
+            "function": function,
+            "file": file,
+            "self_samples": own,
+            "total_samples": total,
+            "self_seconds": round(own / rate, 3),
+            "total_seconds": round(total / rate, 3),
+            "self_percent": round(100 * own / samples, 2),
+            "total_percent": round(100 * total / samples, 2),
+        })
+    rows.sort(key=lambda row: (row[by], row["self_samples"] + row["total_samples"]), reverse=True)
+    return rows[:limit]
+
+
+def aggregate(stacks: list[tuple[tuple[str, ...], int]], rate: int, dag_file: str | None = None, limit: int | None = TOP_FUNCTIONS) -> dict[str, Any]:
+    """Self and total time per function, and per DAG task callable.
+
+    A function's self time counts samples where it is the innermost frame;
+    total time counts samples where it is anywhere on the stack (once per
+    sample, however deep the recursion). A task callable is the outermost
+    function defined in ``dag_file`` other than its module body; everything
+    it calls, in any library, is attributed to it.
+
+    Args:
+        stacks (list): Parsed collapsed stacks with sample counts
+        rate (int): Sampling rate in Hz, to convert samples to seconds
+        dag_file (str, optional): DAG file path as it appears in the frames
+        limit (int, optional): Number of functions to keep, hottest self time first
+
+    Returns:
+        dict: Sample totals, the ``hotspots`` table (by self time) and the ``task_callables`` table (by total time)
+    """
+    samples = sum(count for _, count in stacks)
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    callable_self: Counter = Counter()
+    callable_total: Counter = Counter()
+    for frames, count in stacks:
+        functions = [split_frame(frame) for frame in frames]
+        self_counts[functions[-1]] += count
+        for function in set(functions):
+            total_counts[function] += count
+        if dag_file:
+            task_callable = next((function for function in functions if function[1] == dag_file and function[0] != "<module>"), None)
+            if task_callable:
+                callable_total[task_callable] += count
+                callable_self[task_callable] += count if functions[-1] == task_callable else 0
+
+    return {
+        "samples": samples,
+        "rate": rate,
+        "seconds": round(samples / rate, 3) if rate else 0.0,
+        "hotspots": _rows(self_counts, total_counts, samples, rate, limit) if samples else [],
+        "task_callables": _rows(callable_self, callable_total, samples, rate, None, by="total_samples") if samples else [],
+    }
+
+
+def lifecycle_phase(functions: list[tuple[str, str]], dag_file: str) -> str:
+    """Phase of a task run that a sampled stack belongs to.
+
+    ``execute`` covers everything under Airflow's execute wrappers; the DAG
+    file's module body is ``dag_import`` while it imports and ``dag_parse``
+    otherwise; imports outside the DAG file are ``airflow_import`` and the
+    rest (CLI setup, metadata DB, state updates) is ``other``.
+    """
+    names = [name for name, _ in functions]
+    if not EXECUTE_FUNCTIONS.isdisjoint(names):
+        return "execute"
+    for i, (name, file) in enumerate(functions):
+        if name == "<module>" and file == dag_file:
+            return "dag_import" if not IMPORT_FUNCTIONS.isdisjoint(names[i + 1 :]) else "dag_parse"
+    return "airflow_import" if not IMPORT_FUNCTIONS.isdisjoint(names) else "other"
+
+
+def lifecycle_profile(stacks: list[tuple[tuple[str, ...], int]], rate: int, dag_file: str, limit: int | None = TOP_FUNCTIONS) -> dict[str, Any]:
+    """Split the samples of a whole task run by lifecycle phase.
+
+    Args:
+        stacks (list): Parsed collapsed stacks of the task process, sampled from its start
+        rate (int): Sampling rate in Hz
+        dag_file (str): DAG file path as it appears in the frames
+        limit (int, optional): Rows per hotspot table
+
+    Returns:
+        dict: Samples and seconds per phase, plus hotspot tables for ``execute`` and for DAG parsing (imports included)
+    """
+    by_phase: dict[str, list[tuple[tuple[str, ...], int]]] = {phase: [] for phase in LIFECYCLE_PHASES}
+    for frames, count in stacks:
+        by_phase[lifecycle_phase([split_frame(frame) for frame in frames], dag_file)].append((frames, count))
+
+    samples = sum(count for _, count in stacks)
+    phases = {}
+    for phase, phase_stacks in by_phase.items():
+        phase_samples = sum(count for _, count in phase_stacks)
+        phases[phase] = {"samples": phase_samples, "seconds": round(phase_samples / rate, 3), "percent": round(100 * phase_samples / samples, 2) if samples else 0.0}
+
+    return {
+        "samples": samples,
+        "rate": rate,
+        "phases": phases,
+        "execute": aggregate(by_phase["execute"], rate, dag_file=dag_file, limit=limit),
+        "dag_parse": aggregate(by_phase["dag_import"] + by_phase["dag_parse"], rate, limit=limit),
+    }
+
+
+def normalize_stacks(stacks: list[tuple[tuple[str, ...], int]], dag_file: str | None = None, dag_name: str = "<dag>") -> list[tuple[tuple[str, ...], int]]:
+    """Merge stacks per function path, dropping line numbers and renaming ``dag_file``, so runs of two versions of a DAG line up."""
+    merged: Counter = Counter()
+    for frames, count in stacks:
+        merged[tuple(f"{function} ({dag_name if dag_file and file == dag_file else file})" for function, file in map(split_frame, frames))] += count
+    return list(merged.items())
+
+
+def compare_hotspots(before: list[tuple[tuple[str, ...], int]], after: list[tuple[tuple[str, ...], int]], rate: int, runs: int = 1, limit: int | None = TOP_FUNCTIONS) -> list[dict[str, Any]]:
+    """Change in self and total seconds per function between two sets of stacks, each covering ``runs`` runs; largest change first."""
+    counts = []
+    for stacks in (before, after):
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for frames, count in stacks:
+            functions = [split_frame(frame) for frame in frames]
+            self_counts[functions[-1]] += count
+            for function in set(functions):
+                total_counts[function] += count
+        counts.append((self_counts, total_counts))
+    (self_before, total_before), (self_after, total_after) = counts
+    scale = rate * max(1, runs)
+    rows = []
+    for function, file in total_before.keys() | total_after.keys():
+        key = (function, file)
+        rows.append({
+            "function": function,
+            "file": file,
+            "self_seconds_before": round(self_before[key] / scale, 3),
+            "self_seconds_after": round(self_after[key] / scale, 3),
+            "self_delta_seconds": round((self_after[key] - self_before[key]) / scale, 3),
+            "total_seconds_before": round(total_before[key] / scale, 3),
+            "total_seconds_after": round(total_after[key] / scale, 3),
+            "total_delta_seconds": round((total_after[key] - total_before[key]) / scale, 3),
+        })
+    rows.sort(key=lambda row: (abs(row["total_delta_seconds"]), abs(row["self_delta_seconds"])), reverse=True)
+    return rows[:limit]
+
+
+class _Node:
+    __slots__ = ("count", "children")
+
+    def __init__(self):
+        self.count = 0
+        self.children: dict[str, _Node] = {}
+
+
+def _color(frame: str) -> str:
+    """Stable warm color per function, as in classic flame graphs."""
+    digest = hashlib.blake2b(split_frame(frame)[0].encode(), digest_size=2).digest()
+    return f"rgb({205 + digest[0] % 50},{digest[1] % 230},0)"
+
+
+def _diff_color(delta: int, scale: int) -> str:
+    """Red for frames with more samples than the baseline, blue for fewer, white for no change."""
+    fade = 255 - round(205 * min(1.0, abs(delta) / scale)) if scale else 255
+    return f"rgb(255,{fade},{fade})" if delta > 0 else f"rgb({fade},{fade},255)"
+
+
+def _tree(stacks: list[tuple[tuple[str, ...], int]]) -> _Node:
+    root = _Node()
+    for frames, count in stacks:
+        node = root
+        node.count += count
+        for frame in frames:
+            node = node.children.setdefault(frame, _Node())
+            node.count += count
+    return root
+
+
+def render_flamegraph(stacks: list[tuple[tuple[str, ...], int]], title: str = "Flame Graph", width: int = 1200, row_height: int = 16, baseline: list[tuple[tuple[str, ...], int]] | None = None) -> str:
+    """Render collapsed stacks as a static SVG flame graph (hover a frame for its name and sample count).
+
+    With ``baseline`` stacks (covering as many runs as ``stacks``), it is a
+    differential flame graph: frames are laid out from ``stacks`` and colored
+    red where they have more samples than in the baseline, blue where fewer.
+    """
+    root = _tree(stacks)
+    base = _tree(baseline) if baseline is not None else None
+
+    rects: list[tuple[str, int, int | None, float, int, float]] = []
+    max_level = 0
+
+    def layout(node: _Node, base_node: _Node | None, x: float, level: int):
+        nonlocal max_level
+        for frame, child in sorted(node.children.items()):
+            frame_width = child.count / root.count * width
+            base_child = base_node.children.get(frame) if base_node is not None else None
+            if frame_width >= MIN_FRAME_WIDTH:
+                max_level = max(max_level, level)
+                delta = child.count - (base_child.count if base_child is not None else 0) if base is not None else None
+                rects.append((frame, child.count, delta, x, level, frame_width))
+                layout(child, base_child, x, level + 1)
+            x += frame_width
+
+    if root.count:
+        layout(root, base, 0.0, 0)
+    scale = max((abs(rect[2]) for rect in rects if rect[2] is not None), default=0)
+    height = (max_level + 2) * row_height + 24
+    body = []
+    for frame, count, delta, x, level, frame_width in rects:
+        y = height - (level + 1) * row_height
+        label = html.escape(frame)
+        text = html.escape(split_frame(frame)[0][: int(frame_width / 7)]) if frame_width > 21 else ""
+        change = f", {delta:+d} vs baseline" if delta is not None else ""
+        fill = _diff_color(delta, scale) if delta is not None else _color(frame)
+        body.append(
+            f"<g><title>{label} ({count} samples, {100 * count / root.count:.2f}%{change})</title>"
+            f'<rect x="{x:.1f}" y="{y}" width="{frame_width:.1f}" height="{row_height - 1}" fill="{fill}"/>'
+            f'<text x="{x + 3:.1f}" y="{y + row_height - 4}">{text}</text></g>'
+        )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">'
+        f'<text x="{width / 2}" y="16" text-anchor="middle" font-size="14">{html.escape(title)}</text>' + "".join(body) + "</svg>"
+    )
+
+
+def write_flamegraph(stacks: list[tuple[tuple[str, ...], int]], path: Path | str, title: str = "Flame Graph", baseline: list[tuple[tuple[str, ...], int]] | None = None) -> str:
+    """Write the flame graph SVG (differential against ``baseline``, if given) to ``path``; returns the path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(render_flamegraph(stacks, title, baseline=baseline))
+    return str(path)
@@ -0,0 +1,295 @@
+"""Diff-aware Incremental Static Analysis"""
+
+import ast
+import copy
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from airflow_crew.tools.support import analyzers
+from airflow_crew.tools.support.cache import content_key, get_default_cache
+from airflow_crew.tools.support.rules import Rule, run_rules
+
+# Number of per-DAG sessions kept alive by ``get_session``
+MAX_SESSIONS = 64
+# How far (in characters) past the current position an unchanged statement is searched for
+SEARCH_WINDOW = 64 * 1024
+# Share of the new source that may need re-parsing before a full parse is cheaper than piecing the rest together
+MAX_REPARSE_FRACTION = 0.5
+
+
+class IncrementalAnalysisMismatch(AssertionError):
+    """Raised by verification when incremental and full analysis disagree."""
+
+
+class StatementUnit:
+    """One or more top-level statements occupying a contiguous line range, with their findings."""
+
+    __slots__ = ("start", "end", "statements", "offset", "results")
+
+    def __init__(self, start: int, end: int, statements: list[ast.stmt]):
+        self.start = start  # 0-based first line, including decorators
+        self.end = end  # 0-based last line, inclusive
+        self.statements = statements  # as parsed; never mutated because findings reference their nodes
+        self.offset = 0  # lines moved since the statements were parsed
+        self.results: dict[str, Any] = {}
+
+    def shift(self, delta: int):
+        """Move the unit ``delta`` lines, rebasing line numbers in its findings."""
+        if not delta:
+            return
+        self.start += delta
+        self.end += delta
+        self.offset += delta
+        # Findings may already have been handed out to callers, so shift a copy
+        self.results = _shift_lines(copy.deepcopy(self.results), delta)
+
+    def current_statements(self) -> list[ast.stmt]:
+        """Statements with line numbers matching the current source."""
+        if not self.offset:
+            return self.statements
+        statements = copy.deepcopy(self.statements)
+        for statement in statements:
+            ast.increment_lineno(statement, self.offset)
+        return statements
+
+
+def _shift_lines(value: Any, delta: int) -> Any:
+    """Add ``delta`` to every ``line`` field and AST node position in a rule result."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "line" and isinstance(item, int):
+                value[key] = item + delta
+            else:
+                _shift_lines(item, delta)
+    elif isinstance(value, list | tuple):
+        for item in value:
+            _shift_lines(item, delta)
+    elif isinstance(value, ast.AST):
+        ast.increment_lineno(value, delta)
+    return value
+
+
+def _line_starts(code: str) -> list[int]:
+    """Char offset of the start of every line."""
+    starts = [0]
+    position = code.find("\n")
+    while position >= 0:
+        starts.append(position + 1)
+        position = code.find("\n", position + 1)
+    return starts
+
+
+def _covers_lines(code: str, position: int, length: int) -> bool:
+    """Whether ``code[position:position + length]`` starts and ends on line boundaries."""
+    end = position + length
+    return (position == 0 or code[position - 1] == "\n") and (end == len(code) or code[end - 1] == "\n")
+
+
+def _find_statements(code: str, text: str, expected: int, cursor: int) -> int:
+    """Offset of ``text`` as whole lines in ``code``: at ``expected`` or else within ``SEARCH_WINDOW`` past ``cursor``; -1 if absent."""
+    if code.startswith(text, expected) and _covers_lines(code, expected, len(text)):
+        return expected
+    limit = cursor + SEARCH_WINDOW + len(text)
+    position = code.find(text, cursor, limit)
+    while position >= 0 and not _covers_lines(code, position, len(text)):
+        position = code.find(text, position + 1, limit)
+    return position
+
+
+def _split_units(tree: ast.Module) -> list[StatementUnit]:
+    """Group top-level statements into units; statements sharing a line (``a = 1; b = 2``) form one unit."""
+    units: list[StatementUnit] = []
+    for statement in tree.body:
+        start = min([statement.lineno] + [decorator.lineno for decorator in getattr(statement, "decorator_list", [])]) - 1
+        end = statement.end_lineno - 1
+        if units and start <= units[-1].end:
+            units[-1].end = max(units[-1].end, end)
+            units[-1].statements.append(statement)
+        else:
+            units.append(StatementUnit(start, end, [statement]))
+    return units
+
+
+class IncrementalAnalyzer:
+    """Re-run static rules only on the top-level statements that changed since the previous call.
+
+    The analyzer keeps the previous source, its top-level statement ASTs and each
+    statement's rule findings. On update, every previous statement whose source
+    text reappears unchanged is reused (with line numbers rebased) and only the
+    text between reused statements is re-parsed and re-analyzed. All default
+    rules are statement-local, so merging the per-statement findings in source
+    order yields exactly the full-walk result. When the changed regions cannot be
+    parsed on their own (for example an edit that opens a bracket spanning into
+    an unchanged statement), the analyzer falls back to a full parse.
+    """
+
+    def __init__(self, rule_factory: Callable[[], list[Rule]] = analyzers.get_default_rules):
+        self.rule_factory = rule_factory
+        self.code = ""
+        self.line_starts: list[int] = [0]
+        self.units: list[StatementUnit] = []
+        self.stats = {"updates": 0, "full": 0, "reused_statements": 0, "analyzed_statements": 0}
+
+    @property
+    def tree(self) -> ast.Module:
+        """AST of the most recently analyzed source."""
+        return ast.Module(body=[statement for unit in self.units for statement in unit.current_statements()], type_ignores=[])
+
+    def _analyze_unit(self, unit: StatementUnit):
+        unit.results = run_rules(ast.Module(body=unit.statements, type_ignores=[]), self.rule_factory())
+        self.stats["analyzed_statements"] += len(unit.statements)
+
+    def _full(self, code: str) -> list[StatementUnit]:
+        units = _split_units(ast.parse(code))
+        for unit in units:
+            self._analyze_unit(unit)
+        self.stats["full"] += 1
+        return units
+
+    def _incremental(self, code: str, line_starts: list[int]) -> list[StatementUnit] | None:
+        """Build units for ``code`` reusing unchanged previous units, or None if a full parse is needed.
+
+        Each previous unit is looked up verbatim in the new source, first at the
+        position implied by the units before it and then within a bounded window,
+        and only accepted when it covers whole lines. Every region between
+        accepted units must parse on its own; since the pieces are complete,
+        line-aligned modules, their concatenation parses to the same statements.
+        Once the regions exceed ``MAX_REPARSE_FRACTION`` of the source, as when
+        the whole DAG sits in one edited ``with`` block, a full parse is cheaper.
+        """
+        old_code, old_starts = self.code, self.line_starts
+        units: list[StatementUnit] = []
+        moves: list[tuple[StatementUnit, int]] = []
+        cursor = 0  # char offset in the new source up to which units are assigned
+        old_cursor = 0  # matching offset in the old source
+        reparse_budget = MAX_REPARSE_FRACTION * len(code)  # chars that may still be re-parsed
+
+        for unit in self.units:
+            start_char = old_starts[unit.start]
+            end_char = old_starts[unit.end + 1] if unit.end + 1 < len(old_starts) else len(old_code)
+            text = old_code[start_char:end_char]
+            position = _find_statements(code, text, cursor + (start_char - old_cursor), cursor)
+            if position < 0:
+                continue
+
+            reparse_budget -= position - cursor
+            if reparse_budget < 0:
+                return None
+            gap_units = self._parse_gap(code, line_starts, cursor, position)
+            if gap_units is None:
+                return None
+            units.extend(gap_units)
+            moves.append((unit, bisect_left(line_starts, position) - unit.start))
+            units.append(unit)
+            cursor = position + len(text)
+            old_cursor = end_char
+
+        if len(code) - cursor > reparse_budget:
+            return None
+        gap_units = self._parse_gap(code, line_starts, cursor, len(code))
+        if gap_units is None:
+            return None
+        units.extend(gap_units)
+
+        # Only rebase once every changed region parsed, so a fallback leaves the previous state intact
+        for unit, delta in moves:
+            unit.shift(delta)
+        self.stats["reused_statements"] += sum(len(unit.statements) for unit, _ in moves)
+        return units
+
+    def _parse_gap(self, code: str, line_starts: list[int], gap_start: int, gap_end: int) -> list[StatementUnit] | None:
+        """Parse and analyze ``code[gap_start:gap_end]`` as new units, or None if it does not parse on its own."""
+        if gap_end <= gap_start:
+            return []
+        try:
+            # Pad with newlines so nodes get their final line numbers without an extra tree walk
+            gap = ast.parse("\n" * bisect_left(line_starts, gap_start) + code[gap_start:gap_end])
+        except SyntaxError:
+            return None
+        if gap_start and any(isinstance(statement, ast.ImportFrom) and statement.module == "__future__" for statement in gap.body):
+            # __future__ imports are only legal at the top of the full file
+            return None
+        units = _split_units(gap)
+        for unit in units:
+            self._analyze_unit(unit)
+        return units
+
+    def update(self, code: str) -> dict[str, Any]:
+        """Analyze ``code`` and return the default rules' findings, keyed by rule name like ``run_static_rules``."""
+        line_starts = _line_starts(code)
+        # Lone carriage returns are line breaks to the parser but not to the offset bookkeeping
+        units = self._incremental(code, line_starts) if self.units and "\r" not in code else None
+        if units is None:
+            units = self._full(code)
+        self.code = code
+        self.line_starts = line_starts
+        self.units = units
+        self.stats["updates"] += 1
+
+        rules = self.rule_factory()
+        for unit in units:
+            for rule in rules:
+                rule.merge(unit.results[rule.name])
+        return {rule.name: rule.result() for rule in rules}
+
+    def analyze_dag(self, code: str, dag=None, verify: bool = False, expand_tasks: bool = False) -> dict[str, Any]:
+        """Incremental equivalent of ``analyzers.analyze_dag``.
+
+        Args:
+            code (str): The DAG code to analyze
+            dag (DAG, optional): DAG object for runtime analysis
+            verify (bool): Also run a full analysis and raise ``IncrementalAnalysisMismatch`` if they differ
+            expand_tasks (bool): Include per-task metrics and scores for runtime analysis
+
+        Returns:
+            dict: Complete analysis results including score, color, and detailed analysis
+        """
+        result = analyzers.build_analysis(self.update(code), dag, expand_tasks)
+        if verify:
+            verify_equivalent(result, analyzers.build_analysis(analyzers.run_static_rules(code), dag, expand_tasks))
+        return result
+
+
+def normalize(value: Any) -> Any:
+    """Comparable form of an analysis result; AST nodes are compared including their positions."""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [normalize(item) for item in value]
+    if isinstance(value, set | frozenset):
+        return sorted(normalize(item) for item in value)
+    if isinstance(value, ast.AST):
+        return ast.dump(value, include_attributes=True)
+    return value
+
+
+def verify_equivalent(incremental_result: dict[str, Any], full_result: dict[str, Any]):
+    """Raise ``IncrementalAnalysisMismatch`` unless both results are identical."""
+    if normalize(incremental_result) != normalize(full_result):
+        raise IncrementalAnalysisMismatch("Incremental analysis result differs from a full re-analysis")
+
+
+_sessions: "OrderedDict[str, IncrementalAnalyzer]" = OrderedDict()
+
+
+def get_session(key: str) -> IncrementalAnalyzer:
+    """Incremental analyzer for one DAG (e.g. keyed by file path), kept across fix iterations."""
+    session = _sessions.pop(key, None) or IncrementalAnalyzer()
+    _sessions[key] = session
+    while len(_sessions) > MAX_SESSIONS:
+        _sessions.popitem(last=False)
+    return session
+
+
+def analyze_dag(code: str, session_key: str, dag=None, expand_tasks: bool = False) -> dict[str, Any]:
+    """``analyzers.analyze_dag`` backed by the content cache and the incremental session for ``session_key``."""
+    cache = get_default_cache() if dag is None else None
+    key = content_key(code, analyzers.analysis_fingerprint()) if cache else None
+    if cache and (cached := cache.get(key)) is not None:
+        return cached
+    result = get_session(session_key).analyze_dag(code, dag, expand_tasks=expand_tasks)
+    if cache:
+        cache.put(key, result)
+    return result
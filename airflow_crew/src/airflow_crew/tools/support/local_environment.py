@@ -0,0 +1,208 @@
+"""Local Virtualenv Environment Backend"""
+
+import fcntl
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+from airflow_crew.tools.support import metadata_db
+from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+from airflow_crew.tools.support.environment import DEFAULT_COMMAND_TIMEOUT, KILL_GRACE, EnvironmentManager, ExecResult, OutputBuffer
+
+VENV_ROOT = Path(os.environ.get("AIRFLOW_CREW_VENV_DIR", Path.home() / ".cache" / "airflow_crew" / "venvs"))
+# Written last, so a directory without it is a build that did not finish
+READY_MARKER = ".ready"
+TEMPLATE_HOME = "airflow_home"
+BUILD_TIMEOUT = 1800
+# Environment variables that would leak the host interpreter's packages into the venv
+ISOLATED_VARIABLES = ("PYTHONPATH", "PYTHONHOME", "PYTHONSTARTUP", "PYTHONUSERBASE")
+
+
+class LocalEnvironment(NamedTuple):
+    """A cached virtualenv and the throwaway ``AIRFLOW_HOME`` of one manager"""
+
+    venv: Path
+    home: Path
+
+    @property
+    def id(self) -> str:
+        """Identifier like a container ID, for callers that report one."""
+        return self.home.name
+
+
+def find_python(version: str) -> str:
+    """Interpreter for ``version``: the running one if it matches, else ``python<version>`` on PATH."""
+    if f"{sys.version_info.major}.{sys.version_info.minor}" == version:
+        return sys.executable
+    path = shutil.which(f"python{version}")
+    if path is None:
+        raise RuntimeError(f"Python {version} is required for the local backend but python{version} is not on PATH")
+    return path
+
+
+def command_env(venv: Path, home: Path) -> dict[str, str]:
+    """Environment for commands run in ``venv`` with ``home`` as ``AIRFLOW_HOME``."""
+    env = {key: value for key, value in os.environ.items() if key not in ISOLATED_VARIABLES}
+    connection = f"sqlite:///{home / 'airflow.db'}"
+    env.update({
+        "PATH": f"{venv / 'bin'}{os.pathsep}{env.get('PATH', '')}",
+        "VIRTUAL_ENV": str(venv),
+        "AIRFLOW_HOME": str(home),
+        "AIRFLOW__CORE__DAGS_FOLDER": str(home / "dags"),
+        "AIRFLOW__CORE__LOAD_EXAMPLES": "False",
+        "AIRFLOW__DATABASE__SQL_ALCHEMY_CONN": connection,
+        "AIRFLOW__CORE__SQL_ALCHEMY_CONN": connection,  # Airflow < 2.3
+    })
+    return env
+
+
+def build_commands(config: AirflowVersionConfig, venv: Path) -> list[list[str]]:
+    """Commands that install ``config`` into ``venv``, in the same order as the Docker image layers."""
+    constraints = f"https://raw.githubusercontent.com/apache/airflow/constraints-{config.airflow_version}/constraints-{config.python_version}.txt"
+    pip = [str(venv / "bin" / "python"), "-m", "pip", "install", "--no-cache-dir"]
+    commands = [
+        [find_python(config.python_version), "-m", "venv", str(venv)],
+        [*pip, "py-spy"],
+        [*pip, f"apache-airflow=={config.airflow_version}", "--constraint", constraints],
+        [str(venv / "bin" / "airflow"), "db", "init"],
+    ]
+    if config.providers:
+        # Pinning apache-airflow keeps pip from up- or downgrading Airflow to satisfy a provider, and the
+        # constraints keep it from moving Airflow's own dependencies away from the versions Airflow was tested with
+        providers = [f"apache-airflow-providers-{provider}=={version}" for provider, version in sorted(config.providers.items())]
+        commands.append([*pip, f"apache-airflow=={config.airflow_version}", *providers, "--constraint", constraints])
+    return commands
+
+
+def ensure_venv(config: AirflowVersionConfig, root: Path = VENV_ROOT) -> Path:
+    """Virtualenv for ``config``, built on first use and afterwards found by its install-hash directory.
+
+    Builds happen in place (virtualenvs cannot be moved) under a file lock, so
+    concurrent processes wait for one build instead of racing; an unfinished
+    build is discarded and redone.
+    """
+    venv = root / config.install_hash()
+    if (venv / READY_MARKER).exists():
+        return venv
+
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / f"{config.install_hash()}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if (venv / READY_MARKER).exists():
+            return venv
+        shutil.rmtree(venv, ignore_errors=True)
+        env = command_env(venv, venv / TEMPLATE_HOME)
+        for command in build_commands(config, venv):
+            result = subprocess.run(command, env=env, capture_output=True, text=True, timeout=BUILD_TIMEOUT)
+            if result.returncode != 0:
+                raise RuntimeError(f"Building the local environment failed at `{' '.join(command)}`: {(result.stderr or result.stdout)[-2000:]}")
+        (venv / READY_MARKER).write_text(config.model_dump_json())
+    return venv
+
+
+def ensure_template(config: AirflowVersionConfig, venv: Path) -> Path:
+    """Metadata DB template for ``config``: the venv's freshly initialized DB with the config's connections and variables seeded, verified clean."""
+
+    def build(home: Path):
+        env = command_env(venv, home)
+
+        def run(command: list[str]) -> tuple[int, str]:
+            result = subprocess.run(command, env=env, cwd=home, capture_output=True, text=True, timeout=DEFAULT_COMMAND_TIMEOUT)
+            return result.returncode, result.stdout + result.stderr
+
+        metadata_db.prepare_template(run, config, str(home / "airflow.db"))
+
+    return metadata_db.ensure_template(venv / TEMPLATE_HOME / "airflow.db", venv / TEMPLATE_HOME / f"template-{config.config_hash()}.db", build)
+
+
+class LocalEnvironmentManager(EnvironmentManager):
+    """Runs Airflow from a cached virtualenv per configuration, with commands as local subprocesses
+
+    Each manager gets its own temporary ``AIRFLOW_HOME`` holding the DAG under
+    test and a verified copy of the configuration's metadata DB template.
+    """
+
+    def __init__(self, root: Path | str = VENV_ROOT):
+        self.root = Path(root)
+        self.container: LocalEnvironment | None = None
+        self.dag_file = ""
+        self.dags_folder = ""
+        self.metadata_db_path = ""
+        self.template: Path | None = None
+
+    def create_container(self, config: AirflowVersionConfig, dag_path: Path | None) -> LocalEnvironment:
+        """Prepare a fresh ``AIRFLOW_HOME`` on the cached virtualenv for ``config``; ``dag_path`` may be a DAG file or a whole DAGs folder"""
+        if self.container is not None:
+            self.cleanup()
+        venv = ensure_venv(config, self.root)
+        self.template = ensure_template(config, venv)
+        home = Path(tempfile.mkdtemp(prefix="airflow-crew-"))
+        metadata_db.restore(self.template, home / "airflow.db")
+        self.metadata_db_path = str(home / "airflow.db")
+        self.dags_folder = str(home / "dags")
+        self.dag_file = str(home / "dags" / "dag.py")
+        if dag_path is not None and Path(dag_path).is_dir():
+            shutil.copytree(dag_path, self.dags_folder)
+        else:
+            os.mkdir(self.dags_folder)
+            if dag_path is not None:
+                shutil.copy2(dag_path, self.dag_file)
+        self.container = LocalEnvironment(venv, home)
+        return self.container
+
+    def restore_metadata_db(self):
+        """Restore the metadata DB from the configuration's template"""
+        if not self.container:
+            raise RuntimeError("Environment not initialized")
+        metadata_db.restore(self.template, self.metadata_db_path)
+
+    def stream_command(self, command: list[str], timeout: float | None = DEFAULT_COMMAND_TIMEOUT, on_output: Callable[[str, str], None] | None = None) -> ExecResult:
+        """Execute command as a subprocess in the environment, decoding output as it arrives"""
+        if not self.container:
+            raise RuntimeError("Environment not initialized")
+
+        venv, home = self.container
+        buffer = OutputBuffer(on_output)
+        start = time.monotonic()
+        # A session of its own, so a timeout kills the whole process tree (e.g. py-spy and the task it launched)
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=command_env(venv, home), cwd=home, start_new_session=True)
+
+        def consume(name: str, stream):
+            for chunk in iter(lambda: stream.read1(65536), b""):
+                buffer.feed(name, chunk)
+
+        readers = [threading.Thread(target=consume, args=(name, stream), daemon=True) for name, stream in (("stdout", process.stdout), ("stderr", process.stderr))]
+        for reader in readers:
+            reader.start()
+        timed_out = False
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(KILL_GRACE)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+        for reader in readers:
+            reader.join(KILL_GRACE)
+        buffer.close()
+        return buffer.result(process.returncode, timed_out, time.monotonic() - start)
+
+    def cleanup(self):
+        """Remove the temporary ``AIRFLOW_HOME`` (the cached virtualenv is kept)"""
+        if self.container:
+            shutil.rmtree(self.container.home, ignore_errors=True)
+            self.container = None
+            self.dag_file = ""
+            self.dags_folder = ""
+            self.metadata_db_path = ""
@@ -0,0 +1,180 @@
+"""Allocation Tracking and Leak Detection across Repeated DAG Parses and Task Runs"""
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from airflow_crew.tools.support.statement_profiler import local_runner
+
+DEFAULT_ITERATIONS = 5
+# Seconds one memory profile may take; every iteration parses the DAG file and may run a task
+MEMORY_TIMEOUT = 600
+RESULT_MARKER = "__AIRFLOW_CREW_MEMORY_PROFILE__"
+# Frames kept per allocation, so a leak is traced back to the DAG or task code behind it
+TRACE_FRAMES = 10
+# Lines and object types kept in each table
+TOP_ENTRIES = 20
+# A line whose retained memory grows on every iteration, by at least this much on average, is a leak
+LEAK_MIN_KB_PER_ITERATION = 1.0
+
+# Executed with ``python -c`` where Airflow is installed; arguments: DAG file, iterations, task JSON
+# (``[dag_id, task_id, logical_date]`` or null). Each iteration parses the file through one DagBag,
+# as a long-lived DAG processor does, and then runs the task through the ``tasks test`` CLI command.
+# A first warm-up iteration pays for imports and caches; a snapshot after it and after every later
+# iteration gives each line's retained memory over time. The script's own allocations are filtered out.
+MEMORY_SCRIPT = """
+import gc, json, linecache, os, sys, tracemalloc
+path, iterations, task, frames, top = sys.argv[1], int(sys.argv[2]), json.loads(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5])
+from airflow.models.dagbag import DagBag
+bag = DagBag(dag_folder=os.path.dirname(path) or ".", include_examples=False, collect_dags=False)
+if task:
+    from airflow.cli.cli_parser import get_parser
+    task_args = get_parser().parse_args(["tasks", "test", *task])
+errors = []
+def iteration(i):
+    try:
+        bag.process_file(path, only_if_updated=False)
+    except Exception as e:
+        bag.import_errors[path] = f"{type(e).__name__}: {e}"
+    if bag.import_errors.get(path):
+        errors.append({"iteration": i, "stage": "parse", "error": str(bag.import_errors[path])[-2000:]})
+    if task:
+        try:
+            task_args.func(task_args)
+        except (Exception, SystemExit) as e:
+            errors.append({"iteration": i, "stage": "task", "error": f"{type(e).__name__}: {e}"[-2000:]})
+own = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<string>"), tracemalloc.Filter(False, "<unknown>")]
+def snapshot():
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces(own)
+def by_line(snap):
+    # Attributed to the most recent frame in real source, so imports count against the import statement
+    lines = {}
+    for trace in snap.traces:
+        frame = next((frame for frame in reversed(trace.traceback) if not frame.filename.startswith("<")), trace.traceback[-1])
+        entry = lines.setdefault((frame.filename, frame.lineno), [0, 0])
+        entry[0] += trace.size
+        entry[1] += 1
+    return lines
+def site(filename, lineno):
+    return {"line": f"{filename}:{lineno}", "source": linecache.getline(filename, lineno).strip()[:200]}
+tracemalloc.start(frames)
+iteration(0)
+first = snapshot()
+series, traced_kb = [by_line(first)], [tracemalloc.get_traced_memory()[0] / 1024]
+allocations = [{**site(*key), "kb": size / 1024, "count": count} for key, (size, count) in sorted(series[0].items(), key=lambda item: item[1][0], reverse=True)[:top]]
+del first
+for i in range(1, iterations + 1):
+    iteration(i)
+    last = snapshot()
+    series.append(by_line(last))
+    traced_kb.append(tracemalloc.get_traced_memory()[0] / 1024)
+    if i < iterations:
+        del last
+growing = []
+for key in series[-1]:
+    sizes = [snap.get(key, (0, 0))[0] for snap in series]
+    if sizes[-1] > sizes[0]:
+        growing.append((sizes[-1] - sizes[0], key, sizes, [snap.get(key, (0, 0))[1] for snap in series]))
+growing.sort(reverse=True)
+lines = []
+for _, (filename, lineno), sizes, counts in growing[:top]:
+    stats = last.filter_traces([tracemalloc.Filter(True, filename, lineno, all_frames=True)]).statistics("traceback")
+    traceback = [f"{frame.filename}:{frame.lineno}" for frame in stats[0].traceback if frame.filename != "<string>"] if stats else []
+    lines.append({**site(filename, lineno), "sizes": sizes, "counts": counts, "traceback": traceback})
+del last, series
+# Objects allocated during the iterations and still alive, grouped by type: gc-tracked containers
+# and the untracked objects (strings, bytes, numbers) they reference directly
+types, seen = {}, set()
+for obj in gc.get_objects():
+    for item in (obj, *(ref for ref in gc.get_referents(obj) if not gc.is_tracked(ref))):
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        traceback = tracemalloc.get_object_traceback(item)
+        if traceback is None or traceback[-1].filename in ("<string>", tracemalloc.__file__):
+            continue
+        size = sys.getsizeof(item, 0)
+        entry = types.setdefault(type(item).__qualname__, {"count": 0, "bytes": 0, "largest": 0, "site": None})
+        entry["count"] += 1
+        entry["bytes"] += size
+        if size > entry["largest"]:
+            entry["largest"], entry["site"] = size, f"{traceback[-1].filename}:{traceback[-1].lineno}"
+large_objects = []
+for name, entry in sorted(types.items(), key=lambda item: item[1]["bytes"], reverse=True)[:top]:
+    large_objects.append({"type": name, "count": entry["count"], "kb": entry["bytes"] / 1024, "largest_kb": entry["largest"] / 1024, "site": entry["site"]})
+print(MARKER + json.dumps({"traced_kb": traced_kb, "allocations": allocations, "growing": lines, "large_objects": large_objects, "errors": errors}))
+"""
+
+
+def find_leaks(growing: list[dict[str, Any]], min_kb_per_iteration: float = LEAK_MIN_KB_PER_ITERATION) -> list[dict[str, Any]]:
+    """Lines whose retained memory grew on every iteration after the warm-up, by at least ``min_kb_per_iteration`` on average."""
+    leaks = []
+    for line in growing:
+        sizes = line["sizes"]
+        iterations = len(sizes) - 1
+        growth_kb = (sizes[-1] - sizes[0]) / 1024
+        if iterations < 1 or any(after <= before for before, after in zip(sizes, sizes[1:])) or growth_kb / iterations < min_kb_per_iteration:
+            continue
+        leaks.append({
+            "line": line["line"],
+            "source": line["source"],
+            "growth_kb_per_iteration": round(growth_kb / iterations, 2),
+            "total_growth_kb": round(growth_kb, 2),
+            "objects_per_iteration": round((line["counts"][-1] - line["counts"][0]) / iterations, 1),
+            "traceback": line["traceback"],
+        })
+    return leaks
+
+
+def profile_memory(
+    dag_path: str | Path,
+    task: tuple[str, str, str] | None = None,
+    iterations: int = DEFAULT_ITERATIONS,
+    runner: Callable[[list[str]], str] = local_runner,
+) -> dict[str, Any]:
+    """Track allocations with tracemalloc while a DAG file is parsed, and optionally a task run, over and over in one interpreter.
+
+    The first iteration is a warm-up: what it retains (imports, caches, the DAG
+    itself) is reported as ``allocations``. Memory that a line keeps retaining
+    on every later iteration is what grows a long-lived DAG processor or worker
+    without bound, and is reported as ``leaks``.
+
+    Args:
+        dag_path (str | Path): DAG file path as seen by ``runner``
+        task (tuple, optional): ``(dag_id, task_id, logical_date)`` to run with ``tasks test`` after every parse
+        iterations (int): Iterations after the warm-up
+        runner (Callable, optional): Runs ``python <args>`` and returns stdout (e.g. inside a container)
+
+    Returns:
+        dict: Top ``allocations`` by line, ``leaks``, ``large_objects`` by type, traced KB per iteration and errors
+    """
+    iterations = max(1, iterations)
+    script = MEMORY_SCRIPT.replace("MARKER", repr(RESULT_MARKER))
+    output = runner(["-c", script, str(dag_path), str(iterations), json.dumps(list(task) if task else None), str(TRACE_FRAMES), str(TOP_ENTRIES)])
+    raw = next((json.loads(line[len(RESULT_MARKER) :]) for line in reversed(output.splitlines()) if line.startswith(RESULT_MARKER)), None)
+    if raw is None:
+        raise RuntimeError(f"Memory profile produced no result: {output[-500:]}")
+    for key, digits in (("allocations", ("kb",)), ("large_objects", ("kb", "largest_kb"))):
+        for entry in raw[key]:
+            entry.update({field: round(entry[field], 2) for field in digits})
+    return {
+        "file": str(dag_path),
+        "task": list(task) if task else None,
+        "iterations": iterations,
+        "traced_kb": [round(kb, 1) for kb in raw["traced_kb"]],
+        "allocations": raw["allocations"],
+        "leaks": find_leaks(raw["growing"]),
+        "large_objects": raw["large_objects"],
+        "errors": raw["errors"],
+    }
+
+
+def leak_recommendations(profile: dict[str, Any], limit: int = 3) -> list[str]:
+    """Recommendations for the lines that leak the most memory per iteration."""
+    leaks = sorted(profile["leaks"], key=lambda leak: leak["growth_kb_per_iteration"], reverse=True)
+    return [
+        f"{leak['line']} retains {leak['growth_kb_per_iteration']:.1f} KB more on every parse/run (`{leak['source']}`); look for module-level caches, lists or handlers that grow per call"
+        for leak in leaks[:limit]
+    ]
@@ -0,0 +1,165 @@
+"""Metadata DB Templates: Seeding, Clean-state Checks and Per-run Restore"""
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+
+# Tables that hold the state of DAG and task runs; a template must have none of it
+RUN_STATE_TABLES = (
+    "dag_run",
+    "dag_run_note",
+    "task_instance",
+    "task_instance_note",
+    "task_fail",
+    "task_reschedule",
+    "rendered_task_instance_fields",
+    "xcom",
+    "job",
+    "import_error",
+    "sla_miss",
+    "trigger",
+    "dataset_event",
+)
+# SQLite side files that would be replayed over (or alongside) a restored DB
+JOURNAL_SUFFIXES = ("-journal", "-wal", "-shm")
+RESULT_MARKER = "__AIRFLOW_CREW_DB_CHECK__"
+# linux/fs.h FICLONE: share the template's blocks copy-on-write (btrfs, XFS, overlayfs on either)
+FICLONE = 0x40049409
+
+# Executed with ``python -c`` where Airflow is installed; writes connections and variables
+# through Airflow's own models, so URIs are parsed and values encrypted as Airflow would
+SEED_SCRIPT = """
+import json, sys
+from airflow.models import Connection, Variable
+from airflow.utils.session import create_session
+seed = json.loads(sys.argv[1])
+with create_session() as session:
+    for conn_id, uri in seed["connections"].items():
+        session.query(Connection).filter(Connection.conn_id == conn_id).delete()
+        session.add(Connection(conn_id=conn_id, uri=uri))
+    for key, value in seed["variables"].items():
+        session.query(Variable).filter(Variable.key == key).delete()
+        session.add(Variable(key=key, val=value))
+"""
+
+# Executed with ``python -c``; needs only the standard library, so it costs no Airflow import
+CHECK_SCRIPT = """
+import json, sqlite3, sys
+db = sqlite3.connect(f"file:{sys.argv[1]}?mode=ro", uri=True)
+tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+counts = {table: db.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in json.loads(sys.argv[2]) if table in tables}
+print(MARKER + json.dumps(counts))
+"""
+
+
+def seed_command(config: "AirflowVersionConfig") -> list[str] | None:
+    """Command that writes ``config``'s connections and variables into the metadata DB, or None if it has none."""
+    if not config.connections and not config.variables:
+        return None
+    return ["python", "-c", SEED_SCRIPT, json.dumps({"connections": config.connections, "variables": config.variables})]
+
+
+def check_command(db_path: str) -> list[str]:
+    """Command that counts the rows of every run-state table in ``db_path``."""
+    return ["python", "-c", CHECK_SCRIPT.replace("MARKER", repr(RESULT_MARKER)), db_path, json.dumps(RUN_STATE_TABLES)]
+
+
+def dirty_tables(output: str) -> dict[str, int]:
+    """Run-state tables with rows, from the output of ``check_command``."""
+    counts = next((json.loads(line[len(RESULT_MARKER) :]) for line in reversed(output.splitlines()) if line.startswith(RESULT_MARKER)), None)
+    if counts is None:
+        raise RuntimeError(f"Metadata DB check produced no result: {output[-500:]}")
+    return {table: count for table, count in counts.items() if count}
+
+
+def prepare_template(run: Callable[[list[str]], tuple[int | None, str]], config: "AirflowVersionConfig", db_path: str):
+    """Seed the metadata DB at ``db_path`` for ``config`` and verify it holds no run state.
+
+    Args:
+        run (Callable): Runs a command where the DB lives and returns ``(exit_code, output)``
+        config (AirflowVersionConfig): Configuration whose connections and variables are seeded
+        db_path (str): Metadata DB path as seen by ``run``
+    """
+    command = seed_command(config)
+    if command is not None:
+        exit_code, output = run(command)
+        if exit_code != 0:
+            raise RuntimeError(f"Seeding the metadata DB failed: {output[-2000:].strip()}")
+    exit_code, output = run(check_command(db_path))
+    if exit_code != 0:
+        raise RuntimeError(f"Checking the metadata DB failed: {output[-2000:].strip()}")
+    dirty = dirty_tables(output)
+    if dirty:
+        raise RuntimeError(f"Metadata DB template is not clean: {dirty}")
+
+
+def restore_script(template: str, db_path: str) -> str:
+    """Shell snippet that restores ``db_path`` from ``template`` (reflinked where the filesystem allows) and verifies the copy."""
+    journals = " ".join(f"{db_path}{suffix}" for suffix in JOURNAL_SUFFIXES)
+    return f"rm -f {journals} && cp --reflink=auto -p {template} {db_path} && cmp -s {template} {db_path}"
+
+
+def clone_file(source: Path | str, target: Path | str):
+    """Copy ``source`` to ``target`` as a reflink where the filesystem supports it, else as a regular copy."""
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            cloned = True
+        except OSError:
+            cloned = False
+    if cloned:
+        shutil.copystat(source, target)
+    else:
+        shutil.copy2(source, target)
+
+
+def file_digest(path: Path | str) -> str:
+    """Content digest of a file."""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def restore(template: Path | str, db_path: Path | str):
+    """Restore ``db_path`` from ``template`` and verify the restored file matches it byte for byte."""
+    for suffix in JOURNAL_SUFFIXES:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(f"{db_path}{suffix}")
+    clone_file(template, db_path)
+    if file_digest(template) != file_digest(db_path):
+        raise RuntimeError(f"Restored metadata DB {db_path} does not match its template {template}")
+
+
+def ensure_template(base: Path, target: Path, build: Callable[[Path], None]) -> Path:
+    """Template DB at ``target``, built once from a copy of ``base`` by ``build`` under a file lock.
+
+    ``build`` gets a scratch ``AIRFLOW_HOME`` holding the copy as ``airflow.db``;
+    the copy is renamed into place only once the build succeeds, so a template
+    that exists is always complete.
+    """
+    if target.exists():
+        return target
+    with open(f"{target}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if target.exists():
+            return target
+        scratch = Path(tempfile.mkdtemp(prefix=f"{target.name}.", dir=target.parent))
+        try:
+            clone_file(base, scratch / "airflow.db")
+            build(scratch)
+            os.replace(scratch / "airflow.db", target)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return target
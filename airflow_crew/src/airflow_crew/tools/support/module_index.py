@@ -0,0 +1,172 @@
+"""Compiled Dotted-prefix Lookup Tables for Module Names"""
+
+import hashlib
+import json
+import os
+import sys
+from typing import Any, NamedTuple
+
+from airflow_crew.tools.support.cache import content_key, get_default_cache
+
+PROVIDER_MAPPINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "provider_mappings.yaml")
+# Bump whenever the compiled layout changes, so cached indexes are rebuilt
+INDEX_VERSION = "1"
+
+TRUSTED_MODULES = frozenset({"airflow", "astronomer"})
+# Modules (and names imported like modules) that indicate direct database access
+DATABASE_ACCESS_MODULES = frozenset({
+    "sqlalchemy",
+    "sqlalchemy.orm",
+    "sqlalchemy.sql",
+    "sqlalchemy.engine",
+    "sqlalchemy.ext",
+    "sqlalchemy.dialects",
+    "sqlalchemy.pool",
+    "sqlalchemy.func",
+    "func",
+    "orm",
+    "Session",
+    "sqlalchemy.orm.session",
+    "sqlalchemy.orm.query",
+    "sqlalchemy.sql.expression",
+    "sqlalchemy.engine.create",
+    "pymysql",
+    "psycopg2",
+    "mysql.connector",
+    "airflow.utils.db",
+    "airflow.utils.db_cleanup",
+    "airflow.utils.session",
+    "airflow.utils.sqlalchemy",
+    "provide_session",
+    "NEW_SESSION",
+})
+
+
+def stdlib_modules() -> frozenset[str]:
+    """Top-level standard library modules of the running interpreter."""
+    return frozenset(sys.stdlib_module_names)
+
+
+class PrefixTrie:
+    """Immutable map from dotted module prefixes to values, matched on whole name segments.
+
+    ``lookup("google.cloud.storage.blob")`` returns the value of the longest
+    registered prefix (e.g. ``google.cloud.storage``) after at most one dict
+    lookup per segment; ``google.cloudy`` does not match ``google.cloud``.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, entries: dict[str, Any]):
+        # Each node maps a segment to (has_value, value, children)
+        root: dict[str, list] = {}
+        for name, value in entries.items():
+            node = root
+            segments = name.split(".")
+            for segment in segments[:-1]:
+                node = node.setdefault(segment, [False, None, {}])[2]
+            entry = node.setdefault(segments[-1], [False, None, {}])
+            entry[0], entry[1] = True, value
+        object.__setattr__(self, "_root", _freeze(root))
+        object.__setattr__(self, "_size", len(entries))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (_restore_trie, (self._root, self._size))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def longest_prefix(self, name: str) -> tuple[str, Any] | None:
+        """Longest registered prefix of ``name`` and its value, or None."""
+        node = self._root
+        match = None
+        segments = name.split(".")
+        for depth, segment in enumerate(segments, 1):
+            entry = node.get(segment)
+            if entry is None:
+                break
+            if entry[0]:
+                match = (depth, entry[1])
+            node = entry[2]
+        if match is None:
+            return None
+        return ".".join(segments[: match[0]]), match[1]
+
+    def lookup(self, name: str, default: Any = None) -> Any:
+        """Value of the longest registered prefix of ``name``."""
+        match = self.longest_prefix(name)
+        return default if match is None else match[1]
+
+    def __contains__(self, name: str) -> bool:
+        return self.longest_prefix(name) is not None
+
+
+def _freeze(node: dict[str, list]) -> dict[str, tuple]:
+    return {segment: (has_value, value, _freeze(children)) for segment, (has_value, value, children) in node.items()}
+
+
+def _restore_trie(root: dict[str, tuple], size: int) -> PrefixTrie:
+    trie = PrefixTrie.__new__(PrefixTrie)
+    object.__setattr__(trie, "_root", root)
+    object.__setattr__(trie, "_size", size)
+    return trie
+
+
+class ModuleIndex(NamedTuple):
+    """Compiled lookup tables used to categorize imports."""
+
+    providers: PrefixTrie
+    stdlib: PrefixTrie
+    trusted: PrefixTrie
+    db: PrefixTrie
+    digest: str  # identifies the sources the tables were compiled from
+
+
+def load_provider_mappings(path: str = PROVIDER_MAPPINGS_PATH) -> dict[str, str]:
+    """Parse the package -> Airflow provider mapping file."""
+    import yaml
+
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+def compile_index(provider_mappings: dict[str, str], digest: str = "") -> ModuleIndex:
+    """Build the lookup tables from provider mappings and the module lists above."""
+    return ModuleIndex(
+        providers=PrefixTrie(provider_mappings),
+        stdlib=PrefixTrie(dict.fromkeys(stdlib_modules(), True)),
+        trusted=PrefixTrie(dict.fromkeys(TRUSTED_MODULES, True)),
+        db=PrefixTrie(dict.fromkeys(DATABASE_ACCESS_MODULES, True)),
+        digest=digest,
+    )
+
+
+_module_index: ModuleIndex | None = None
+
+
+def get_module_index() -> ModuleIndex:
+    """Compiled module index, loaded once per process.
+
+    The provider mapping YAML is only parsed when its contents (or the
+    interpreter's stdlib list) changed since the index was last compiled;
+    otherwise the pickled index is read from the analysis cache.
+    """
+    global _module_index
+    if _module_index is None:
+        with open(PROVIDER_MAPPINGS_PATH, "rb") as f:
+            source = f.read()
+        lists = json.dumps([INDEX_VERSION, sorted(stdlib_modules()), sorted(TRUSTED_MODULES), sorted(DATABASE_ACCESS_MODULES)])
+        digest = hashlib.blake2b(source + lists.encode(), digest_size=16).hexdigest()
+
+        cache = get_default_cache()
+        key = content_key(digest, "module_index")
+        index = cache.get(key) if cache else None
+        if not isinstance(index, ModuleIndex):
+            index = compile_index(load_provider_mappings(), digest)
+            if cache:
+                cache.put(key, index)
+        _module_index = index
+    return _module_index
@@ -0,0 +1,165 @@
+"""Repeated-parse Benchmark of a DAG File, Cold and Warm"""
+
+import argparse
+import json
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from airflow_crew.tools.support.statement_profiler import local_runner
+from airflow_crew.tools.support.stats import summarize
+
+DEFAULT_RUNS = 5
+# Seconds one benchmark interpreter may take, Airflow import included
+PARSE_TIMEOUT = 300
+RESULT_MARKER = "__AIRFLOW_CREW_PARSE_BENCHMARK__"
+# Timings reported per parse, each summarized over the runs
+TIMINGS = ("total_ms", "import_ms", "construction_ms")
+
+# Executed with ``python -c`` where Airflow is installed; arguments: DAG file, number of parses.
+# Like the DAG processor, Airflow and DagBag are imported (and a trivial file processed, so
+# DagBag's own first-call costs are paid) before the DAG file is parsed with ``process_file``.
+# Time spent in outermost ``import`` statements during a parse is import time; the rest of
+# the parse is DAG construction. The first parse in an interpreter is cold; later parses
+# re-execute the module with its imports already in ``sys.modules``, so they are warm.
+PARSE_SCRIPT = """
+import builtins, json, os, sys, tempfile, time
+path, parses = sys.argv[1], int(sys.argv[2])
+start = time.perf_counter()
+from airflow.models.dagbag import DagBag
+airflow_import_ms = (time.perf_counter() - start) * 1000
+bag = DagBag(dag_folder=os.path.dirname(path) or ".", include_examples=False, collect_dags=False)
+with tempfile.TemporaryDirectory() as scratch:
+    warmup = os.path.join(scratch, "warmup_dag.py")
+    with open(warmup, "w") as f:
+        f.write("# airflow DAG\\n")
+    bag.process_file(warmup, only_if_updated=False)
+real_import = builtins.__import__
+depth, import_seconds = 0, 0.0
+def timed_import(*args, **kwargs):
+    global depth, import_seconds
+    depth += 1
+    begin = time.perf_counter()
+    try:
+        return real_import(*args, **kwargs)
+    finally:
+        depth -= 1
+        if not depth:
+            import_seconds += time.perf_counter() - begin
+records = []
+for _ in range(parses):
+    modules_before, import_seconds = len(sys.modules), 0.0
+    builtins.__import__ = timed_import
+    start = time.perf_counter()
+    try:
+        dags, error = bag.process_file(path, only_if_updated=False), bag.import_errors.get(path)
+    except Exception as e:
+        dags, error = [], f"{type(e).__name__}: {e}"
+    finally:
+        builtins.__import__ = real_import
+    total = time.perf_counter() - start
+    records.append({
+        "total_ms": total * 1000,
+        "import_ms": import_seconds * 1000,
+        "construction_ms": (total - import_seconds) * 1000,
+        "modules_loaded": len(sys.modules) - modules_before,
+        "dags": len(dags),
+        "tasks": sum(len(dag.tasks) for dag in dags),
+        "error": error,
+    })
+print(MARKER + json.dumps({"airflow_import_ms": airflow_import_ms, "parses": records}))
+"""
+
+
+def _run(path: str, parses: int, runner: Callable[[list[str]], str]) -> dict[str, Any]:
+    output = runner(["-c", PARSE_SCRIPT.replace("MARKER", repr(RESULT_MARKER)), path, str(parses)])
+    for line in reversed(output.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER) :])
+    raise RuntimeError(f"Parse benchmark produced no result: {output[-500:]}")
+
+
+def _summarize_parses(parses: list[dict[str, Any]]) -> dict[str, Any]:
+    summary = {timing: summarize([parse[timing] for parse in parses]) for timing in TIMINGS}
+    summary["modules_loaded"] = max((parse["modules_loaded"] for parse in parses), default=0)
+    return summary
+
+
+def benchmark_parse(dag_path: str | Path, runs: int = DEFAULT_RUNS, runner: Callable[[list[str]], str] = local_runner) -> dict[str, Any]:
+    """Parse a DAG file repeatedly through Airflow's DagBag, cold and warm, and summarize the parse times.
+
+    Cold parses each run in a fresh interpreter, so the DAG file pays for all
+    of its imports, as in a newly started DAG processor. Warm parses run
+    ``runs`` times in one interpreter after a first, discarded parse, as when
+    the processor re-parses a file whose imports are already loaded. Every
+    parse is split into import time and DAG construction time.
+
+    Args:
+        dag_path (str | Path): DAG file path as seen by ``runner``
+        runs (int): Number of cold and of warm parses
+        runner (Callable, optional): Runs ``python <args>`` and returns stdout (e.g. inside a container)
+
+    Returns:
+        dict: ``cold`` and ``warm`` p50/p95/max of total, import and construction ms, Airflow import ms, DAG and task counts
+    """
+    path = str(dag_path)
+    runs = max(1, runs)
+    cold_runs = [_run(path, 1, runner) for _ in range(runs)]
+    cold = [run["parses"][0] for run in cold_runs]
+    warm = _run(path, runs + 1, runner)["parses"][1:]
+    last = warm[-1]
+    return {
+        "file": path,
+        "runs": runs,
+        "airflow_import_ms": summarize([run["airflow_import_ms"] for run in cold_runs]),
+        "cold": _summarize_parses(cold),
+        "warm": _summarize_parses(warm),
+        "dags": last["dags"],
+        "tasks": last["tasks"],
+        "error": next((parse["error"] for parse in cold + warm if parse["error"]), None),
+    }
+
+
+def check_budget(benchmark: dict[str, Any], max_cold_p95_ms: float | None = None, max_warm_p95_ms: float | None = None) -> dict[str, Any]:
+    """Compare cold and warm p95 parse times with budgets; a file that failed to parse never passes."""
+    limits = {"cold": max_cold_p95_ms, "warm": max_warm_p95_ms}
+    exceeded = [f"{kind} p95 {benchmark[kind]['total_ms']['p95']} ms > {limit} ms" for kind, limit in limits.items() if limit is not None and benchmark[kind]["total_ms"]["p95"] > limit]
+    if benchmark["error"]:
+        exceeded.append(f"parse error: {benchmark['error']}")
+    return {"max_cold_p95_ms": max_cold_p95_ms, "max_warm_p95_ms": max_warm_p95_ms, "passed": not exceeded, "exceeded": exceeded}
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    """Command-line entry point: write the benchmark document to stdout (or a file) and a one-line summary to stderr."""
+    from airflow_crew.tools.support.environment import add_environment_arguments, config_from_arguments, get_environment_manager
+
+    parser = argparse.ArgumentParser(description="Benchmark cold and warm parse times of a DAG file through Airflow's DagBag.")
+    parser.add_argument("dag_file", type=Path, help="DAG file to benchmark")
+    add_environment_arguments(parser)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help=f"Cold and warm parses each (default: {DEFAULT_RUNS})")
+    parser.add_argument("--max-cold-p95-ms", type=float, default=None, help="Fail if the cold p95 parse time exceeds this")
+    parser.add_argument("--max-warm-p95-ms", type=float, default=None, help="Fail if the warm p95 parse time exceeds this")
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON document here instead of stdout")
+    args = parser.parse_args(argv)
+    if not args.dag_file.is_file():
+        parser.error(f"not a file: {args.dag_file}")
+
+    environment = get_environment_manager(args.backend)
+    try:
+        environment.create_container(config_from_arguments(args), args.dag_file)
+        document = benchmark_parse(environment.dag_file, args.runs, lambda command: environment.execute_command(["python", *command], timeout=PARSE_TIMEOUT)[1])
+    finally:
+        environment.cleanup()
+    document["file"] = str(args.dag_file)
+    document["budget"] = check_budget(document, args.max_cold_p95_ms, args.max_warm_p95_ms)
+
+    text = json.dumps(document, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    cold, warm = document["cold"]["total_ms"], document["warm"]["total_ms"]
+    verdict = "passed" if document["budget"]["passed"] else "FAILED: " + "; ".join(document["budget"]["exceeded"])
+    print(f"{args.dag_file}: cold p50 {cold['p50']} ms / p95 {cold['p95']} ms, warm p50 {warm['p50']} ms / p95 {warm['p95']} ms, {verdict}", file=sys.stderr)
+    return document
@@ -0,0 +1,246 @@
+"""Static DAG Parse-time Estimation"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import sysconfig
+import tempfile
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from airflow_crew.tools.support.cache import DEFAULT_CACHE_DIR
+
+if TYPE_CHECKING:
+    from airflow_crew.tools.support.docker_manager import AirflowVersionConfig
+
+# Modules the DAG processor has already imported before it parses a DAG file; importing them again is free
+PRELOADED_MODULES = {"airflow", "airflow.models", "airflow.models.dag", "airflow.operators", "airflow.utils"}
+# Rough cost of top-level code patterns found by TopLevelCodeAnalyzer, per occurrence
+TOP_LEVEL_CODE_MS = {"db_operations": 100.0, "api_calls": 250.0, "airflow_vars": 50.0, "dynamic_dates": 0.0, "imports": 0.0}
+MEASURE_TIMEOUT = 120
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$")
+
+
+def parse_importtime(output: str) -> dict[str, dict[str, Any]]:
+    """Parse ``python -X importtime`` output into ``{module: {"self_us": int, "deps": [module, ...]}}``.
+
+    Children are printed (more deeply indented) before the module that imported
+    them, so each module's direct dependencies are the pending entries one level
+    below it.
+    """
+    modules: dict[str, dict[str, Any]] = {}
+    pending: dict[int, list[str]] = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, _, indent, name = match.groups()
+        level = len(indent) // 2
+        deps = pending.pop(level + 1, [])
+        pending.setdefault(level, []).append(name)
+        modules.setdefault(name, {"self_us": int(self_us), "deps": deps})
+    return modules
+
+
+def local_importtime(module: str) -> str:
+    """Import ``module`` in a fresh local interpreter and return its importtime report."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, timeout=MEASURE_TIMEOUT)
+    return result.stderr
+
+
+def environment_id(config: "AirflowVersionConfig", backend: str) -> str:
+    """Identify an Airflow environment by its backend and what is installed in it (connections and variables do not matter)."""
+    return f"{backend}-{config.airflow_version}-py{config.python_version}-{config.install_hash()}"
+
+
+def local_environment_id() -> str:
+    """Identify the local interpreter and its installed packages (site-packages change when packages do)."""
+    parts = [sys.executable, sys.version]
+    for key in ("purelib", "platlib"):
+        path = sysconfig.get_paths().get(key)
+        if path and os.path.isdir(path):
+            parts.append(f"{path}:{os.stat(path).st_mtime_ns}")
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest()
+
+
+class ImportCostTable:
+    """Per-module import costs for one Python environment, measured once and cached on disk.
+
+    Costs are stored as each module's self time plus its direct dependencies, so
+    the cost of a set of imports is the self time summed over the union of their
+    dependency closures and shared dependencies are only counted once.
+    """
+
+    def __init__(self, environment_id: str, modules: dict[str, dict[str, Any]] | None = None, path: Path | None = None):
+        self.environment_id = environment_id
+        self.modules = modules or {}
+        self.path = path
+        self._digest: str | None = None
+
+    @classmethod
+    def load(cls, environment_id: str | None = None, root: Path | str = DEFAULT_CACHE_DIR) -> "ImportCostTable":
+        """Load the cached table for an environment (the local interpreter by default)."""
+        environment_id = environment_id or local_environment_id()
+        path = Path(root) / "import_costs" / f"{environment_id}.json"
+        try:
+            modules = json.loads(path.read_text())["modules"]
+        except (OSError, ValueError, KeyError):
+            modules = {}
+        return cls(environment_id, modules, path)
+
+    def save(self):
+        """Atomically write the table to its cache file."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"environment_id": self.environment_id, "modules": self.modules}, f)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def digest(self) -> str:
+        """Hash of the table contents, part of the analysis cache key."""
+        if self._digest is None:
+            payload = json.dumps(self.modules, sort_keys=True)
+            self._digest = hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()
+        return self._digest
+
+    def measure(self, modules: Iterable[str], runner: Callable[[str], str] = local_importtime, refresh: bool = False) -> list[str]:
+        """Measure modules missing from the table with ``runner`` and save it; returns the modules measured.
+
+        ``runner`` takes a module name and returns ``-X importtime`` output, so the
+        table can be measured inside a Docker or virtualenv environment as well.
+        """
+        measured = []
+        for module in sorted(set(modules)):
+            if module in self.modules and not refresh:
+                continue
+            try:
+                report = parse_importtime(runner(module))
+            except (OSError, subprocess.SubprocessError):
+                continue
+            if refresh:
+                self.modules.update(report)
+            else:
+                for name, entry in report.items():
+                    self.modules.setdefault(name, entry)
+            measured.append(module)
+        if measured:
+            self._digest = None
+            self.save()
+        return measured
+
+    def closure(self, modules: Iterable[str]) -> set[str]:
+        """Every known module imported (directly or transitively) by ``modules``, including parent packages."""
+        seen: set[str] = set()
+        stack = []
+        for module in modules:
+            parts = module.split(".")
+            stack.extend(".".join(parts[: i + 1]) for i in range(len(parts)))
+        while stack:
+            module = stack.pop()
+            if module in seen or module not in self.modules:
+                continue
+            seen.add(module)
+            stack.extend(self.modules[module]["deps"])
+        return seen
+
+    def cost_ms(self, modules: Iterable[str], exclude: Iterable[str] = ()) -> float:
+        """Import cost of ``modules`` in milliseconds, not counting anything already imported by ``exclude``."""
+        closure = self.closure(modules) - self.closure(exclude)
+        return sum(self.modules[module]["self_us"] for module in closure) / 1000
+
+
+_default_table: ImportCostTable | None = None
+
+
+def get_default_table() -> ImportCostTable:
+    """Import-cost table of the local environment, loaded once per process."""
+    global _default_table
+    if _default_table is None:
+        _default_table = ImportCostTable.load()
+    return _default_table
+
+
+def estimate_parse_time(imports: dict[str, set[str]], top_level_code: dict[str, list[dict[str, Any]]], table: ImportCostTable | None = None) -> dict[str, Any]:
+    """Estimate the cost of one scheduler parse of a DAG file without running it.
+
+    Args:
+        imports (dict): Categorized imports from ``ImportAnalyzer``; ``parse_time`` holds the imports executed on parse
+        top_level_code (dict): Findings from ``TopLevelCodeAnalyzer``
+        table (ImportCostTable, optional): Import costs to use (the local environment's by default)
+
+    Returns:
+        dict: Estimated total, import and top-level code milliseconds, the most expensive imports, and the
+        ``unmeasured_modules`` missing from ``table``, which the estimate leaves out rather than guesses
+    """
+    table = table or get_default_table()
+    baseline = table.closure(PRELOADED_MODULES)
+
+    per_import = []
+    unmeasured = []
+    for module in sorted(imports.get("parse_time", ())):
+        if module in PRELOADED_MODULES:
+            per_import.append({"module": module, "ms": 0.0})
+        elif closure := table.closure([module]):
+            per_import.append({"module": module, "ms": round(sum(table.modules[name]["self_us"] for name in closure - baseline) / 1000, 2)})
+        else:
+            unmeasured.append(module)
+
+    import_ms = table.cost_ms([entry["module"] for entry in per_import], exclude=PRELOADED_MODULES)
+    top_level_ms = sum(TOP_LEVEL_CODE_MS.get(kind, 0.0) * len(findings) for kind, findings in top_level_code.items())
+
+    return {
+        "estimated_ms": round(import_ms + top_level_ms, 2),
+        "import_ms": round(import_ms, 2),
+        "top_level_code_ms": round(top_level_ms, 2),
+        "imports": sorted(per_import, key=lambda entry: entry["ms"], reverse=True),
+        "unmeasured_modules": unmeasured,
+        "environment_id": table.environment_id,
+    }
+
+
+def main(argv: list[str] | None = None):
+    """Command-line entry point: measure import costs for modules or for everything the given DAG files import."""
+    from airflow_crew.tools.support import analyzers, fleet
+    from airflow_crew.tools.support.environment import DEFAULT_BACKEND, add_environment_arguments, config_from_arguments, get_environment_manager
+
+    parser = argparse.ArgumentParser(description="Measure per-module import costs for the parse-time estimator.")
+    parser.add_argument("targets", nargs="+", help="Module names, DAG files, directories or globs")
+    add_environment_arguments(parser, required=False)
+    parser.add_argument("--refresh", action="store_true", help="Re-measure modules already in the table")
+    args = parser.parse_args(argv)
+
+    modules = set(PRELOADED_MODULES)
+    for target in args.targets:
+        files = fleet.discover_dag_files(target)
+        if not files:
+            modules.add(target)
+        for path in files:
+            try:
+                modules |= analyzers.analyze_imports_ast(path.read_text(encoding="utf-8"))["imports"]["parse_time"]
+            except (OSError, SyntaxError, UnicodeDecodeError):
+                continue
+
+    if args.airflow_version is None:
+        table = get_default_table()
+        measured = table.measure(modules, refresh=args.refresh)
+    else:
+        # Measured where the scheduler runs: the import times of the local interpreter say little about another environment
+        config = config_from_arguments(args)
+        table = ImportCostTable.load(environment_id(config, args.backend or DEFAULT_BACKEND))
+        environment = get_environment_manager(args.backend)
+        with tempfile.TemporaryDirectory() as dags_folder:
+            try:
+                environment.create_container(config, Path(dags_folder))
+                measured = table.measure(modules, runner=environment.importtime, refresh=args.refresh)
+            finally:
+                environment.cleanup()
+    print(json.dumps({"environment_id": table.environment_id, "table": str(table.path), "measured": measured, "modules": len(table.modules)}, indent=2))
@@ -0,0 +1,152 @@
+"""/proc and cgroup v2 Time-series Sampler"""
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+from airflow_crew.tools.support.stats import summarize
+
+DEFAULT_INTERVAL = 0.5
+# Ring buffer capacity; longer windows keep the most recent samples
+MAX_SAMPLES = 2400
+RESULT_MARKER = "__AIRFLOW_CREW_PROC_SAMPLES__"
+
+# Executed with ``python -c`` inside the container, next to the sampled process.
+# Counters go into one preallocated array per field (a ring buffer), so sampling
+# allocates nothing per tick and memory stays bounded however long the window is.
+SAMPLER_SCRIPT = """
+import json, os, sys, time
+from array import array
+pid, duration, interval, capacity = int(sys.argv[1]), float(sys.argv[2]), float(sys.argv[3]), int(sys.argv[4])
+FIELDS = ("t", "utime", "stime", "blkio", "threads", "rss_kb", "hwm_kb", "vm_kb", "ctx_vol", "ctx_invol",
+          "read_bytes", "write_bytes", "rchar", "wchar", "cg_usage_usec", "cg_throttled_usec", "cg_memory", "cg_memory_peak")
+ring = {field: array("d", bytes(8 * capacity)) for field in FIELDS}
+STATUS = {"VmRSS:": "rss_kb", "VmHWM:": "hwm_kb", "VmSize:": "vm_kb", "voluntary_ctxt_switches:": "ctx_vol", "nonvoluntary_ctxt_switches:": "ctx_invol"}
+IO = {"read_bytes:": "read_bytes", "write_bytes:": "write_bytes", "rchar:": "rchar", "wchar:": "wchar"}
+CPU_STAT = {"usage_usec": "cg_usage_usec", "throttled_usec": "cg_throttled_usec"}
+def pairs(path, keys, sample):
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in keys:
+                    sample[keys[parts[0]]] = float(parts[1])
+    except OSError:
+        pass
+def single(path):
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+        return float(value) if value.isdigit() else 0.0
+    except OSError:
+        return 0.0
+count, exited, start = 0, False, time.monotonic()
+deadline = start + duration
+while True:
+    sample = dict.fromkeys(FIELDS, 0.0)
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        stat = ["X"]
+    if stat[0] in ("Z", "X"):
+        exited = True
+        break
+    # Fields after the command name, 0-based: state 0, utime 11, stime 12, num_threads 17, delayacct_blkio_ticks 39
+    sample.update(t=time.monotonic() - start, utime=float(stat[11]), stime=float(stat[12]), threads=float(stat[17]), blkio=float(stat[39]) if len(stat) > 39 else 0.0)
+    pairs(f"/proc/{pid}/status", STATUS, sample)
+    pairs(f"/proc/{pid}/io", IO, sample)
+    pairs("/sys/fs/cgroup/cpu.stat", CPU_STAT, sample)
+    sample["cg_memory"] = single("/sys/fs/cgroup/memory.current")
+    sample["cg_memory_peak"] = single("/sys/fs/cgroup/memory.peak")
+    slot = count % capacity
+    for field in FIELDS:
+        ring[field][slot] = sample[field]
+    count += 1
+    now = time.monotonic()
+    if now >= deadline:
+        break
+    time.sleep(max(0.0, min(interval - (now - start) % interval, deadline - now)))
+kept = min(count, capacity)
+order = [(count - kept + i) % capacity for i in range(kept)]
+columns = {field: [ring[field][i] for i in order] for field in FIELDS}
+print(MARKER + json.dumps({"columns": columns, "samples": count, "dropped": count - kept, "exited": exited, "clk_tck": os.sysconf("SC_CLK_TCK")}))
+"""
+
+
+def _rates(values: list[float], times: list[float], scale: float = 1.0) -> list[float]:
+    """Per-second rate between consecutive samples of a cumulative counter."""
+    return [max(0.0, (b - a) * scale / (t1 - t0)) if t1 > t0 else 0.0 for a, b, t0, t1 in zip(values, values[1:], times, times[1:], strict=False)]
+
+
+def build_series(raw: dict[str, Any]) -> dict[str, list[float]]:
+    """Turn raw cumulative counters into per-interval time series."""
+    columns = raw["columns"]
+    times = columns["t"]
+    ticks = raw.get("clk_tck") or 100
+    cpu_ticks = [u + s for u, s in zip(columns["utime"], columns["stime"], strict=True)]
+    return {
+        "t": [round(t, 3) for t in times[1:]],
+        "cpu_percent": _rates(cpu_ticks, times, 100 / ticks),
+        "io_wait_percent": _rates(columns["blkio"], times, 100 / ticks),
+        "cgroup_cpu_percent": _rates(columns["cg_usage_usec"], times, 100 / 1e6),
+        "cgroup_throttled_percent": _rates(columns["cg_throttled_usec"], times, 100 / 1e6),
+        "rss_mb": [kb / 1024 for kb in columns["rss_kb"][1:]],
+        "cgroup_memory_mb": [value / 2**20 for value in columns["cg_memory"][1:]],
+        "read_bytes_per_s": _rates(columns["read_bytes"], times),
+        "write_bytes_per_s": _rates(columns["write_bytes"], times),
+        "threads": columns["threads"][1:],
+    }
+
+
+def sample_process(pid: int, runner: Callable[[list[str]], str], duration: float = 60, interval: float = DEFAULT_INTERVAL, capacity: int = MAX_SAMPLES) -> dict[str, Any]:
+    """Sample a process's /proc counters and its cgroup's CPU and memory files at a fixed interval.
+
+    Args:
+        pid (int): Process to sample, as seen by ``runner``
+        runner (Callable): Runs ``python <args>`` where the process lives (e.g. inside its container) and returns stdout
+        duration (float): Sampling window in seconds; sampling stops early if the process exits
+        interval (float): Seconds between samples
+        capacity (int): Ring buffer size; older samples are dropped beyond it
+
+    Returns:
+        dict: Time ``series`` (one value per interval), ``summary`` stats per series, and totals over the retained samples
+    """
+    script = SAMPLER_SCRIPT.replace("MARKER", repr(RESULT_MARKER))
+    output = runner(["-c", script, str(pid), str(duration), str(interval), str(capacity)])
+    raw = next((json.loads(line[len(RESULT_MARKER) :]) for line in reversed(output.splitlines()) if line.startswith(RESULT_MARKER)), None)
+    if raw is None:
+        raise RuntimeError(f"Process sampler produced no result: {output[-500:]}")
+
+    columns = raw["columns"]
+    series = build_series(raw)
+    ticks = raw.get("clk_tck") or 100
+
+    def delta(field: str) -> float:
+        values = columns[field]
+        return values[-1] - values[0] if values else 0.0
+
+    totals = {
+        "seconds": round(delta("t"), 3),
+        "cpu_seconds": round((delta("utime") + delta("stime")) / ticks, 3),
+        "io_wait_seconds": round(delta("blkio") / ticks, 3),
+        "read_bytes": int(delta("read_bytes")),
+        "write_bytes": int(delta("write_bytes")),
+        "read_syscall_bytes": int(delta("rchar")),
+        "write_syscall_bytes": int(delta("wchar")),
+        "voluntary_ctx_switches": int(delta("ctx_vol")),
+        "involuntary_ctx_switches": int(delta("ctx_invol")),
+        "peak_rss_mb": round(max(columns["hwm_kb"], default=0.0) / 1024, 2),
+        "virtual_mb": round(columns["vm_kb"][-1] / 1024, 2) if columns["vm_kb"] else 0.0,
+        "cgroup_memory_peak_mb": round(max(columns["cg_memory_peak"], default=0.0) / 2**20, 2),
+    }
+    return {
+        "pid": pid,
+        "interval": interval,
+        "samples": raw["samples"],
+        "dropped": raw["dropped"],
+        "exited": raw["exited"],
+        "series": series,
+        "summary": {name: summarize(values) for name, values in series.items() if name != "t"},
+        "totals": totals,
+    }
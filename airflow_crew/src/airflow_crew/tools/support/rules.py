@@ -0,0 +1,118 @@
+"""Single-pass AST Rule Engine"""
+
+import ast
+from typing import Any
+
+# Nodes that open a new lexical scope
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+# Scopes whose bodies are not executed when the module is imported
+DEFERRED_SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+
+
+class RuleContext:
+    """Traversal state shared with rules while the engine walks the tree."""
+
+    def __init__(self):
+        self.parents: list[ast.AST] = []
+        self.scopes: list[ast.AST] = []
+        self._scope_depths: list[int] = []
+
+    @property
+    def parent(self) -> ast.AST | None:
+        """Direct parent of the node being visited."""
+        return self.parents[-1] if self.parents else None
+
+    @property
+    def scope(self) -> ast.AST | None:
+        """Innermost enclosing function, lambda or class, or None at module level."""
+        return self.scopes[-1] if self.scopes else None
+
+    @property
+    def at_module_level(self) -> bool:
+        """Whether the node is outside any function or class body."""
+        return not self.scopes
+
+    @property
+    def runs_at_import(self) -> bool:
+        """Whether the node executes when the module is imported (module or class body)."""
+        return not any(isinstance(scope, DEFERRED_SCOPE_NODES) for scope in self.scopes)
+
+    def _enter(self, depth: int):
+        """Truncate the stacks to ``depth`` ancestors."""
+        del self.parents[depth:]
+        while self._scope_depths and self._scope_depths[-1] >= depth:
+            self._scope_depths.pop()
+            self.scopes.pop()
+
+    def _push(self, node: ast.AST, depth: int):
+        """Make ``node`` the parent of the nodes visited next."""
+        self.parents.append(node)
+        if isinstance(node, SCOPE_NODES):
+            self.scopes.append(node)
+            self._scope_depths.append(depth)
+
+
+class Rule:
+    """Base class for analysis rules.
+
+    Subclasses define ``visit_<NodeType>(self, node, ctx)`` methods for the node
+    types they care about. Unlike ``ast.NodeVisitor`` the methods never recurse;
+    the engine visits every node exactly once and hands each one to all rules
+    interested in its type.
+    """
+
+    name: str = ""
+
+    def result(self) -> Any:
+        """Return the findings collected during the walk."""
+        raise NotImplementedError
+
+    def merge(self, partial: Any):
+        """Fold in a ``result()`` produced by another instance of this rule over a later part of the module.
+
+        Used by incremental analysis to combine per-statement findings; merging the
+        results for every top-level statement in order must equal a full walk.
+        """
+        raise NotImplementedError
+
+
+class RuleEngine:
+    """Walk an AST once and dispatch each node to the registered rules."""
+
+    def __init__(self, rules: list[Rule]):
+        self.rules = rules
+        self.dispatch: dict[type, list] = {}
+        for rule in rules:
+            for attr in dir(rule):
+                if not attr.startswith("visit_"):
+                    continue
+                node_type = getattr(ast, attr[len("visit_") :], None)
+                if isinstance(node_type, type) and issubclass(node_type, ast.AST):
+                    self.dispatch.setdefault(node_type, []).append(getattr(rule, attr))
+
+    def run(self, tree: ast.AST) -> RuleContext:
+        """Visit ``tree`` depth-first in source order, keeping parent and scope stacks."""
+        ctx = RuleContext()
+        dispatch = self.dispatch
+        stack = [(tree, 0)]
+        while stack:
+            node, depth = stack.pop()
+            ctx._enter(depth)
+            for handler in dispatch.get(type(node), ()):
+                handler(node, ctx)
+            ctx._push(node, depth)
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend((child, depth + 1) for child in children)
+        return ctx
+
+    def results(self) -> dict[str, Any]:
+        """Collect each rule's findings keyed by rule name."""
+        return {rule.name: rule.result() for rule in self.rules}
+
+
+def run_rules(tree: ast.AST, rules: list[Rule]) -> dict[str, Any]:
+    """Run ``rules`` over an already parsed tree in a single traversal."""
+    engine = RuleEngine(rules)
+    engine.run(tree)
+    return engine.results()
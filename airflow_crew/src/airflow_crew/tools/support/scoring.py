@@ -5,14 +5,24 @@ from typing import Any
 # Scoring deductions for various issues
 SCORING_MATRIX = {
     # Critical Issues (30-40% deduction)
-    "top_level_code": {
-        "deduction": 40,
-        "description": "Top-level code detected (e.g., API calls, DB queries, heavy imports)",
+    "parse_time": {
+        "deduction": 40,  # maximum; scaled by how far the estimated parse time exceeds the budget
+        "budget_ms": 500,
+        "ms_per_point": 50,
+        "description": "Estimated DAG file parse time over budget (heavy imports, API calls or DB queries at top level)",
         "category": "Critical",
         "rationale": "Severely impacts scheduler performance, executed every parse",
     },
+    "dependency_cycle": {"deduction": 40, "description": "Cycle in task dependencies", "category": "Critical", "rationale": "Airflow refuses to load the DAG, so none of its tasks run"},
     "dynamic_start_date": {"deduction": 35, "description": "Dynamic start_date using datetime.now()", "category": "Critical", "rationale": "Breaks idempotency and causes scheduling issues"},
     "no_retries": {"deduction": 30, "description": "No retry mechanism configured", "category": "Critical", "rationale": "Critical for task reliability in distributed environments"},
+    "oversized_xcom": {
+        "deduction": 30,
+        "max_kb": 48,
+        "description": "Task pushed an XCom larger than max_kb to the metadata DB (measured)",
+        "category": "Critical",
+        "rationale": "Large XCom rows bloat the metadata DB, slow every query on the xcom table and can exceed column limits",
+    },
     # Major Issues (15-25% deduction)
     "direct_db_access": {
         "deduction": 25,
@@ -27,9 +37,32 @@ SCORING_MATRIX = {
         "rationale": "Missing optimized and maintained provider features",
     },
     "dynamic_task_mapping": {"deduction": 20, "description": "Dynamic task mapping at runtime", "category": "Major", "rationale": "Can cause DAG parsing issues and scheduler overhead"},
+    "large_xcom": {
+        "deduction": 15,
+        "description": "Task returns or pushes a likely large value (DataFrame, loop-built collection, file contents, query results) through XCom",
+        "category": "Major",
+        "rationale": "XComs are stored in the metadata DB, which is not meant for bulk data",
+    },
     # Minor Issues (5-10% deduction)
     "no_documentation": {"deduction": 10, "description": "Missing or insufficient DAG documentation", "category": "Minor", "rationale": "Impacts maintainability and team collaboration"},
     "no_tags": {"deduction": 5, "description": "No tags defined for DAG", "category": "Minor", "rationale": "Makes DAG organization and filtering difficult"},
+    "excessive_fan_in_out": {
+        "deduction": 5,
+        "max_degree": 100,
+        "description": "Task with more direct upstream or downstream tasks than max_degree",
+        "category": "Minor",
+        "rationale": "Every dependency check on the task walks all its neighbours, and the graph view becomes unreadable",
+    },
+    "depends_on_past": {"deduction": 10, "description": "Task uses depends_on_past", "category": "Minor", "rationale": "One failed or missing run blocks every later run of the task"},
+    "no_timeout": {"deduction": 5, "description": "Task has no execution timeout", "category": "Minor", "rationale": "Hung tasks hold worker slots indefinitely"},
+    "no_queue": {"deduction": 5, "description": "Task has no queue assigned", "category": "Minor", "rationale": "Cannot be routed to dedicated workers"},
+    "slow_xcom": {
+        "deduction": 5,
+        "max_ms": 1000,
+        "description": "XCom push or pull slower than max_ms (measured)",
+        "category": "Minor",
+        "rationale": "Every downstream task waits on the pull before it starts work",
+    },
     "no_sla": {"deduction": 5, "description": "No SLA defined for critical tasks", "category": "Minor", "rationale": "Missing SLA monitoring for important tasks"},
 }
 
@@ -46,27 +79,32 @@ def calculate_task_prognosis(task) -> dict[str, Any]:
 
     # Check execution timeout
     if not task.execution_timeout:
-        score -= 5
+        score -= SCORING_MATRIX["no_timeout"]["deduction"]
         issues.append({"type": "no_timeout", "message": "Task has no execution timeout set", "task_id": task.task_id})
 
     # Check for depends_on_past
     if task.depends_on_past:
-        score -= 10
+        score -= SCORING_MATRIX["depends_on_past"]["deduction"]
         issues.append({"type": "depends_on_past", "message": "Task uses depends_on_past which can cause scheduling issues", "task_id": task.task_id})
 
     # Check for proper queue assignment
     if not task.queue:
-        score -= 5
+        score -= SCORING_MATRIX["no_queue"]["deduction"]
         issues.append({"type": "no_queue", "message": "Task has no specific queue assigned", "task_id": task.task_id})
 
     return {"task_id": task.task_id, "score": max(0.0, score), "issues": issues}
 
 
-def calculate_dag_prognosis(dag) -> dict[str, Any]:
-    """Calculate prognosis for a DAG."""
+def calculate_dag_prognosis(dag, expand_tasks: bool = False) -> dict[str, Any]:
+    """Calculate prognosis for a DAG.
+
+    Task rules are evaluated for all tasks at once on columnar task attributes;
+    per-task ``task_scores`` and ``task_metrics`` records are only built when ``expand_tasks`` is set.
+    """
+    from airflow_crew.tools.support.task_columns import TaskColumns, score_tasks
+
     score = 100.0
     issues = []
-    task_scores = {}
 
     # Check start_date configuration
     if not dag.start_date:
@@ -83,23 +121,21 @@ def calculate_dag_prognosis(dag) -> dict[str, Any]:
         score -= SCORING_MATRIX["no_tags"]["deduction"]
         issues.append({"type": "no_tags", "message": "DAG has no tags defined"})
 
-    # Analyze each task
-    for task in dag.tasks:
-        task_prognosis = calculate_task_prognosis(task)
-        task_scores[task.task_id] = task_prognosis
-
-        # Adjust DAG score based on task issues
-        if task_prognosis["score"] < 70:  # Critical task issues
-            score -= 5
-        elif task_prognosis["score"] < 85:  # Major task issues
-            score -= 2
+    # Analyze all tasks; critical task issues cost 5 points each, major ones 2
+    columns = TaskColumns(dag.tasks)
+    tasks = score_tasks(columns, expand=expand_tasks)
+    score -= tasks["deduction"]
 
     # Check overall DAG complexity
-    if len(dag.tasks) > 50:
+    if len(columns) > 50:
         score -= 10
-        issues.append({"type": "high_complexity", "message": f"DAG has {len(dag.tasks)} tasks, consider breaking it down"})
+        issues.append({"type": "high_complexity", "message": f"DAG has {len(columns)} tasks, consider breaking it down"})
 
-    return {"dag_id": dag.dag_id, "score": max(0.0, score), "issues": issues, "task_scores": task_scores}
+    prognosis = {"dag_id": dag.dag_id, "score": max(0.0, score), "issues": issues, "task_summary": tasks["summary"]}
+    if expand_tasks:
+        prognosis["task_scores"] = tasks["task_scores"]
+        prognosis["task_metrics"] = tasks["task_metrics"]
+    return prognosis
 
 
 def get_score_color(score: float) -> str:
@@ -112,10 +148,23 @@ def get_score_color(score: float) -> str:
         return "red"
 
 
+def parse_time_deduction(estimated_ms: float) -> float:
+    """Cost-weighted deduction for an estimated parse time: one point per ``ms_per_point`` over budget, capped."""
+    rule = SCORING_MATRIX["parse_time"]
+    over_budget = max(0.0, estimated_ms - rule["budget_ms"])
+    return min(float(rule["deduction"]), round(over_budget / rule["ms_per_point"], 1))
+
+
 def calculate_score(analysis: dict[str, Any]) -> float:
-    """Calculate DAG score based on analysis results."""
-    score = 100.0
-    for issue, details in analysis.get("issues", {}).items():
-        if issue in SCORING_MATRIX:
-            score -= SCORING_MATRIX[issue]["deduction"]
-    return max(0.0, score)
+    """Calculate DAG score based on analysis results.
+
+    Each issue type is deducted once, however many times it occurs, so one pattern repeated across tasks
+    cannot zero the score on its own. Issues may carry their own ``deduction`` (e.g. cost-weighted parse
+    time); otherwise the matrix value applies, and the largest deduction of a type counts.
+    """
+    deductions: dict[str, float] = {}
+    for issue in analysis.get("issues", []):
+        if issue["type"] in SCORING_MATRIX:
+            deduction = issue.get("deduction", SCORING_MATRIX[issue["type"]]["deduction"])
+            deductions[issue["type"]] = max(deductions.get(issue["type"], 0.0), deduction)
+    return max(0.0, 100.0 - sum(deductions.values()))
@@ -0,0 +1,369 @@
+"""SQLAlchemy Statement and XCom Tracing Injected into Airflow Processes"""
+
+import json
+import re
+from collections import Counter
+from typing import Any
+
+from airflow_crew.tools.support.stats import summarize
+
+TRACE_DIR_ENV = "AIRFLOW_CREW_SQL_TRACE"
+TRACE_TAG_ENV = "AIRFLOW_CREW_SQL_TRACE_TAG"
+# Statements at least this slow (p95, in milliseconds) are reported as slow queries
+SLOW_QUERY_MS = 100.0
+# The same SELECT shape from the same call site this many times is reported as an N+1 pattern
+N_PLUS_ONE_MIN = 10
+# Query shapes kept in the per-shape table, most total time first
+TOP_QUERIES = 25
+FILE_MARKER = "__AIRFLOW_CREW_SQL_LOG__"
+
+# Installed as ``sitecustomize`` on PYTHONPATH, so it runs at start-up of every Python process of a
+# traced command, before Airflow creates its engine. Class-level listeners cover every engine.
+# The log is line-oriented and compact: statement texts and frames are written once and referenced
+# by id, and each execution is one ``q`` line with its start, duration, row count and frame ids.
+# XCom pushes and pulls are timed by patching Airflow's XCom class and ``TaskInstance.xcom_pull`` as
+# their modules are first imported; each is one ``x`` line with its serialized size, task id and key.
+HOOK_SOURCE = """
+import atexit, json, os, sys, threading, time
+_dir = os.environ.get("TRACE_DIR_ENV")
+try:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.pool import Pool
+except ImportError:
+    _dir = None
+if _dir:
+    _log = open(os.path.join(_dir, f"{os.environ.get('TRACE_TAG_ENV', 'trace')}-{os.getpid()}.log"), "w", buffering=1 << 16)
+    _lock = threading.Lock()
+    _ids = {}
+    _start = _flushed = time.perf_counter()
+    # Standard library and installed packages; the first frame outside them is the code that caused the query
+    _library = tuple({sys.prefix, sys.base_prefix, sys.exec_prefix})
+    _sqlalchemy = os.sep + "sqlalchemy" + os.sep
+
+    def _intern(kind, text):
+        i = _ids.get(text)
+        if i is None:
+            i = _ids[text] = len(_ids)
+            _log.write(f"{kind}\\t{i}\\t{json.dumps(text)}\\n")
+        return i
+
+    def _frames():
+        frame, caller, origin, depth = sys._getframe(2), -1, -1, 0
+        while frame is not None and depth < 128:
+            code = frame.f_code
+            file = code.co_filename
+            if caller < 0 and _sqlalchemy not in file:
+                caller = _intern("f", f"{file}:{frame.f_lineno} {code.co_name}")
+            if not file.startswith(_library) and not file.startswith("<"):
+                origin = _intern("f", f"{file}:{frame.f_lineno} {code.co_name}")
+                break
+            frame, depth = frame.f_back, depth + 1
+        return caller, origin
+
+    def _write(line, now):
+        global _flushed
+        _log.write(line)
+        # Flushed every half second, so a process that is still running can be read
+        if now - _flushed > 0.5:
+            _log.flush()
+            _flushed = now
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_crew_started", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        end = time.perf_counter()
+        begin = conn.info["_crew_started"].pop()
+        with _lock:
+            caller, origin = _frames()
+            _write(f"q\\t{begin - _start:.6f}\\t{(end - begin) * 1000:.3f}\\t{cursor.rowcount}\\t{_intern('s', statement)}\\t{caller}\\t{origin}\\n", end)
+
+    @event.listens_for(Engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("_crew_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    @event.listens_for(Engine, "begin")
+    def _begin(conn):
+        conn.info["_crew_transaction"] = time.perf_counter()
+
+    def _end(conn, outcome):
+        begin = conn.info.pop("_crew_transaction", None)
+        if begin is not None:
+            end = time.perf_counter()
+            with _lock:
+                _write(f"t\\t{begin - _start:.6f}\\t{(end - begin) * 1000:.3f}\\t{outcome}\\n", end)
+
+    event.listen(Engine, "commit", lambda conn: _end(conn, "commit"))
+    event.listen(Engine, "rollback", lambda conn: _end(conn, "rollback"))
+
+    @event.listens_for(Pool, "connect")
+    def _connect(dbapi_connection, record):
+        now = time.perf_counter()
+        with _lock:
+            _write(f"c\\t{now - _start:.6f}\\n", now)
+
+    _xcom = threading.local()
+
+    def _xcom_line(op, begin, size, task_id, key):
+        end = time.perf_counter()
+        with _lock:
+            _write(f"x\\t{op}\\t{begin - _start:.6f}\\t{(end - begin) * 1000:.3f}\\t{size}\\t{json.dumps(str(task_id))}\\t{json.dumps(str(key))}\\n", end)
+
+    def _wrap(cls, name, wrapper):
+        # Looked up without the descriptor protocol, so static and class methods stay what they are
+        raw = next((klass.__dict__[name] for klass in cls.__mro__ if name in klass.__dict__), None)
+        if raw is None:
+            return
+        kind = type(raw) if isinstance(raw, (staticmethod, classmethod)) else None
+        wrapped = wrapper(raw.__func__ if kind else raw)
+        setattr(cls, name, kind(wrapped) if kind else wrapped)
+
+    def _serialize(function):
+        def serialize_value(*args, **kwargs):
+            value = function(*args, **kwargs)
+            if isinstance(value, (bytes, str)):
+                _xcom.size = len(value)
+            return value
+        return serialize_value
+
+    def _set(function):
+        def push(cls, *args, **kwargs):
+            _xcom.size = 0
+            begin = time.perf_counter()
+            try:
+                return function(cls, *args, **kwargs)
+            finally:
+                _xcom_line("push", begin, _xcom.size, kwargs.get("task_id", args[2] if len(args) > 2 else None), kwargs.get("key", args[0] if args else None))
+        return push
+
+    def _deserialize(function):
+        def deserialize_value(*args, **kwargs):
+            result = kwargs.get("result", args[-1] if args else None)
+            value = getattr(result, "value", None)
+            if getattr(_xcom, "pulling", False) and isinstance(value, (bytes, str)):
+                _xcom.pulled += len(value)
+            return function(*args, **kwargs)
+        return deserialize_value
+
+    def _pull(function):
+        def xcom_pull(self, *args, **kwargs):
+            if getattr(_xcom, "pulling", False):
+                return function(self, *args, **kwargs)
+            _xcom.pulling, _xcom.pulled = True, 0
+            begin = time.perf_counter()
+            try:
+                return function(self, *args, **kwargs)
+            finally:
+                _xcom.pulling = False
+                _xcom_line("pull", begin, _xcom.pulled, self.task_id, kwargs.get("key", args[2] if len(args) > 2 else "return_value"))
+        return xcom_pull
+
+    def _patch_xcom(module):
+        # ``XCom`` is the configured backend class, so custom backends' own serialization is measured
+        for name, wrapper in (("serialize_value", _serialize), ("set", _set), ("deserialize_value", _deserialize)):
+            _wrap(module.XCom, name, wrapper)
+
+    def _patch_task_instance(module):
+        _wrap(module.TaskInstance, "xcom_pull", _pull)
+
+    _patches = {"airflow.models.xcom": _patch_xcom, "airflow.models.taskinstance": _patch_task_instance}
+
+    class _PatchFinder:
+        # Finds the real spec of a module to patch and runs the patch right after the module executes
+        def find_spec(self, name, path=None, target=None):
+            patch = _patches.pop(name, None)
+            if patch is None:
+                return None
+            if not _patches:
+                sys.meta_path.remove(self)
+            import importlib.util
+            spec = importlib.util.find_spec(name)
+            if spec is None or spec.loader is None:
+                return spec
+            exec_module = spec.loader.exec_module
+
+            def patched(module):
+                exec_module(module)
+                try:
+                    patch(module)
+                except Exception:
+                    pass
+            spec.loader.exec_module = patched
+            return spec
+
+    sys.meta_path.insert(0, _PatchFinder())
+    atexit.register(_log.close)
+""".replace("TRACE_DIR_ENV", TRACE_DIR_ENV).replace("TRACE_TAG_ENV", TRACE_TAG_ENV)
+
+# Installs the hook (renamed into place, so concurrent commands never import a partial file) and
+# runs the command with it on PYTHONPATH; arguments: trace dir, tag, hook source, command...
+WRAPPER_SCRIPT = f"""d="$0"; tag="$1"
+mkdir -p "$d" && printf '%s' "$2" > "$d/.sitecustomize.$$" && mv "$d/.sitecustomize.$$" "$d/sitecustomize.py" || exit 1
+shift 2
+exec env PYTHONPATH="$d${{PYTHONPATH:+:$PYTHONPATH}}" {TRACE_DIR_ENV}="$d" {TRACE_TAG_ENV}="$tag" "$@"
+"""
+# Prints every log matching a file name pattern, each after a marker line; arguments: trace dir, pattern
+READ_SCRIPT = f"""for f in "$0"/$1; do [ -f "$f" ] && echo "{FILE_MARKER} $f" && cat "$f"; done; exit 0"""
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_NAMED = re.compile(r"%\(\w+\)s|(?<!:):\w+\b|\$\d+|%s")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_ROWS = re.compile(r"(\((?:\?,\s*)*\?\))(?:\s*,\s*\1)+")
+_SPACE = re.compile(r"\s+")
+
+
+def wrap(command: list[str], trace_dir: str, tag: str) -> list[str]:
+    """``command`` run with the SQL trace hook installed; each Python process logs to ``<trace_dir>/<tag>-<pid>.log``."""
+    return ["sh", "-c", WRAPPER_SCRIPT, trace_dir, tag, HOOK_SOURCE, *command]
+
+
+def read_command(trace_dir: str, pattern: str) -> list[str]:
+    """Command printing the trace logs in ``trace_dir`` whose names match ``pattern`` (e.g. ``*-1234.log``)."""
+    return ["sh", "-c", READ_SCRIPT, trace_dir, pattern]
+
+
+def normalize(sql: str) -> str:
+    """Query shape of a statement: literals and parameters become ``?``, IN lists and multi-row VALUES collapse."""
+    shape = _NAMED.sub("?", _NUMBER.sub("?", _STRING.sub("?", sql)))
+    shape = _ROWS.sub(r"\1", _IN_LIST.sub("IN (?...)", shape))
+    return _SPACE.sub(" ", shape).strip()
+
+
+def parse_logs(output: str) -> list[dict[str, Any]]:
+    """Parse the output of ``read_command`` into one record set per traced process."""
+    processes: list[dict[str, Any]] = []
+    current: dict[str, Any] | None = None
+    for line in output.splitlines():
+        if line.startswith(FILE_MARKER):
+            current = {"file": line[len(FILE_MARKER) :].strip(), "texts": {}, "queries": [], "transactions": [], "connections": 0, "xcoms": []}
+            processes.append(current)
+            continue
+        fields = line.split("\t")
+        if current is None or not fields[0]:
+            continue
+        try:
+            if fields[0] in ("s", "f"):
+                current["texts"][int(fields[1])] = json.loads(fields[2])
+            elif fields[0] == "q":
+                current["queries"].append((float(fields[1]), float(fields[2]), int(fields[3]), int(fields[4]), int(fields[5]), int(fields[6])))
+            elif fields[0] == "t":
+                current["transactions"].append((float(fields[2]), fields[3]))
+            elif fields[0] == "c":
+                current["connections"] += 1
+            elif fields[0] == "x":
+                current["xcoms"].append((fields[1], float(fields[3]), int(fields[4]), json.loads(fields[5]), json.loads(fields[6])))
+        except (IndexError, ValueError):
+            # A line cut short by a process that is still writing or was killed
+            continue
+    return processes
+
+
+def aggregate_xcoms(processes: list[dict[str, Any]]) -> dict[str, Any]:
+    """Per-task XCom push and pull counts, serialized bytes and latencies from parsed trace logs.
+
+    Pushes are counted against the task that pushed and pulls against the
+    task that pulled; ``max_bytes`` is the largest single push and ``keys``
+    the largest push per key.
+    """
+    tasks: dict[str, dict[str, Any]] = {}
+    for process in processes:
+        for op, ms, size, task_id, key in process["xcoms"]:
+            entry = tasks.setdefault(task_id, {"pushes": 0, "pulls": 0, "push_bytes": 0, "pull_bytes": 0, "max_bytes": 0, "keys": {}, "push_ms": [], "pull_ms": []})
+            entry[f"{op}_ms"].append(ms)
+            entry[f"{op}_bytes"] += size
+            if op == "push":
+                entry["pushes"] += 1
+                entry["max_bytes"] = max(entry["max_bytes"], size)
+                entry["keys"][key] = max(entry["keys"].get(key, 0), size)
+            else:
+                entry["pulls"] += 1
+    for entry in tasks.values():
+        entry["push_ms"] = summarize(entry["push_ms"], digits=3)
+        entry["pull_ms"] = summarize(entry["pull_ms"], digits=3)
+    return {
+        "pushes": sum(entry["pushes"] for entry in tasks.values()),
+        "pulls": sum(entry["pulls"] for entry in tasks.values()),
+        "push_bytes": sum(entry["push_bytes"] for entry in tasks.values()),
+        "max_bytes": max((entry["max_bytes"] for entry in tasks.values()), default=0),
+        "tasks": tasks,
+    }
+
+
+def aggregate(processes: list[dict[str, Any]], slow_ms: float = SLOW_QUERY_MS, n_plus_one_min: int = N_PLUS_ONE_MIN, limit: int | None = TOP_QUERIES) -> dict[str, Any]:
+    """Per-query-shape counts and timings, slow queries and N+1 patterns from parsed trace logs.
+
+    Args:
+        processes (list): Output of ``parse_logs``
+        slow_ms (float): p95 duration in milliseconds from which a query shape is slow
+        n_plus_one_min (int): Executions of one SELECT shape from one call site that make an N+1 pattern
+        limit (int, optional): Query shapes to keep, most total time first
+
+    Returns:
+        dict: ``queries`` per shape, ``slow_queries``, ``n_plus_one`` patterns, transaction and connection totals, and ``xcom`` operations
+    """
+    shapes: dict[str, dict[str, Any]] = {}
+    sites: Counter = Counter()
+    site_ms: Counter = Counter()
+    transactions: list[float] = []
+    outcomes: Counter = Counter()
+    connections = 0
+    for process in processes:
+        texts = process["texts"]
+        shape_of: dict[int, str] = {}
+        for _, ms, rows, statement, caller, origin in process["queries"]:
+            shape = shape_of.get(statement)
+            if shape is None:
+                shape = shape_of[statement] = normalize(texts.get(statement, "?"))
+            entry = shapes.setdefault(shape, {"durations": [], "rows": 0, "callers": Counter(), "origins": Counter()})
+            entry["durations"].append(ms)
+            entry["rows"] += max(rows, 0)
+            entry["callers"][texts.get(caller)] += 1
+            if origin >= 0:
+                entry["origins"][texts[origin]] += 1
+            site = texts.get(origin if origin >= 0 else caller)
+            sites[shape, site] += 1
+            site_ms[shape, site] += ms
+        for ms, outcome in process["transactions"]:
+            transactions.append(ms)
+            outcomes[outcome] += 1
+        connections += process["connections"]
+
+    queries = []
+    for shape, entry in shapes.items():
+        durations = entry["durations"]
+        summary = summarize(durations, digits=3)
+        queries.append({
+            "sql": shape,
+            "count": len(durations),
+            "total_ms": round(sum(durations), 3),
+            "mean_ms": summary["mean"],
+            "p95_ms": summary["p95"],
+            "max_ms": summary["max"],
+            "rows": entry["rows"],
+            "caller": entry["callers"].most_common(1)[0][0],
+            "origin": entry["origins"].most_common(1)[0][0] if entry["origins"] else None,
+        })
+    queries.sort(key=lambda query: query["total_ms"], reverse=True)
+    n_plus_one = [
+        {"sql": shape, "frame": site, "count": count, "total_ms": round(site_ms[shape, site], 3)}
+        for (shape, site), count in sites.most_common()
+        if count >= n_plus_one_min and shape.upper().startswith("SELECT")
+    ]
+    return {
+        "instrumented": bool(processes),
+        "processes": len(processes),
+        "statements": sum(query["count"] for query in queries),
+        "total_ms": round(sum(query["total_ms"] for query in queries), 3),
+        "queries": queries[:limit],
+        "slow_queries": [query for query in queries if query["p95_ms"] >= slow_ms],
+        "n_plus_one": n_plus_one,
+        "transaction_time": {**summarize(transactions, digits=3), **outcomes},
+        "connection_patterns": {"connections": connections, "statements_per_connection": round(sum(query["count"] for query in queries) / connections, 1) if connections else None},
+        "xcom": aggregate_xcoms(processes),
+    }
@@ -0,0 +1,153 @@
+"""Per-statement Parse-time Profiler for DAG Files"""
+
+import json
+import subprocess
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from airflow_crew.tools.support.parse_time import PRELOADED_MODULES
+from airflow_crew.tools.support.stats import summarize
+
+DEFAULT_RUNS = 5
+PROFILE_TIMEOUT = 120
+RESULT_MARKER = "__AIRFLOW_CREW_STATEMENT_PROFILE__"
+# Statements slower than this are called out in recommendations
+SLOW_STATEMENT_MS = 100.0
+
+# Executed with ``python -c`` in a fresh interpreter so nothing from this package
+# (or its dependencies) is preloaded and skews import timings. Mirrors the DAG
+# processor: core Airflow is already imported, the DAG folder is on sys.path and
+# the module gets a non-``__main__`` name.
+PROFILER_SCRIPT = """
+import ast, gc, json, sys, time
+path, memory, preload = sys.argv[1], sys.argv[2] == "1", sys.argv[3].split(",")
+for module in filter(None, preload):
+    try:
+        __import__(module)
+    except Exception:
+        pass
+if memory:
+    import tracemalloc
+    tracemalloc.start()
+with open(path, encoding="utf-8") as f:
+    source = f.read()
+lines = source.splitlines()
+tree = ast.parse(source, path)
+sys.path.insert(0, path.rsplit("/", 1)[0] if "/" in path else ".")
+namespace = {"__name__": "unusual_prefix_dag_profile", "__file__": path, "__builtins__": __builtins__}
+records, error = [], None
+gc.collect()
+for statement in tree.body:
+    code = compile(ast.Module(body=[statement], type_ignores=[]), path, "exec")
+    modules_before = len(sys.modules)
+    if memory:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        exec(code, namespace)
+    except BaseException as e:
+        error = {"line": statement.lineno, "error": f"{type(e).__name__}: {e}"}
+    elapsed = time.perf_counter() - start
+    record = {
+        "line": statement.lineno,
+        "end_line": statement.end_lineno,
+        "statement": lines[statement.lineno - 1].strip()[:120],
+        "kind": "import" if isinstance(statement, (ast.Import, ast.ImportFrom)) else "code",
+        "ms": elapsed * 1000,
+        "modules_loaded": len(sys.modules) - modules_before,
+    }
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        record["kb"] = (current - before) / 1024
+        record["peak_kb"] = (peak - before) / 1024
+    records.append(record)
+    if error:
+        break
+print(MARKER + json.dumps({"statements": records, "error": error}))
+"""
+
+
+def local_runner(args: list[str], timeout: int = PROFILE_TIMEOUT) -> str:
+    """Run ``python <args>`` locally and return its stdout."""
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, timeout=timeout).stdout
+
+
+def _run_once(path: str, memory: bool, runner: Callable[[list[str]], str], preload: set[str]) -> dict[str, Any]:
+    script = PROFILER_SCRIPT.replace("MARKER", repr(RESULT_MARKER))
+    output = runner(["-c", script, path, "1" if memory else "0", ",".join(sorted(preload))])
+    for line in reversed(output.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER) :])
+    raise RuntimeError(f"Statement profiler produced no result: {output[-500:]}")
+
+
+def profile_statements(dag_path: str | Path, runs: int = DEFAULT_RUNS, memory: bool = True, runner: Callable[[list[str]], str] = local_runner, preload: set[str] = PRELOADED_MODULES) -> dict[str, Any]:
+    """Execute a DAG file's module body statement by statement and attribute cost to each top-level statement.
+
+    Timing runs are repeated ``runs`` times in fresh interpreters without allocation
+    tracing; one extra run with ``tracemalloc`` attributes allocated memory, since
+    tracing itself slows execution down.
+
+    Args:
+        dag_path (str | Path): DAG file path as seen by ``runner``
+        runs (int): Number of timing runs, for p50/p95
+        memory (bool): Whether to do the allocation-tracing run
+        runner (Callable, optional): Runs ``python <args>`` and returns stdout (e.g. inside a container)
+        preload (set[str]): Modules imported before timing, as in the DAG processor
+
+    Returns:
+        dict: Per-statement timings (ms p50/p95) and allocations, slowest first, plus totals
+    """
+    path = str(dag_path)
+    timings: dict[int, list[float]] = {}
+    totals: list[float] = []
+    statements: dict[int, dict[str, Any]] = {}
+    error = None
+    for _ in range(max(1, runs)):
+        result = _run_once(path, False, runner, preload)
+        error = result["error"]
+        totals.append(sum(record["ms"] for record in result["statements"]))
+        for record in result["statements"]:
+            timings.setdefault(record["line"], []).append(record["ms"])
+            statements.setdefault(record["line"], {key: record[key] for key in ("line", "end_line", "statement", "kind", "modules_loaded")})
+
+    if memory:
+        for record in _run_once(path, True, runner, preload)["statements"]:
+            if record["line"] in statements:
+                statements[record["line"]].update({"kb": round(record["kb"], 1), "peak_kb": round(record["peak_kb"], 1)})
+
+    rows = []
+    for line, info in statements.items():
+        summary = summarize(timings[line])
+        rows.append({**info, "ms_p50": summary["p50"], "ms_p95": summary["p95"]})
+    rows.sort(key=lambda row: row["ms_p50"], reverse=True)
+
+    return {"file": path, "runs": len(totals), "total_ms": summarize(totals), "statements": rows, "error": error}
+
+
+def format_table(profile: dict[str, Any], limit: int | None = 20) -> str:
+    """Render a profile as a fixed-width table: line, statement, ms p50/p95 and KB."""
+    header = f"{'line':>6}  {'ms p50':>9}  {'ms p95':>9}  {'KB':>9}  statement"
+    rows = [header, "-" * len(header)]
+    for row in profile["statements"][:limit]:
+        kb = f"{row['kb']:>9.1f}" if "kb" in row else f"{'-':>9}"
+        rows.append(f"{row['line']:>6}  {row['ms_p50']:>9.2f}  {row['ms_p95']:>9.2f}  {kb}  {row['statement']}")
+    total = profile["total_ms"]
+    rows.append(f"total: p50 {total['p50']:.2f} ms, p95 {total['p95']:.2f} ms over {profile['runs']} runs")
+    if profile.get("error"):
+        rows.append(f"stopped at line {profile['error']['line']}: {profile['error']['error']}")
+    return "\n".join(rows)
+
+
+def slow_statement_recommendations(profile: dict[str, Any], threshold_ms: float = SLOW_STATEMENT_MS) -> list[str]:
+    """Recommendations for statements whose median cost exceeds ``threshold_ms``."""
+    recommendations = []
+    for row in profile["statements"]:
+        if row["ms_p50"] < threshold_ms:
+            break
+        where = "importing" if row["kind"] == "import" else "running"
+        recommendations.append(f"Line {row['line']} spends {row['ms_p50']:.0f} ms {where} `{row['statement']}` on every parse; move it into a task callable")
+    return recommendations
@@ -0,0 +1,89 @@
+"""Summary Statistics for Repeated Measurements"""
+
+import itertools
+import math
+import random
+from collections.abc import Sequence
+from typing import Any
+
+# Splits of the pooled measurements a permutation test may enumerate; beyond that it samples this many at random
+PERMUTATIONS = 10000
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (``q`` in 0-100) of ``values``; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Sequence[float], digits: int = 2) -> dict[str, Any]:
+    """p50/p95/max/mean of repeated measurements."""
+    if not values:
+        return {"n": 0, "p50": 0.0, "p95": 0.0, "max": 0.0, "mean": 0.0}
+    return {
+        "n": len(values),
+        "p50": round(percentile(values, 50), digits),
+        "p95": round(percentile(values, 95), digits),
+        "max": round(max(values), digits),
+        "mean": round(sum(values) / len(values), digits),
+    }
+
+
+def _ranks(values: Sequence[float]) -> list[float]:
+    """1-based ranks of ``values``, ties getting the mean of the ranks they span."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    start = 0
+    while start < len(order):
+        end = start
+        while end + 1 < len(order) and values[order[end + 1]] == values[order[start]]:
+            end += 1
+        for i in order[start : end + 1]:
+            ranks[i] = (start + end) / 2 + 1
+        start = end + 1
+    return ranks
+
+
+def rank_sum_p_value(a: Sequence[float], b: Sequence[float], permutations: int = PERMUTATIONS, seed: int = 0) -> float:
+    """Two-sided p-value that ``a`` and ``b`` come from the same distribution (Wilcoxon rank-sum / Mann-Whitney test).
+
+    The null distribution is built by permutation rather than a normal
+    approximation, so it holds for the handful of runs a benchmark affords:
+    every split of the pooled ranks is tried when there are at most
+    ``permutations`` of them (5 against 5 runs is exact); otherwise that many
+    random splits are.
+    """
+    if not a or not b:
+        return 1.0
+    ranks = _ranks([*a, *b])
+    n = len(a)
+    expected = n * (len(ranks) + 1) / 2
+    # Tolerates float rounding between rank sums of different splits
+    observed = abs(sum(ranks[:n]) - expected) - 1e-9
+
+    if math.comb(len(ranks), n) <= permutations:
+        splits = list(itertools.combinations(ranks, n))
+        return sum(abs(sum(split) - expected) >= observed for split in splits) / len(splits)
+    rng = random.Random(seed)
+    hits = sum(abs(sum(rng.sample(ranks, n)) - expected) >= observed for _ in range(permutations))
+    return (hits + 1) / (permutations + 1)
+
+
+def holm_adjust(p_values: Sequence[float]) -> list[float]:
+    """Holm-Bonferroni adjusted p-values, in input order: rejecting those below alpha keeps the family-wise error rate at alpha."""
+    order = sorted(range(len(p_values)), key=p_values.__getitem__)
+    adjusted = [1.0] * len(p_values)
+    running = 0.0
+    for rank, i in enumerate(order):
+        running = max(running, min(1.0, (len(p_values) - rank) * p_values[i]))
+        adjusted[i] = running
+    return adjusted
+
+
+def min_rank_sum_p_value(n: int) -> float:
+    """Smallest two-sided p-value the exact rank-sum test can give for ``n`` against ``n`` distinct measurements."""
+    return 2 / math.comb(2 * n, n)
@@ -0,0 +1,214 @@
+"""Columnar Task Attributes and Vectorized Task Scoring"""
+
+import contextlib
+import gc
+from datetime import timedelta
+from operator import attrgetter
+from typing import Any
+
+import numpy as np
+from airflow_crew.tools.support.scoring import SCORING_MATRIX
+
+# Task-level rules scored per task, in the order issues are reported
+TASK_RULES = {
+    "no_retries": "Task has no retry mechanism configured",
+    "no_timeout": "Task has no execution timeout set",
+    "depends_on_past": "Task uses depends_on_past which can cause scheduling issues",
+    "no_queue": "Task has no specific queue assigned",
+}
+# DAG score deductions per task whose own score falls below the threshold
+TASK_SCORE_PENALTIES = ((70, 5), (85, 2))
+# Number of lowest-scoring tasks listed in the summary
+WORST_TASKS = 10
+
+DEFAULTS = {
+    "retries": 0,
+    "retry_delay": None,
+    "pool": None,
+    "priority_weight": 1,
+    "queue": None,
+    "execution_timeout": None,
+    "trigger_rule": None,
+    "depends_on_past": False,
+    "wait_for_downstream": False,
+    "email_on_retry": False,
+    "email_on_failure": False,
+}
+
+
+def _column(tasks: list, name: str) -> list:
+    try:
+        return list(map(attrgetter(name), tasks))
+    except AttributeError:
+        # Not a full BaseOperator (e.g. a test double)
+        return [getattr(task, name, DEFAULTS.get(name)) for task in tasks]
+
+
+def _encode(values: list) -> tuple[np.ndarray, list]:
+    """Dictionary-encode a low-cardinality column (queues, pools, trigger rules, shared timedeltas)."""
+    # dict.fromkeys dedupes in first-seen order and map() looks the codes up, both without a Python-level loop per task
+    categories = dict.fromkeys(values)
+    for code, value in enumerate(categories):
+        categories[value] = code
+    codes = np.fromiter(map(categories.__getitem__, values), dtype=np.int32, count=len(values))
+    return codes, list(categories)
+
+
+def _seconds(values: list, missing: float) -> np.ndarray:
+    """Durations in seconds; most tasks share a few ``default_args`` timedeltas, so convert each distinct value once."""
+    codes, categories = _encode(values)
+    seconds = np.array([missing if not value else value.total_seconds() if isinstance(value, timedelta) else float(value) for value in categories], dtype=np.float64)
+    return seconds[codes] if len(categories) else np.empty(0)
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """Pause the cyclic garbage collector, which would otherwise rescan the DAG on every few hundred records built.
+
+    The records are acyclic, so nothing collectable accumulates while it is paused.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class TaskColumns:
+    """Task attributes of a DAG as one array per attribute (struct of arrays).
+
+    Each attribute is gathered for all tasks with a C-level getter, without
+    per-task dicts or ``hasattr`` checks; string-valued attributes are
+    dictionary-encoded into integer codes plus a list of categories.
+    """
+
+    def __init__(self, tasks):
+        tasks = list(tasks)
+        n = len(tasks)
+        self.task_ids: list[str] = _column(tasks, "task_id")
+        self.retries = np.fromiter((value or 0 for value in _column(tasks, "retries")), dtype=np.int64, count=n)
+        self.retry_delay = _seconds(_column(tasks, "retry_delay"), 0.0)
+        self.execution_timeout = _seconds(_column(tasks, "execution_timeout"), np.nan)
+        self.priority_weight = np.fromiter((1 if value is None else value for value in _column(tasks, "priority_weight")), dtype=np.int64, count=n)
+        for name in ("depends_on_past", "wait_for_downstream", "email_on_retry", "email_on_failure"):
+            setattr(self, name, np.fromiter(map(bool, _column(tasks, name)), dtype=bool, count=n))
+        self.queue_codes, self.queues = _encode(_column(tasks, "queue"))
+        self.pool_codes, self.pools = _encode(_column(tasks, "pool"))
+        self.trigger_rule_codes, self.trigger_rules = _encode(_column(tasks, "trigger_rule"))
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    def rule_masks(self) -> dict[str, np.ndarray]:
+        """Boolean mask per ``TASK_RULES`` entry, true for the tasks the rule flags."""
+        has_queue = np.array([bool(queue) for queue in self.queues], dtype=bool)
+        return {
+            "no_retries": self.retries == 0,
+            "no_timeout": np.isnan(self.execution_timeout),
+            "depends_on_past": self.depends_on_past,
+            "no_queue": ~has_queue[self.queue_codes] if len(self.queues) else np.zeros(len(self), dtype=bool),
+        }
+
+    def scores(self, masks: dict[str, np.ndarray] | None = None) -> np.ndarray:
+        """Per-task prognosis scores (see ``scoring.calculate_task_prognosis``)."""
+        masks = masks if masks is not None else self.rule_masks()
+        score = np.full(len(self), 100.0)
+        for rule, mask in masks.items():
+            score -= SCORING_MATRIX[rule]["deduction"] * mask
+        return np.maximum(score, 0.0)
+
+    def complexity_scores(self, masks: dict[str, np.ndarray] | None = None) -> np.ndarray:
+        """Per-task complexity scores (see ``analyzers.analyze_task_complexity``)."""
+        masks = masks if masks is not None else self.rule_masks()
+        return masks["no_retries"].astype(np.int64) + self.depends_on_past + self.wait_for_downstream + masks["no_timeout"]
+
+    def task_metrics(self, complexity: np.ndarray) -> dict[str, dict[str, Any]]:
+        """Per-task attributes in the ``analyze_task_complexity`` format, keyed by task_id."""
+        timeouts = [None if timeout != timeout else timeout for timeout in self.execution_timeout.tolist()]  # NaN -> None
+        pools, queues, trigger_rules = self.pools, self.queues, self.trigger_rules
+        return {
+            task_id: {
+                "retries": retries,
+                "retry_delay": retry_delay,
+                "pool": pools[pool],
+                "priority_weight": priority_weight,
+                "queue": queues[queue],
+                "execution_timeout": timeout,
+                "trigger_rule": trigger_rules[trigger_rule],
+                "depends_on_past": depends_on_past,
+                "wait_for_downstream": wait_for_downstream,
+                "email_on_retry": email_on_retry,
+                "email_on_failure": email_on_failure,
+                "complexity_score": score,
+            }
+            for task_id, retries, retry_delay, pool, priority_weight, queue, timeout, trigger_rule, depends_on_past, wait_for_downstream, email_on_retry, email_on_failure, score in zip(
+                self.task_ids,
+                self.retries.tolist(),
+                self.retry_delay.tolist(),
+                self.pool_codes.tolist(),
+                self.priority_weight.tolist(),
+                self.queue_codes.tolist(),
+                timeouts,
+                self.trigger_rule_codes.tolist(),
+                self.depends_on_past.tolist(),
+                self.wait_for_downstream.tolist(),
+                self.email_on_retry.tolist(),
+                self.email_on_failure.tolist(),
+                complexity.tolist(),
+                strict=True,
+            )
+        }
+
+
+def score_tasks(columns: TaskColumns, expand: bool = False) -> dict[str, Any]:
+    """Score every task at once and aggregate into DAG-level figures.
+
+    Args:
+        columns (TaskColumns): Task attributes
+        expand (bool): Also build per-task ``task_scores`` and ``task_metrics`` records (costly for huge DAGs)
+
+    Returns:
+        dict: ``deduction`` to apply to the DAG score and a ``summary``; with ``expand``, per-task records too
+    """
+    masks = columns.rule_masks()
+    scores = columns.scores(masks)
+    complexity = columns.complexity_scores(masks)
+
+    deduction = 0
+    lower = -np.inf
+    for threshold, penalty in TASK_SCORE_PENALTIES:
+        deduction += penalty * int(np.count_nonzero((scores >= lower) & (scores < threshold)))
+        lower = threshold
+
+    worst = np.argsort(scores, kind="stable")[:WORST_TASKS]
+    summary = {
+        "tasks": len(columns),
+        "rule_counts": {rule: int(np.count_nonzero(mask)) for rule, mask in masks.items()},
+        "mean_score": round(float(scores.mean()), 2) if len(columns) else None,
+        "mean_complexity": round(float(complexity.mean()), 2) if len(columns) else None,
+        "lowest_scoring": [{"task_id": columns.task_ids[i], "score": float(scores[i])} for i in worst if scores[i] < 100],
+    }
+    result: dict[str, Any] = {"deduction": deduction, "summary": summary}
+    if expand:
+        with _gc_paused():
+            result["task_scores"] = expand_task_scores(columns, scores, masks)
+            result["task_metrics"] = columns.task_metrics(complexity)
+    return result
+
+
+def expand_task_scores(columns: TaskColumns, scores: np.ndarray, masks: dict[str, np.ndarray], indices=None) -> dict[str, dict[str, Any]]:
+    """Per-task prognosis records (``calculate_task_prognosis`` format) for ``indices`` (default: all tasks)."""
+    if indices is None:
+        task_ids, score_list = columns.task_ids, scores.tolist()
+    else:
+        indices = np.asarray(indices, dtype=np.int64)
+        task_ids, score_list = [columns.task_ids[i] for i in indices.tolist()], scores[indices].tolist()
+        masks = {rule: mask[indices] for rule, mask in masks.items()}
+    # Issues are created rule by rule for the flagged tasks only, which keeps TASK_RULES order within each task
+    issues: list[list[dict[str, Any]]] = [[] for _ in task_ids]
+    for rule, message in TASK_RULES.items():
+        for i in np.flatnonzero(masks[rule]).tolist():
+            issues[i].append({"type": rule, "message": message, "task_id": task_ids[i]})
+    return {task_id: {"task_id": task_id, "score": score, "issues": task_issues} for task_id, score, task_issues in zip(task_ids, score_list, issues, strict=True)}
@@ -0,0 +1,560 @@
+"""Static Task-graph Extraction and Graph Metrics"""
+
+import ast
+from array import array
+from collections import deque
+from typing import Any
+
+from airflow_crew.tools.support.rules import DEFERRED_SCOPE_NODES, Rule, RuleContext, run_rules
+
+# Functions that wire up dependencies between their arguments
+CHAIN_FUNCTIONS = {"chain", "chain_linear", "cross_downstream"}
+# Operator/XComArg methods returning the task they are called on; arguments become upstream inputs
+TASK_METHODS = {"expand", "expand_kwargs", "partial", "override", "output", "resolve"}
+
+
+def _dotted_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Call):
+        node = node.func
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _decorator_kind(decorator: ast.expr) -> str | None:
+    """``task`` for TaskFlow tasks (``@task``, ``@task.python(...)``), ``dag`` or ``task_group``."""
+    segments = _dotted_name(decorator).split(".")
+    if segments[-1] in ("dag", "task_group"):
+        return segments[-1]
+    if "task" in segments[-2:]:
+        return "task"
+    return None
+
+
+def _constant_keyword(call: ast.expr, name: str, position: int | None = None) -> str | None:
+    if not isinstance(call, ast.Call):
+        return None
+    for keyword in call.keywords:
+        if keyword.arg == name and isinstance(keyword.value, ast.Constant) and isinstance(keyword.value.value, str):
+            return keyword.value.value
+    if position is not None and len(call.args) > position and isinstance(call.args[position], ast.Constant) and isinstance(call.args[position].value, str):
+        return call.args[position].value
+    return None
+
+
+def _target_names(target: ast.expr) -> str | list | None:
+    """Assignment target as a name or (for unpacking) a nested list of names."""
+    if isinstance(target, ast.Name):
+        return target.id
+    if isinstance(target, ast.Tuple | ast.List):
+        return [_target_names(element) for element in target.elts]
+    return None
+
+
+def _decorators(node: ast.AST) -> dict[str, ast.expr]:
+    return {kind: decorator for decorator in getattr(node, "decorator_list", []) if (kind := _decorator_kind(decorator))}
+
+
+class TaskGraphAnalyzer(Rule):
+    """Rule that records task definitions and dependency wiring as symbolic events.
+
+    Each top-level assignment or expression statement that runs when the DAG is
+    built (module level, ``with DAG``/``TaskGroup`` blocks, ``@dag`` and
+    ``@task_group`` function bodies) is translated into a small JSON-like event;
+    ``build_task_graph`` replays the events in source order to resolve variables
+    to task_ids. Keeping the events statement-local lets incremental analysis
+    merge them per statement.
+    """
+
+    name = "task_graph"
+
+    def __init__(self):
+        self.events: list[dict[str, Any]] = []
+
+    def _evaluated(self, ctx: RuleContext) -> bool:
+        """Whether statements at this point run when the DAG is constructed."""
+        for scope in ctx.scopes:
+            if isinstance(scope, ast.Lambda):
+                return False
+            if isinstance(scope, DEFERRED_SCOPE_NODES) and not {"dag", "task_group"} & _decorators(scope).keys():
+                return False
+        return True
+
+    def _group(self, ctx: RuleContext) -> str:
+        """Task group prefix (``outer.inner``) of the statement being visited."""
+        groups = []
+        for parent in ctx.parents:
+            if isinstance(parent, ast.With | ast.AsyncWith):
+                for item in parent.items:
+                    if _dotted_name(item.context_expr).split(".")[-1] == "TaskGroup" and (group_id := _constant_keyword(item.context_expr, "group_id", 0)):
+                        groups.append(group_id)
+            elif isinstance(parent, ast.FunctionDef | ast.AsyncFunctionDef) and (decorator := _decorators(parent).get("task_group")) is not None:
+                groups.append(_constant_keyword(decorator, "group_id") or parent.name)
+        return ".".join(groups)
+
+    def _sym(self, node: ast.expr | None, group: str) -> dict[str, Any] | None:
+        """Symbolic form of an expression, keeping only what matters for tasks and dependencies."""
+        if node is None:
+            return None
+        handler = getattr(self, f"_sym_{type(node).__name__}", self._sym_effects)
+        return handler(node, group)
+
+    def _sym_effects(self, node: ast.expr, group: str) -> dict[str, Any] | None:
+        """Any other expression: only the tasks and dependencies among its subexpressions."""
+        effects = [sym for child in ast.iter_child_nodes(node) if isinstance(child, ast.expr) and (sym := self._sym(child, group)) is not None]
+        return {"op": "effects", "items": effects} if effects else None
+
+    def _sym_Name(self, node: ast.Name, group: str) -> dict[str, Any]:
+        return {"op": "name", "id": node.id}
+
+    def _sym_List(self, node: ast.List | ast.Tuple | ast.Set, group: str) -> dict[str, Any]:
+        return {"op": "list", "items": [self._sym(element, group) for element in node.elts]}
+
+    _sym_Tuple = _sym_Set = _sym_List
+
+    def _sym_Dict(self, node: ast.Dict, group: str) -> dict[str, Any]:
+        return {"op": "list", "items": [self._sym(value, group) for value in node.values]}
+
+    def _sym_ListComp(self, node: ast.ListComp | ast.SetComp | ast.GeneratorExp, group: str) -> dict[str, Any]:
+        # The element is evaluated once, standing for every task the loop would create
+        return {"op": "list", "items": [self._sym(node.elt, group)]}
+
+    _sym_SetComp = _sym_GeneratorExp = _sym_ListComp
+
+    def _sym_Starred(self, node: ast.Starred, group: str) -> dict[str, Any]:
+        return {"op": "star", "value": self._sym(node.value, group)}
+
+    def _sym_Subscript(self, node: ast.Subscript, group: str) -> dict[str, Any]:
+        index = node.slice.value if isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, int) else None
+        return {"op": "item", "value": self._sym(node.value, group), "index": index}
+
+    def _sym_Attribute(self, node: ast.Attribute, group: str) -> dict[str, Any]:
+        return {"op": "attr", "value": self._sym(node.value, group), "attr": node.attr}
+
+    def _sym_BinOp(self, node: ast.BinOp, group: str) -> dict[str, Any] | None:
+        if not isinstance(node.op, ast.RShift | ast.LShift):
+            return self._sym_effects(node, group)
+        return {"op": "shift", "downstream": isinstance(node.op, ast.RShift), "left": self._sym(node.left, group), "right": self._sym(node.right, group), "line": node.lineno}
+
+    def _sym_Call(self, node: ast.Call, group: str) -> dict[str, Any]:
+        args = [self._sym(arg, group) for arg in node.args] + [self._sym(keyword.value, group) for keyword in node.keywords if keyword.arg != "task_id"]
+        override = isinstance(node.func, ast.Attribute) and node.func.attr == "override"
+        task_id = next((keyword.value for keyword in node.keywords if keyword.arg == "task_id"), None)
+        if task_id is not None and not override:
+            # Operator instantiation (including ``Operator.partial(task_id=...)``)
+            dynamic = not (isinstance(task_id, ast.Constant) and isinstance(task_id.value, str))
+            return {
+                "op": "task",
+                "task_id": ast.unparse(task_id) if dynamic else task_id.value,
+                "dynamic": dynamic,
+                "group": group,
+                "operator": _dotted_name(node.func),
+                "inputs": args,
+                "line": node.lineno,
+            }
+        call = {"op": "call", "func": self._sym(node.func, group), "args": args, "group": group, "line": node.lineno}
+        if override:
+            call["task_id"] = _constant_keyword(node, "task_id")
+        return call
+
+    def _sym_Lambda(self, node: ast.Lambda, group: str) -> None:
+        return None
+
+    def _statement(self, targets: list[ast.expr], value: ast.expr | None, ctx: RuleContext):
+        if value is None or not self._evaluated(ctx):
+            return
+        sym = self._sym(value, self._group(ctx))
+        names = [_target_names(target) for target in targets if isinstance(target, ast.Name | ast.Tuple | ast.List)]
+        if sym is not None or names:
+            self.events.append({"event": "eval", "targets": names, "value": sym})
+
+    def visit_Assign(self, node: ast.Assign, ctx: RuleContext):
+        """Bind task variables."""
+        self._statement(node.targets, node.value, ctx)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign, ctx: RuleContext):
+        """Bind annotated task variables."""
+        self._statement([node.target], node.value, ctx)
+
+    def visit_Expr(self, node: ast.Expr, ctx: RuleContext):
+        """Record dependency expressions and task calls evaluated for their side effects."""
+        self._statement([], node.value, ctx)
+
+    def visit_With(self, node: ast.With, ctx: RuleContext):
+        """Bind ``with TaskGroup(...) as tg`` targets to the group."""
+        if not self._evaluated(ctx):
+            return
+        group = self._group(ctx)
+        for item in node.items:
+            if _dotted_name(item.context_expr).split(".")[-1] == "TaskGroup" and (group_id := _constant_keyword(item.context_expr, "group_id", 0)):
+                target = item.optional_vars.id if isinstance(item.optional_vars, ast.Name) else None
+                self.events.append({"event": "group", "target": target, "group": f"{group}.{group_id}" if group else group_id})
+                group = f"{group}.{group_id}" if group else group_id
+
+    def _function(self, node: ast.FunctionDef | ast.AsyncFunctionDef, ctx: RuleContext):
+        if not self._evaluated(ctx):
+            return
+        decorators = _decorators(node)
+        if "task" in decorators:
+            task_id = _constant_keyword(decorators["task"], "task_id") or node.name
+            self.events.append({"event": "taskflow", "name": node.name, "task_id": task_id, "line": node.lineno})
+        elif "task_group" in decorators:
+            self.events.append({"event": "task_group", "name": node.name, "group": _constant_keyword(decorators["task_group"], "group_id") or node.name})
+
+    def visit_FunctionDef(self, node: ast.FunctionDef, ctx: RuleContext):
+        """Register ``@task`` and ``@task_group`` functions."""
+        self._function(node, ctx)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef, ctx: RuleContext):
+        """Register async ``@task`` functions."""
+        self._function(node, ctx)
+
+    def result(self) -> dict[str, Any]:
+        """Return the recorded events in source order."""
+        return {"events": self.events}
+
+    def merge(self, partial: dict[str, Any]):
+        """Append events from a later part of the module."""
+        self.events.extend(partial["events"])
+
+
+class TaskGraph:
+    """Task dependency graph with integer task indices and compressed (CSR) adjacency.
+
+    Downstream tasks of task ``i`` are ``targets[offsets[i]:offsets[i + 1]]``;
+    ``reverse_offsets``/``reverse_targets`` hold the upstream tasks the same way.
+    """
+
+    def __init__(self, task_ids: list[str], edges: list[tuple[int, int]], lines: list[int] | None = None):
+        self.task_ids = task_ids
+        self.lines = lines or [0] * len(task_ids)
+        self.offsets, self.targets = self._csr(len(task_ids), edges)
+        self.reverse_offsets, self.reverse_targets = self._csr(len(task_ids), [(v, u) for u, v in edges])
+
+    @staticmethod
+    def _csr(n: int, edges: list[tuple[int, int]]) -> tuple[array, array]:
+        """Counting sort of edges by source."""
+        offsets = array("l", [0]) * (n + 1)
+        for u, _ in edges:
+            offsets[u + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        targets = array("l", [0]) * len(edges)
+        position = offsets[:-1]
+        for u, v in edges:
+            targets[position[u]] = v
+            position[u] += 1
+        return offsets, targets
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of dependency edges."""
+        return len(self.targets)
+
+    def downstream(self, i: int) -> array:
+        """Indices of the direct downstream tasks of task ``i``."""
+        return self.targets[self.offsets[i] : self.offsets[i + 1]]
+
+    def upstream(self, i: int) -> array:
+        """Indices of the direct upstream tasks of task ``i``."""
+        return self.reverse_targets[self.reverse_offsets[i] : self.reverse_offsets[i + 1]]
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-serializable adjacency."""
+        return {"task_ids": self.task_ids, "offsets": self.offsets.tolist(), "targets": self.targets.tolist()}
+
+    def metrics(self) -> dict[str, Any]:
+        """Graph metrics in O(tasks + edges): critical path, level width, fan-in/fan-out and cycles.
+
+        The critical path counts tasks on the longest dependency chain. Width is the
+        largest number of tasks sharing a depth level, a lower bound on the number of
+        tasks that can run at once. Both are None when the graph has a cycle.
+        """
+        n = len(self)
+        in_degree = [self.reverse_offsets[i + 1] - self.reverse_offsets[i] for i in range(n)]
+        out_degree = [self.offsets[i + 1] - self.offsets[i] for i in range(n)]
+        fan_in = max(range(n), key=in_degree.__getitem__, default=None)
+        fan_out = max(range(n), key=out_degree.__getitem__, default=None)
+
+        # Kahn's algorithm; depth[i] is the number of tasks on the longest chain ending at i
+        remaining = list(in_degree)
+        depth = [1] * n
+        best_parent = [-1] * n
+        queue = deque(i for i in range(n) if not remaining[i])
+        visited = 0
+        while queue:
+            u = queue.popleft()
+            visited += 1
+            for v in self.downstream(u):
+                if depth[u] + 1 > depth[v]:
+                    depth[v] = depth[u] + 1
+                    best_parent[v] = u
+                remaining[v] -= 1
+                if not remaining[v]:
+                    queue.append(v)
+
+        metrics: dict[str, Any] = {
+            "tasks": n,
+            "edges": self.edge_count,
+            "roots": sum(1 for degree in in_degree if not degree),
+            "leaves": sum(1 for degree in out_degree if not degree),
+            "max_fan_in": {"task_id": self.task_ids[fan_in], "count": in_degree[fan_in]} if n else None,
+            "max_fan_out": {"task_id": self.task_ids[fan_out], "count": out_degree[fan_out]} if n else None,
+            "has_cycle": visited < n,
+            "cycle": [],
+            "critical_path_length": None,
+            "critical_path": [],
+            "max_width": None,
+        }
+        if visited < n:
+            metrics["cycle"] = [self.task_ids[i] for i in self._find_cycle(remaining)]
+            return metrics
+        if not n:
+            metrics.update({"critical_path_length": 0, "max_width": 0})
+            return metrics
+
+        end = max(range(n), key=depth.__getitem__)
+        path = []
+        while end >= 0:
+            path.append(self.task_ids[end])
+            end = best_parent[end]
+        levels: dict[int, int] = {}
+        for d in depth:
+            levels[d] = levels.get(d, 0) + 1
+        metrics.update({"critical_path_length": len(path), "critical_path": path[::-1], "max_width": max(levels.values())})
+        return metrics
+
+    def _find_cycle(self, remaining: list[int]) -> list[int]:
+        """One cycle among the tasks Kahn's algorithm could not order (each has an unordered upstream task)."""
+        node = next(i for i, degree in enumerate(remaining) if degree)
+        seen: dict[int, int] = {}
+        walk = []
+        while node not in seen:
+            seen[node] = len(walk)
+            walk.append(node)
+            node = next(u for u in self.upstream(node) if remaining[u])
+        cycle = walk[seen[node] :]
+        cycle.reverse()
+        return cycle
+
+
+class _Group:
+    __slots__ = ("group_id",)
+
+    def __init__(self, group_id: str):
+        self.group_id = group_id
+
+
+class _Function:
+    __slots__ = ("kind", "name", "task_id")
+
+    def __init__(self, kind: str, name: str, task_id: str):
+        self.kind = kind  # "taskflow" or "task_group"
+        self.name = name
+        self.task_id = task_id
+
+
+class _GraphBuilder:
+    """Replays ``TaskGraphAnalyzer`` events, tracking what every variable refers to."""
+
+    def __init__(self):
+        self.task_ids: list[str] = []
+        self.lines: list[int] = []
+        self.index: dict[str, int] = {}
+        self.downstream: list[set[int]] = []
+        self.upstream: list[set[int]] = []
+        self.members: dict[str, list[int]] = {}
+        self.bindings: dict[str, Any] = {}
+        self.taskflow_calls: dict[str, int] = {}
+
+    def add_task(self, task_id: str, group: str, line: int) -> int:
+        full_id = f"{group}.{task_id}" if group else task_id
+        if full_id in self.index:
+            return self.index[full_id]
+        i = self.index[full_id] = len(self.task_ids)
+        self.task_ids.append(full_id)
+        self.lines.append(line)
+        self.downstream.append(set())
+        self.upstream.append(set())
+        prefix = ""
+        for part in group.split(".") if group else ():
+            prefix = f"{prefix}.{part}" if prefix else part
+            self.members.setdefault(prefix, []).append(i)
+        return i
+
+    def add_edges(self, upstream: Any, downstream: Any):
+        for u in self.tasks(upstream, leaves=True):
+            for v in self.tasks(downstream, leaves=False):
+                # Self-edges only appear when a loop collapses into one dynamic task
+                if u != v:
+                    self.downstream[u].add(v)
+                    self.upstream[v].add(u)
+
+    def tasks(self, value: Any, leaves: bool = True) -> list[int]:
+        """Task indices a value stands for; groups stand for their leaves (as upstream) or roots (as downstream)."""
+        if isinstance(value, int):
+            return [value]
+        if isinstance(value, list):
+            return [i for item in value for i in self.tasks(item, leaves)]
+        if isinstance(value, _Group):
+            members = self.members.get(value.group_id, [])
+            member_set = set(members)
+            links = self.downstream if leaves else self.upstream
+            return [i for i in members if not links[i] & member_set]
+        return []
+
+    def evaluate(self, sym: dict[str, Any] | None) -> Any:
+        if sym is None:
+            return None
+        handler = getattr(self, f"_eval_{sym['op']}", None)
+        return handler(sym) if handler is not None else None
+
+    def _eval_name(self, sym: dict[str, Any]) -> Any:
+        return self.bindings.get(sym["id"])
+
+    def _eval_list(self, sym: dict[str, Any]) -> list[Any]:
+        return [self.evaluate(item) for item in sym["items"]]
+
+    def _eval_effects(self, sym: dict[str, Any]) -> None:
+        for item in sym["items"]:
+            self.evaluate(item)
+
+    def _eval_star(self, sym: dict[str, Any]) -> Any:
+        return self.evaluate(sym["value"])
+
+    def _eval_item(self, sym: dict[str, Any]) -> Any:
+        value = self.evaluate(sym["value"])
+        if isinstance(value, list) and sym["index"] is not None and -len(value) <= sym["index"] < len(value):
+            return value[sym["index"]]
+        return value
+
+    def _eval_attr(self, sym: dict[str, Any]) -> Any:
+        value = self.evaluate(sym["value"])
+        return value if sym["attr"] in TASK_METHODS or isinstance(value, _Function) else None
+
+    def _eval_shift(self, sym: dict[str, Any]) -> Any:
+        left, right = self.evaluate(sym["left"]), self.evaluate(sym["right"])
+        if sym["downstream"]:
+            self.add_edges(left, right)
+        else:
+            self.add_edges(right, left)
+        return right
+
+    def _eval_task(self, sym: dict[str, Any]) -> int:
+        i = self.add_task(sym["task_id"], sym["group"], sym["line"])
+        self.add_edges([self.evaluate(item) for item in sym["inputs"]], i)
+        return i
+
+    def _eval_call(self, sym: dict[str, Any]) -> Any:
+        func = sym["func"]
+        if func and func["op"] == "attr":
+            return self._method_call(sym)
+
+        target = self.evaluate(func)
+        args = [self.evaluate(arg) for arg in sym["args"]]
+        if isinstance(target, _Function):
+            group = sym["group"]
+            if target.kind == "task_group":
+                return _Group(f"{group}.{target.task_id}" if group else target.task_id)
+            key = f"{group}.{target.task_id}"
+            calls = self.taskflow_calls[key] = self.taskflow_calls.get(key, 0) + 1
+            # Repeated calls of a TaskFlow function get suffixed task_ids, as in Airflow
+            i = self.add_task(f"{target.task_id}__{calls - 1}" if calls > 1 else target.task_id, group, sym["line"])
+            self.add_edges(args, i)
+            return i
+        if target is None and func and func["op"] == "name" and func["id"] in CHAIN_FUNCTIONS:
+            self._chain(func["id"], sym["args"], args)
+        return None
+
+    def _method_call(self, sym: dict[str, Any]) -> Any:
+        """Method call: evaluate the owner once, then the arguments."""
+        func = sym["func"]
+        owner = self.evaluate(func["value"])
+        args = [self.evaluate(arg) for arg in sym["args"]]
+        name = func["attr"]
+        if isinstance(owner, _Function):
+            return _Function(owner.kind, owner.name, sym.get("task_id") or owner.task_id) if name == "override" else None
+        if owner is None:
+            if name in CHAIN_FUNCTIONS:
+                self._chain(name, sym["args"], args)
+            return None
+        if name == "set_downstream":
+            self.add_edges(owner, args)
+        elif name == "set_upstream":
+            self.add_edges(args, owner)
+        elif name in TASK_METHODS:
+            # e.g. ``Operator.partial(...).expand(x=upstream_task.output)``
+            self.add_edges(args, owner)
+            return owner
+        return None
+
+    def _chain(self, name: str, arg_syms: list[dict[str, Any] | None], args: list[Any]):
+        # ``chain(*tasks)`` spreads a list into separate arguments
+        elements = []
+        for sym, value in zip(arg_syms, args, strict=True):
+            if sym and sym["op"] == "star" and isinstance(value, list):
+                elements.extend(value)
+            else:
+                elements.append(value)
+        if name == "cross_downstream":
+            if len(elements) == 2:
+                self.add_edges(elements[0], elements[1])
+            return
+        for upstream, downstream in zip(elements, elements[1:]):
+            if name == "chain" and isinstance(upstream, list) and isinstance(downstream, list) and len(upstream) == len(downstream):
+                # chain() links lists of equal length pairwise
+                for u, v in zip(upstream, downstream):
+                    self.add_edges(u, v)
+            else:
+                self.add_edges(upstream, downstream)
+
+    def bind(self, target: str | list | None, value: Any):
+        if isinstance(target, str):
+            self.bindings[target] = value
+        elif isinstance(target, list):
+            # ``a, b = task_a, task_b``; anything else leaves the names unresolved
+            values = value if isinstance(value, list) and len(value) == len(target) else [None] * len(target)
+            for name, item in zip(target, values, strict=True):
+                self.bind(name, item)
+
+    def replay(self, event: dict[str, Any]):
+        kind = event["event"]
+        if kind == "eval":
+            value = self.evaluate(event["value"])
+            for target in event["targets"]:
+                self.bind(target, value)
+        elif kind == "group":
+            if event["target"]:
+                self.bindings[event["target"]] = _Group(event["group"])
+        elif kind == "taskflow":
+            self.bindings[event["name"]] = _Function("taskflow", event["name"], event["task_id"])
+        elif kind == "task_group":
+            self.bindings[event["name"]] = _Function("task_group", event["name"], event["group"])
+
+
+def build_task_graph(events: list[dict[str, Any]]) -> TaskGraph:
+    """Resolve ``TaskGraphAnalyzer`` events into a ``TaskGraph``.
+
+    Args:
+        events (list): ``TaskGraphAnalyzer`` result events in source order
+
+    Returns:
+        TaskGraph: Tasks (with task group prefixes) and their dependency edges
+    """
+    builder = _GraphBuilder()
+    for event in events:
+        builder.replay(event)
+    edges = [(u, v) for u, downstream in enumerate(builder.downstream) for v in sorted(downstream)]
+    return TaskGraph(builder.task_ids, edges, builder.lines)
+
+
+def extract_task_graph(code: str) -> TaskGraph:
+    """Build the task graph of DAG source code without importing Airflow."""
+    return build_task_graph(run_rules(ast.parse(code), [TaskGraphAnalyzer()])["task_graph"]["events"])
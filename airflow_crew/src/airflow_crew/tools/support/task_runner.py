@@ -0,0 +1,317 @@
+"""Topology-aware Concurrent ``airflow tasks test`` Runner"""
+
+import json
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any
+
+from airflow_crew.tools.support.analyzers import analyze_xcom_usage
+from airflow_crew.tools.support.environment import TASK_OUTPUT_TAIL, ExecResult
+from airflow_crew.tools.support.scoring import calculate_score
+from airflow_crew.tools.support.task_graph import TaskGraph
+
+if TYPE_CHECKING:
+    from airflow_crew.tools.support.environment import EnvironmentManager
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_LOGICAL_DATE = "2024-01-01"
+# Seconds a single task run may take
+TASK_TIMEOUT = 600
+# Concurrent task runs share one SQLite metadata DB; a run that lost a write lock is retried this many times
+LOCKED_RETRIES = 2
+LOCKED_MESSAGE = "database is locked"
+RESULT_MARKER = "__AIRFLOW_CREW_TASK_RUNNER__"
+
+# Executed with ``python -c`` in the environment: the DAG's real task graph, as Airflow builds it
+GRAPH_SCRIPT = """
+import json, sys
+from airflow.models.dagbag import DagBag
+path, dag_id = sys.argv[1], sys.argv[2]
+bag = DagBag(dag_folder=path, include_examples=False)
+dag = bag.dags.get(dag_id)
+if dag is None:
+    print(MARKER + json.dumps({"error": "; ".join(bag.import_errors.values()) or f"DAG {dag_id} not found in {path}"}))
+    sys.exit(1)
+tasks = dag.tasks
+print(MARKER + json.dumps({"task_ids": [task.task_id for task in tasks], "edges": [[task.task_id, downstream] for task in tasks for downstream in sorted(task.downstream_task_ids)]}))
+"""
+
+# Executed with ``python -c``; arguments: create|delete, DAGs folder, DAG id, run id, logical date. Every task
+# of a graph run goes through this one DagRun: when ``tasks test`` finds no run it creates a temporary one
+# and deletes it, with its XComs, on exit, so parallel tasks would race to insert it and lose upstream XComs.
+DAG_RUN_SCRIPT = """
+import json, sys
+from airflow.models.dagrun import DagRun
+from airflow.models.xcom import XCom
+from airflow.utils.session import create_session
+action, path, dag_id, run_id, logical_date = sys.argv[1:6]
+with create_session() as session:
+    if action == "delete":
+        session.query(XCom).filter(XCom.dag_id == dag_id, XCom.run_id == run_id).delete(synchronize_session=False)
+        for run in session.query(DagRun).filter(DagRun.dag_id == dag_id, DagRun.run_id == run_id):
+            session.delete(run)
+        print(MARKER + json.dumps({"run_id": run_id}))
+        sys.exit(0)
+    from airflow.models.dagbag import DagBag
+    from airflow.utils import timezone
+    from airflow.utils.state import DagRunState
+    from airflow.utils.types import DagRunType
+    dag = DagBag(dag_folder=path, include_examples=False).dags.get(dag_id)
+    date = timezone.parse(logical_date)
+    if dag is None:
+        error = f"DAG {dag_id} not found in {path}"
+    elif DagRun.find(dag_id=dag_id, execution_date=date, session=session):
+        error = f"DAG {dag_id} already has a run at {logical_date}; restore the metadata DB or pick another logical date"
+    else:
+        dag.create_dagrun(
+            run_id=run_id,
+            execution_date=date,
+            data_interval=dag.timetable.infer_manual_data_interval(run_after=date),
+            state=DagRunState.RUNNING,
+            run_type=DagRunType.MANUAL,
+            external_trigger=True,
+            session=session,
+        )
+        error = None
+    print(MARKER + json.dumps({"run_id": run_id, "error": error}))
+"""
+
+# Executed with ``python -c``; reads XCom sizes straight from the SQLite metadata DB without importing Airflow
+XCOM_SCRIPT = """
+import json, sqlite3, sys
+db = sqlite3.connect(f"file:{sys.argv[1]}?mode=ro", uri=True)
+try:
+    rows = db.execute("SELECT task_id, key, length(value) FROM xcom WHERE dag_id = ? AND run_id = ?", (sys.argv[2], sys.argv[3])).fetchall()
+except sqlite3.Error:
+    rows = []
+print(MARKER + json.dumps(rows))
+"""
+
+
+def _marker_result(output: str) -> Any:
+    return next((json.loads(line[len(RESULT_MARKER) :]) for line in reversed(output.splitlines()) if line.startswith(RESULT_MARKER)), None)
+
+
+def load_task_graph(environment: "EnvironmentManager", dag_id: str, dag_path: str | None = None) -> TaskGraph:
+    """Task graph of ``dag_id`` as loaded by Airflow in ``environment`` from ``dag_path`` (default: its DAGs folder)."""
+    script = GRAPH_SCRIPT.replace("MARKER", repr(RESULT_MARKER))
+    _, output = environment.execute_command(["python", "-c", script, dag_path or environment.dags_folder, dag_id])
+    raw = _marker_result(output)
+    if raw is None or "error" in raw:
+        raise RuntimeError(f"Could not load task graph of {dag_id}: {raw['error'] if raw else output[-2000:].strip()}")
+    index = {task_id: i for i, task_id in enumerate(raw["task_ids"])}
+    return TaskGraph(raw["task_ids"], [(index[upstream], index[downstream]) for upstream, downstream in raw["edges"]])
+
+
+def create_dag_run(environment: "EnvironmentManager", dag_id: str, run_id: str, logical_date: str):
+    """Create the DagRun ``run_id`` of ``dag_id`` at ``logical_date`` in the metadata DB of ``environment``."""
+    script = DAG_RUN_SCRIPT.replace("MARKER", repr(RESULT_MARKER))
+    _, output = environment.execute_command(["python", "-c", script, "create", environment.dags_folder, dag_id, run_id, logical_date])
+    raw = _marker_result(output)
+    if raw is None or raw["error"]:
+        raise RuntimeError(f"Could not create a run of {dag_id}: {raw['error'] if raw else output[-2000:].strip()}")
+
+
+def delete_dag_run(environment: "EnvironmentManager", dag_id: str, run_id: str):
+    """Delete the DagRun ``run_id`` of ``dag_id``, with its task instances and XComs."""
+    script = DAG_RUN_SCRIPT.replace("MARKER", repr(RESULT_MARKER))
+    environment.execute_command(["python", "-c", script, "delete", environment.dags_folder, dag_id, run_id, ""])
+
+
+def xcom_sizes(environment: "EnvironmentManager", dag_id: str, run_id: str) -> dict[str, dict[str, Any]]:
+    """Number and serialized size of the XComs each task of run ``run_id`` of ``dag_id`` pushed to the metadata DB."""
+    script = XCOM_SCRIPT.replace("MARKER", repr(RESULT_MARKER))
+    _, output = environment.execute_command(["python", "-c", script, environment.metadata_db_path, dag_id, run_id])
+    sizes: dict[str, dict[str, Any]] = {}
+    for task_id, key, size in _marker_result(output) or []:
+        entry = sizes.setdefault(task_id, {"count": 0, "bytes": 0, "keys": {}})
+        entry["count"] += 1
+        entry["bytes"] += size or 0
+        entry["keys"][key] = size or 0
+    return sizes
+
+
+def _descendants(graph: TaskGraph, i: int) -> list[int]:
+    """Every task downstream of task ``i``, directly or transitively."""
+    seen = {i}
+    queue = deque([i])
+    while queue:
+        for v in graph.downstream(queue.popleft()):
+            if v not in seen:
+                seen.add(v)
+                queue.append(v)
+    seen.discard(i)
+    return sorted(seen)
+
+
+def _task_result(task_id: str, started: float | None, seconds: float, result: ExecResult | None, error: str | None) -> dict[str, Any]:
+    """Per-task entry of a graph run from its ``tasks test`` result (None if it could not be started)."""
+    state = "success" if result is not None and result.exit_code == 0 else "timed_out" if result is not None and result.timed_out else "failed"
+    return {
+        "task_id": task_id,
+        "state": state,
+        "exit_code": result.exit_code if result is not None else None,
+        "started_seconds": round(started, 3),
+        "wall_seconds": round(seconds, 3),
+        "output_tail": None if state == "success" else (result.output[-TASK_OUTPUT_TAIL:] if result is not None else error),
+    }
+
+
+def _run_task(environment: "EnvironmentManager", command: list[str], timeout: float) -> tuple[ExecResult | None, str | None]:
+    """Run one ``tasks test`` command, retrying when it lost the SQLite write lock; the error if it could not be run."""
+    try:
+        for _ in range(LOCKED_RETRIES + 1):
+            result = environment.stream_command(command, timeout=timeout)
+            if result.exit_code == 0 or LOCKED_MESSAGE not in result.output:
+                break
+    except Exception as e:
+        return None, str(e)
+    return result, None
+
+
+def _unblocked(graph: TaskGraph, tasks: list[dict[str, Any] | None], remaining: list[int], i: int) -> list[int]:
+    """Tasks that can start now that task ``i`` is done; after a failure, its descendants are marked ``upstream_failed`` instead."""
+    if tasks[i]["state"] != "success":
+        for v in _descendants(graph, i):
+            if tasks[v] is None:
+                tasks[v] = {"task_id": graph.task_ids[v], "state": "upstream_failed", "exit_code": None, "started_seconds": None, "wall_seconds": 0.0, "output_tail": None}
+        return []
+    ready = []
+    for v in graph.downstream(i):
+        remaining[v] -= 1
+        if not remaining[v] and tasks[v] is None:
+            ready.append(v)
+    return ready
+
+
+def _run_in_order(
+    environment: "EnvironmentManager",
+    graph: TaskGraph,
+    dag_id: str,
+    run_id: str,
+    run_tag: str,
+    concurrency: int,
+    timeout: float,
+) -> tuple[list[dict[str, Any]], list[int], float]:
+    """Run every task of ``graph`` in DagRun ``run_id`` once its upstream tasks succeeded; returns the task entries, completion order and wall time."""
+    n = len(graph)
+    remaining = [len(graph.upstream(i)) for i in range(n)]
+    tasks: list[dict[str, Any] | None] = [None] * n
+    finished: list[int] = []  # completion order, a topological order of the tasks that ran
+    start = time.monotonic()
+
+    def run(i: int) -> tuple[float, ExecResult | None, str | None]:
+        started = time.monotonic() - start
+        command = environment.traced(["airflow", "tasks", "test", dag_id, graph.task_ids[i], run_id], f"{run_tag}-{i}")
+        return started, *_run_task(environment, command, timeout)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="task-test") as executor:
+        running = {executor.submit(run, i): i for i in range(n) if not remaining[i]}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                started, result, error = future.result()
+                tasks[i] = _task_result(graph.task_ids[i], started, time.monotonic() - start - started, result, error)
+                finished.append(i)
+                running.update({executor.submit(run, v): v for v in _unblocked(graph, tasks, remaining, i)})
+    return tasks, finished, time.monotonic() - start
+
+
+def _summarize_run(graph: TaskGraph, metrics: dict[str, Any], tasks: list[dict[str, Any]], finished: list[int], wall: float, concurrency: int) -> dict[str, Any]:
+    """State counts and timings of a graph run, against its measured critical path."""
+    # Longest chain of measured task times: the least wall time any schedule could achieve
+    chain = [0.0] * len(graph)
+    for i in finished:
+        chain[i] = max((chain[u] for u in graph.upstream(i)), default=0.0) + tasks[i]["wall_seconds"]
+    task_seconds = sum(task["wall_seconds"] for task in tasks)
+    states = [task["state"] for task in tasks]
+    return {
+        "tasks": len(graph),
+        **{state: states.count(state) for state in ("success", "failed", "timed_out", "upstream_failed")},
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "task_seconds": round(task_seconds, 3),
+        "critical_path_seconds": round(max(chain, default=0.0), 3),
+        "critical_path_length": metrics["critical_path_length"],
+        "max_width": metrics["max_width"],
+        "parallelism": round(task_seconds / wall, 2) if wall else 0.0,
+    }
+
+
+def run_task_graph(
+    environment: "EnvironmentManager",
+    dag_id: str,
+    graph: TaskGraph | None = None,
+    logical_date: str = DEFAULT_LOGICAL_DATE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = TASK_TIMEOUT,
+    restore: bool = True,
+) -> dict[str, Any]:
+    """Run ``airflow tasks test`` for every task of a DAG in dependency order, independent branches in parallel.
+
+    A task starts as soon as all its upstream tasks have succeeded, with at most
+    ``concurrency`` runs at a time, so the whole DAG takes about its critical
+    path rather than the sum of its tasks. When a task fails, everything
+    downstream of it is marked ``upstream_failed`` and not run; other
+    branches carry on. All runs go through one DagRun, created up front and
+    deleted at the end, so downstream tasks can pull their upstream tasks'
+    XComs. Every run is traced,
+    so each task's XCom push and pull latencies are measured alongside the
+    serialized sizes read back from the metadata DB.
+
+    Args:
+        environment (EnvironmentManager): Environment with the DAG in place
+        dag_id (str): DAG to run
+        graph (TaskGraph, optional): Task graph to follow; loaded from Airflow in the environment if not given
+        logical_date (str): Logical date of the shared DagRun
+        concurrency (int): Maximum number of task runs at once
+        timeout (float): Seconds before a single task run is killed
+        restore (bool): Restore the metadata DB first, so only this run's XComs are counted
+
+    Returns:
+        dict: Per-task state, exit code, timing and XCom sizes and latencies in graph order, and a summary against the critical path with XCom issues and their score
+    """
+    if graph is None:
+        graph = load_task_graph(environment, dag_id)
+    metrics = graph.metrics()
+    if metrics["has_cycle"]:
+        raise RuntimeError(f"Task graph of {dag_id} has a cycle: {' -> '.join(metrics['cycle'])}")
+    if restore:
+        environment.restore_metadata_db()
+
+    key = uuid.uuid4().hex[:12]
+    run_id, run_tag = f"airflow_crew__{key}", f"graph-{key}"
+    create_dag_run(environment, dag_id, run_id, logical_date)
+    try:
+        tasks, finished, wall = _run_in_order(environment, graph, dag_id, run_id, run_tag, concurrency, timeout)
+        # Read before the run is deleted, which takes its XComs with it
+        xcoms = xcom_sizes(environment, dag_id, run_id) if environment.metadata_db_path else {}
+    finally:
+        delete_dag_run(environment, dag_id, run_id)
+
+    traced = environment.read_sql_trace(f"{run_tag}-*.log")["xcom"]["tasks"]
+    empty = {"count": 0, "bytes": 0, "keys": {}}
+    for task in tasks:
+        task["xcom"] = dict(xcoms.get(task["task_id"], empty))
+        # Sizes measured as the task serialized them; the DB read only fills in tasks that were not traced
+        task["xcom"]["max_bytes"] = max(task["xcom"]["keys"].values(), default=0)
+        operations = traced.get(task["task_id"])
+        if operations:
+            task["xcom"].update({field: operations[field] for field in ("pushes", "pulls", "push_ms", "pull_ms", "max_bytes")})
+    xcom_issues = analyze_xcom_usage({task["task_id"]: task["xcom"] for task in tasks})
+
+    states = [task["state"] for task in tasks]
+    return {
+        "dag_id": dag_id,
+        "success": all(state == "success" for state in states),
+        "tasks": tasks,
+        "summary": {
+            **_summarize_run(graph, metrics, tasks, finished, wall, concurrency),
+            "xcom_bytes": sum(task["xcom"]["bytes"] for task in tasks),
+            "xcom_issues": xcom_issues,
+            "xcom_score": calculate_score({"issues": xcom_issues}),
+        },
+    }
@@ -0,0 +1,288 @@
+"""Watch Mode: Re-score DAG Files as They Change"""
+
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import select
+import struct
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+from airflow_crew.tools.support.fleet import FleetSummary, analyze_file
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _is_dag_file(path: Path) -> bool:
+    return path.suffix == ".py" and not path.name.startswith(".")
+
+
+def _scan(root: Path) -> list[Path]:
+    return sorted(path for path in root.rglob("*.py") if _is_dag_file(path) and path.is_file())
+
+
+def _decode_events(data: bytes) -> Iterator[tuple[int, int, bytes]]:
+    """Split a buffer read from an inotify descriptor into ``(wd, mask, name)`` events."""
+    offset = 0
+    while offset < len(data):
+        wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+        name = data[offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length].rstrip(b"\0")
+        offset += EVENT_HEADER.size + length
+        yield wd, mask, name
+
+
+class InotifyChangeSource:
+    """Report changed DAG files using Linux inotify, watching every directory under ``root``."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories: dict[int, Path] = {}
+        try:
+            self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, directory: Path) -> set[Path]:
+        """Watch ``directory`` and its subdirectories, returning the DAG files already inside."""
+        found = set()
+        for current, subdirs, files in os.walk(directory):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current), WATCH_MASK)
+            if wd < 0:
+                # Typically ENOSPC when fs.inotify.max_user_watches is exhausted
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {current}")
+            self.directories[wd] = Path(current)
+            found.update(path for path in (Path(current) / name for name in files) if _is_dag_file(path))
+        return found
+
+    def poll(self, timeout: float) -> set[Path] | None:
+        """Wait up to ``timeout`` seconds and return changed DAG files, or None if a full rescan is needed."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: set[Path] = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            for wd, mask, name in _decode_events(data):
+                paths = self._changed_paths(wd, mask, name)
+                if paths is None:
+                    return None
+                changed |= paths
+
+    def _changed_paths(self, wd: int, mask: int, name: bytes) -> set[Path] | None:
+        """DAG files changed by one inotify event, or None if a full rescan is needed."""
+        if mask & IN_Q_OVERFLOW:
+            return None
+        if mask & IN_IGNORED:
+            self.directories.pop(wd, None)
+            return set()
+        directory = self.directories.get(wd)
+        if directory is None or not name:
+            return set()
+        path = directory / os.fsdecode(name)
+        if not mask & IN_ISDIR:
+            return {path} if _is_dag_file(path) else set()
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            # Files may land in a new directory before its watch exists
+            return self._watch_tree(path)
+        if mask & IN_MOVED_FROM:
+            return None
+        return set()
+
+    def close(self):
+        """Release the inotify file descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingChangeSource:
+    """Report changed DAG files by comparing modification times and sizes at a fixed interval."""
+
+    def __init__(self, root: Path, interval: float = DEFAULT_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for path in _scan(self.root):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout: float) -> set[Path]:
+        """Sleep for the polling interval (at most ``timeout``) and return files added, modified or removed."""
+        time.sleep(min(timeout, self.interval))
+        current = self._snapshot()
+        changed = {path for path, signature in current.items() if self.snapshot.get(path) != signature}
+        changed |= self.snapshot.keys() - current.keys()
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        """Nothing to release."""
+
+
+def create_change_source(root: Path, polling: bool = False, interval: float = DEFAULT_POLL_INTERVAL):
+    """Use inotify where available, falling back to polling (non-Linux, no watches left, etc.)."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyChangeSource(root)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); falling back to polling every {interval}s", file=sys.stderr)
+    return PollingChangeSource(root, interval)
+
+
+class DagWatcher:
+    """Keep an in-memory index of score and issues per DAG file, re-analyzing files as they change.
+
+    Bursts of events (editors often write, rename and touch a file in quick
+    succession) are debounced: files are only re-analyzed once no new events have
+    arrived for ``debounce`` seconds. Files whose content hash is unchanged are not
+    re-analyzed at all.
+    """
+
+    def __init__(
+        self,
+        root: Path | str,
+        status_file: Path | str | None = None,
+        output: TextIO | None = sys.stdout,
+        debounce: float = DEFAULT_DEBOUNCE,
+        polling: bool = False,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.root = Path(root).resolve()
+        self.status_file = Path(status_file) if status_file else None
+        self.output = output
+        self.debounce = debounce
+        self.polling = polling
+        self.poll_interval = poll_interval
+        self.index: dict[str, dict[str, Any]] = {}
+        self.digests: dict[str, str] = {}
+
+    def refresh(self, paths: set[Path]) -> list[dict[str, Any]]:
+        """Re-analyze changed files and drop deleted ones, returning the index updates."""
+        updates = []
+        for path in sorted(paths):
+            key = str(path)
+            try:
+                code = path.read_text(encoding="utf-8")
+            except (FileNotFoundError, IsADirectoryError):
+                if self.index.pop(key, None) is not None:
+                    self.digests.pop(key, None)
+                    updates.append({"event": "removed", "path": key})
+                continue
+            except (OSError, UnicodeDecodeError) as e:
+                record = {"path": key, "status": "error", "error": f"{type(e).__name__}: {e}"}
+            else:
+                digest = hashlib.blake2b(code.encode(), digest_size=16).hexdigest()
+                if self.digests.get(key) == digest:
+                    continue
+                self.digests[key] = digest
+                record = analyze_file(path, code=code)
+            record["updated_at"] = time.time()
+            self.index[key] = record
+            updates.append({"event": "analyzed", **record})
+        return updates
+
+    def rescan(self) -> list[dict[str, Any]]:
+        """Reconcile the index with every DAG file currently on disk."""
+        return self.refresh(set(_scan(self.root)) | {Path(path) for path in self.index})
+
+    def status(self) -> dict[str, Any]:
+        """Current index plus a fleet-style summary."""
+        summary = FleetSummary()
+        for record in self.index.values():
+            summary.add(record)
+        return {"root": str(self.root), "updated_at": time.time(), "summary": summary.to_dict(), "files": self.index}
+
+    def publish(self, updates: list[dict[str, Any]]):
+        """Write updates as JSON lines and/or rewrite the status file atomically."""
+        if not updates:
+            return
+        if self.output is not None:
+            for update in updates:
+                self.output.write(json.dumps(update) + "\n")
+            self.output.flush()
+        if self.status_file is not None:
+            self.status_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.status_file.parent, prefix=f".{self.status_file.name}.")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.status(), f, indent=2)
+            os.replace(tmp_path, self.status_file)
+
+    def run(self, duration: float | None = None):
+        """Analyze every file once, then watch for changes until interrupted (or for ``duration`` seconds)."""
+        source = create_change_source(self.root, self.polling, self.poll_interval)
+        deadline = time.monotonic() + duration if duration is not None else None
+        pending: set[Path] = set()
+        last_event = 0.0
+        try:
+            self.publish(self.rescan())
+            while deadline is None or time.monotonic() < deadline:
+                changed = source.poll(self.debounce if pending else 1.0)
+                if changed is None:
+                    # Event queue overflowed: fall back to a full reconciliation
+                    pending.clear()
+                    self.publish(self.rescan())
+                    continue
+                if changed:
+                    pending |= changed
+                    last_event = time.monotonic()
+                elif pending and time.monotonic() - last_event >= self.debounce:
+                    batch, pending = pending, set()
+                    self.publish(self.refresh(batch))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            source.close()
+
+
+def main(argv: list[str] | None = None):
+    """Command-line entry point for watch mode."""
+    parser = argparse.ArgumentParser(description="Watch a DAGs directory and re-score DAG files as they change.")
+    parser.add_argument("dags_dir", help="Directory containing DAG files")
+    parser.add_argument("-s", "--status-file", default=None, help="Keep a JSON status file with the current index up to date")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not stream updates to stdout")
+    parser.add_argument("-d", "--debounce", type=float, default=DEFAULT_DEBOUNCE, help="Seconds of quiet before re-analyzing")
+    parser.add_argument("--poll", action="store_true", help="Poll for changes instead of using inotify")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Polling interval in seconds")
+    args = parser.parse_args(argv)
+
+    watcher = DagWatcher(args.dags_dir, status_file=args.status_file, output=None if args.quiet else sys.stdout, debounce=args.debounce, polling=args.poll, poll_interval=args.poll_interval)
+    watcher.run()